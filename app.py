@@ -1,73 +1,126 @@
 import os
-import glob
 import re
 import json
-import numpy as np
-import csv
+import threading
+import time
+import atexit
+import concurrent.futures
+import functools
 import hashlib
 import uuid
 
-
-# Gradio is optional: tests/CI import this module without needing the UI.
-try:
-    import gradio as gr
-except Exception:
-    gr = None
-
-from tfidf import TfidfRetriever
 import datetime as _dt
 
-from app_pkg.lang import detect_lang, AR_RE
-from app_pkg.retrieval import source_url
+from app_pkg import runtime
+from app_pkg.batching import MicroBatcher
+from app_pkg.embedders import SemanticUnavailableError, embedder_name, get_embedder  # noqa: F401
+from app_pkg.footprint import StartupTrace, model_footprint, process_memory
+from app_pkg.index import (  # noqa: F401
+    CorpusIndex, CorpusRegistry, DocsWatcher, corpus_fingerprint, cos_scores_np, file_ok, load_docs, parse_corpora,
+)
+from app_pkg.jobs import JobRunner
+from app_pkg.lang import detect_cache_info, detect_lang, detect_langs
+from app_pkg.logging_utils import AsyncLogWriter
+from app_pkg.metrics import REGISTRY as METRICS
+from app_pkg.retrieval import ABSTAIN_MIN_GAP, ABSTAIN_MIN_TOP, rrf_fuse, source_url, tfidf_pool
+from app_pkg.singleflight import SingleFlight, restamp_trace
+from app_pkg.timing import LatencyStats, StageTimer
+from app_pkg.ui import AnswerOffload, from_env as ui_config_from_env
+from app_pkg.warmup import CacheWarmer, query_set, top_logged_queries
 from kosniper.contracts import TrafficLight
+
+# Gradio is optional (tests/CI run without it) and slow to import: build_demo() loads it.
+gr = None
+
 MODEL_NAME = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+# Embedder backend: "sentence-transformers[:model]" (default, MODEL_NAME) or the offline
+# deterministic stand-in "hashing[:dim]" for CI and load tests (see app_pkg/embedders.py).
+EMBEDDER = os.getenv("EMBEDDER", "sentence-transformers")
+EMBEDDING_MODEL = embedder_name(EMBEDDER, MODEL_NAME)
 
 GITHUB_BLOB_BASE = "https://github.com/moe-eid-ml/p1-faq-rag/blob/main/"
 SEMANTIC_DISABLED = os.getenv("DISABLE_SEMANTIC", "0") == "1"
 
 
-class SemanticUnavailableError(RuntimeError):
-    """Raised when semantic retrieval is requested but unavailable in strict mode."""
-
-
 # ----------------- Lang detect -----------------
 # logging flags: opt-in locally, always disable on Hugging Face Spaces
 IS_SPACE = bool(os.getenv("SPACE_ID") or os.getenv("HF_SPACE"))
 LOG_QUERIES = (os.getenv("LOG_QUERIES", "0") == "1") and (not IS_SPACE)
 
-# ----------------- Data loading -----------------
-def load_docs():
-    docs = []
-    for p in sorted(glob.glob("docs/**/*.txt", recursive=True)):
-        # skip archived files
-        if "/_archive/" in p.replace("\\", "/"):
-            continue
-        with open(p, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-        fname = os.path.basename(p)
-        if "_ar" in fname or AR_RE.search(content):
-            lang = "ar"
-        elif "_de" in fname:
-            lang = "de"
-        elif "_en" in fname:
-            lang = "en"
-        else:
-            lang = "en"
-        for para in [x.strip() for x in content.split("\n\n") if x.strip()]:
-            docs.append({"path": p, "text": para, "lang": lang})
-    return docs
-
-def file_ok(path, includes=None, excludes=None):
-    b = os.path.basename(path).lower()
-    if includes and not any(s in b for s in includes):
-        return False
-    if excludes and any(s in b for s in excludes):
-        return False
-    return True
+# ----------------- Corpora -----------------
+# Named corpora (name -> doc root). "default" is the historical all-of-docs/ corpus;
+# extra ones can be declared with CORPORA="name=root,name2=root2".
+DEFAULT_CORPUS = "default"
+CORPORA = {
+    DEFAULT_CORPUS: "docs",
+    "wohngeld": "docs/wohngeld",
+    "faq_ar": "docs/faq/ar",
+    **parse_corpora(os.getenv("CORPORA", "")),
+}
+# Indexes are built on first use; LRU ones are evicted past this budget (default corpus is pinned).
+CORPUS_MEM_MB = float(os.getenv("CORPUS_MEM_MB", "512"))
+# Multi-worker serving: a parent runs `cli.py export-index --out $SHARED_INDEX_DIR` once and
+# workers memory-map <dir>/<corpus>/ instead of each building their own copy.
+SHARED_INDEX_DIR = os.getenv("SHARED_INDEX_DIR", "")
+# Scatter-gather retrieval: score every corpus in SHARDS worker processes (0/1 = in-process).
+SHARDS = int(os.getenv("SHARDS", "0"))
+
+def _load_corpus(name, root):
+    """Registry loader: attach a shared export when it matches the docs on disk, else build."""
+    # Imported here: scipy/multiprocessing only matter once an index is actually loaded.
+    from app_pkg.shared_index import attach_index, read_meta
+    from app_pkg.sharding import ShardedIndex
+
+    if SHARED_INDEX_DIR:
+        d = os.path.join(SHARED_INDEX_DIR, name)
+        meta = read_meta(d)
+        if meta is not None and meta.get("fingerprint") == corpus_fingerprint(root):
+            ix = attach_index(d, embedding_model=EMBEDDING_MODEL)
+            return ShardedIndex(ix, SHARDS) if SHARDS > 1 else ix
+    ix = CorpusIndex.from_dir(root, name=name)
+    return ShardedIndex(ix, SHARDS) if SHARDS > 1 else ix
+
+corpora = CorpusRegistry(
+    CORPORA, budget_bytes=int(CORPUS_MEM_MB * 1024 * 1024), pinned=(DEFAULT_CORPUS,), loader=_load_corpus
+)
+
+def get_corpus(name=None) -> CorpusIndex:
+    """Index for corpus `name` (None/"" = default), built on first use."""
+    try:
+        return corpora.get(name or DEFAULT_CORPUS)
+    except KeyError as e:
+        raise ValueError(str(e.args[0])) from None
+
+def default_index() -> CorpusIndex:
+    """Current snapshot of the default corpus; built on first use (not at import)."""
+    ix = globals().get("_default_index")
+    if ix is None:
+        ix = get_corpus()
+        _set_default_index(ix)
+    return ix
+
+def _set_default_index(ix: CorpusIndex):
+    """Point the module-level aliases of the default corpus (kept for cli.py, adapters
+    and tests) at snapshot `ix`. answer() itself never reads them."""
+    global _default_index, docs, DOC_INDEX, LANG_SLICES, FILE_STARTS, tfidf, doc_embeddings
+    _default_index = ix
+    docs = ix.docs
+    DOC_INDEX = ix.doc_index
+    LANG_SLICES = ix.lang_slices
+    FILE_STARTS = ix.file_starts
+    tfidf = ix.tfidf
+    doc_embeddings = ix.embeddings
 
-docs = load_docs()
-for i, d in enumerate(docs): d["id"] = i
-DOC_INDEX = {(d["path"], d["text"]): i for i, d in enumerate(docs)}
+doc_embeddings = None
+_DEFAULT_ALIASES = ("docs", "DOC_INDEX", "LANG_SLICES", "FILE_STARTS", "tfidf")
+
+def __getattr__(name):
+    # Fast start: `import app` builds nothing. The legacy aliases (app.docs, app.tfidf, ...)
+    # trigger the default corpus build on first access and are plain globals afterwards.
+    if name in _DEFAULT_ALIASES:
+        default_index()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 #
 # ----------------- Retrievers -----------------
@@ -77,8 +130,32 @@ EMB_NPY = os.path.join(BUILD_DIR, "doc_embeddings.npy")
 EMB_META = os.path.join(BUILD_DIR, "doc_embeddings.meta")
 
 embedder = None
-doc_embeddings = None
 _semantic_ready = False
+_MODEL_LOAD = METRICS.gauge("embedding_model_load_seconds", "Time to load the embedder backend", ("model",))
+
+# Concurrent Semantic/Hybrid queries are embedded together: the batcher waits up to
+# EMBED_BATCH_WAIT_MS for up to EMBED_BATCH_MAX queries (wait 0 = encode each query alone).
+EMBED_BATCH_MAX = int(os.getenv("EMBED_BATCH_MAX", "32"))
+EMBED_BATCH_WAIT_MS = float(os.getenv("EMBED_BATCH_WAIT_MS", "3"))
+query_batcher = MicroBatcher(
+    lambda texts: embedder.encode_batch(texts),
+    max_batch=EMBED_BATCH_MAX,
+    max_wait_ms=EMBED_BATCH_WAIT_MS,
+)
+
+# Repeated questions skip the encoder: query embeddings are memoized per (embedder, query).
+QUERY_EMB_CACHE = int(os.getenv("QUERY_EMB_CACHE", "1024"))
+
+@functools.lru_cache(maxsize=QUERY_EMB_CACHE)
+def _cached_query_embedding(model: str, query: str):
+    vec = query_batcher.encode(query)
+    if hasattr(vec, "setflags"):
+        vec.setflags(write=False)  # shared by every later caller
+    return vec
+
+def _encode_query(query: str):
+    """Query embedding via the shared micro-batcher (memoized, see QUERY_EMB_CACHE)."""
+    return _cached_query_embedding(embedder.name, query)
 
 def semantic_ready() -> bool:
     return bool(_semantic_ready)
@@ -87,86 +164,389 @@ def ensure_semantic_ready() -> bool:
     _init_embeddings()
     return bool(_semantic_ready)
 
-def _emb_cache_key(model_name, _docs):
-    mts = [os.path.getmtime(d["path"]) for d in _docs]
-    return f"{model_name}|{len(_docs)}|{int(sum(mts))}"
+# Lazy init is reachable from server/UI pool threads: one model load, one encode per corpus.
+_embedding_init = SingleFlight()
 
-def _init_embeddings():
-    """Init embeddings lazily.
+def _init_embeddings(ix: CorpusIndex = None):
+    """Init embeddings lazily (model once, then per corpus on first semantic use).
 
-    If `sentence_transformers` isn't installed, keep semantic disabled and allow
-    TF-IDF-only operation (tests + basic usage).
+    The backend comes from EMBEDDER. If it needs `sentence_transformers` and that
+    isn't installed, keep semantic disabled and allow TF-IDF-only operation.
+    Concurrent first callers share one model load and one encode per corpus.
     """
+    if not _semantic_ready:
+        if SEMANTIC_DISABLED:
+            return
+        _embedding_init.do(None, _load_embedder)
+        if not _semantic_ready:
+            return
+    if ix is None:
+        return
+
+    def _attach():
+        if ix.embeddings is None:
+            ix.ensure_embeddings(embedder, embedder.name, BUILD_DIR)
+            corpora.enforce_budget(keep=ix.name)  # the index just grew by its embedding matrix
+
+    # Keyed by name: a caller holding another snapshot of the corpus goes round again.
+    while ix.embeddings is None:
+        _embedding_init.do(ix.name, _attach)
+
+def _load_embedder():
     global embedder, doc_embeddings, _semantic_ready
     if _semantic_ready:
         return
-    if SEMANTIC_DISABLED:
-        _semantic_ready = False
-        return
-
+    t0 = time.perf_counter()
     try:
-        from sentence_transformers import SentenceTransformer
+        emb = get_embedder(EMBEDDER, MODEL_NAME)
     except ModuleNotFoundError:
-        _semantic_ready = False
         return
-
-    os.makedirs(BUILD_DIR, exist_ok=True)
-    embedder = SentenceTransformer(MODEL_NAME)
-    texts = [d["text"] for d in docs]
-    _key = _emb_cache_key(MODEL_NAME, docs)
-
-    try:
-        if os.path.exists(EMB_NPY) and os.path.exists(EMB_META):
-            with open(EMB_META, "r", encoding="utf-8") as f:
-                if f.read().strip() == _key:
-                    doc_embeddings = np.load(EMB_NPY)
-                else:
-                    raise FileNotFoundError
-        else:
-            raise FileNotFoundError
-    except Exception:
-        doc_embeddings = embedder.encode(texts, convert_to_numpy=True)
-        np.save(EMB_NPY, doc_embeddings)
-        with open(EMB_META, "w", encoding="utf-8") as f:
-            f.write(_key)
-
-    # L2-normalize once
-    doc_embeddings = doc_embeddings / (np.linalg.norm(doc_embeddings, axis=-1, keepdims=True) + 1e-12)
+    _MODEL_LOAD.set(time.perf_counter() - t0, model=emb.name)
+    runtime.apply_torch()  # the backend may have just imported torch
+    embedder = emb
+    doc_embeddings = default_index().ensure_embeddings(embedder, embedder.name, BUILD_DIR)
+    corpora.enforce_budget(keep=DEFAULT_CORPUS)
     _semantic_ready = True
 
-def cos_scores_np(q_vec: np.ndarray, D: np.ndarray) -> np.ndarray:
-    q = q_vec / (np.linalg.norm(q_vec) + 1e-12)
-    return D @ q
+# --- Hot reload: rebuild off to the side, then swap the snapshot reference ---
+_reload_lock = threading.Lock()
+_reload_pool = None
+_pending_reloads = {}
+_docs_watcher = None
+
+def reload_corpus(name=None, wait: bool = False):
+    """Rebuild corpus `name` (None = default) from disk in the background and publish it.
 
-tfidf = TfidfRetriever(docs)
+    In-flight requests keep the snapshot they started with; new ones see the new
+    version. Embeddings of unchanged passages are reused, only edited/new passages
+    are re-encoded. Concurrent requests for the same corpus share one pending
+    rebuild. Returns the new CorpusIndex if `wait`, else a Future.
+    """
+    global _reload_pool
+    name = name or DEFAULT_CORPUS
+    if name not in CORPORA:
+        raise ValueError(f"unknown corpus: {name!r} (known: {', '.join(CORPORA)})")
+
+    def _prepare(new, old):
+        if _semantic_ready and old is not None and old.embeddings is not None:
+            new.ensure_embeddings(embedder, embedder.name, BUILD_DIR, previous=old)
+
+    def _run():
+        ix = corpora.reload(name, prepare=_prepare)
+        if name == DEFAULT_CORPUS:
+            _set_default_index(ix)
+        return ix
+
+    with _reload_lock:
+        if _reload_pool is None:
+            _reload_pool = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="reload")
+        fut = _pending_reloads.get(name)
+        if fut is None or fut.done():
+            fut = _reload_pool.submit(_run)
+            _pending_reloads[name] = fut
+    return fut.result() if wait else fut
+
+def start_docs_watcher(interval_s: float = None):
+    """Poll loaded corpora for doc changes and hot-reload them (DOCS_WATCH_S seconds)."""
+    global _docs_watcher
+    if _docs_watcher is None:
+        interval_s = interval_s or float(os.getenv("DOCS_WATCH_S", "5"))
+        _docs_watcher = DocsWatcher(corpora, reload_corpus, interval_s=interval_s).start()
+    return _docs_watcher
+
+def export_shared_index(out_dir=None, names=None, with_embeddings: bool = False):
+    """Parent-side builder: export corpora to <out_dir>/<name>/ for workers to memory-map."""
+    from app_pkg.shared_index import export_index
+
+    out_dir = out_dir or SHARED_INDEX_DIR or os.path.join(BUILD_DIR, "shared")
+    written = []
+    for name in names or [DEFAULT_CORPUS]:
+        ix = get_corpus(name)
+        if with_embeddings:
+            _init_embeddings(ix)
+        written.append(export_index(ix, os.path.join(out_dir, name), embedding_model=EMBEDDING_MODEL))
+    return written
+
+def _semantic_search(q_emb, q_lang=None, allow=None, fill=None):
+    return default_index().semantic_search(q_emb, q_lang, allow, fill)
+
+def _tfidf_rank(query, pool, q_lang=None, allow=None, fill=None):
+    return default_index().tfidf_rank(query, pool, q_lang, allow, fill)
+
+def _file_mask(includes=None, excludes=None):
+    return default_index().file_mask(includes, excludes)
+
+def best_passage_per_file(order_idxs, score_of, how="max"):
+    return default_index().best_passage_per_file(order_idxs, score_of, how=how)
 
 def _prefer_lang(order_idxs, q_lang, k):
-    primary = [i for i in order_idxs if docs[i]["lang"] == q_lang]
-    secondary = [i for i in order_idxs if docs[i]["lang"] != q_lang]
-    chosen = []
-    for i in primary + secondary:
-        if i not in chosen:
-            chosen.append(i)
-        if len(chosen) == k:
-            break
-    return chosen
+    return default_index().prefer_lang(order_idxs, q_lang, k)
 
 # ----------------- Answer -----------------
+# Query log (LOG_QUERIES=1): rows are queued and written by a background thread in batches;
+# a full queue drops rows (counted) instead of blocking the answer.
+QUERY_LOG_FORMAT = os.getenv("QUERY_LOG_FORMAT", "csv")  # csv | jsonl | jsonl.gz
+QUERY_LOG_PATH = os.getenv("QUERY_LOG_PATH", "") or os.path.join("logs", f"queries.{QUERY_LOG_FORMAT}")
+QUERY_LOG_FIELDS = ["ts", "query", "mode", "k", "include", "exclude", "lang_forced", "lang_detected", "top_files", "top_langs",
+                    "answer_len", "corpus_size"]
+_query_logger = None
+_query_logger_lock = threading.Lock()
+
+def query_logger() -> AsyncLogWriter:
+    """The process' query log writer (started on first use)."""
+    global _query_logger
+    with _query_logger_lock:
+        if _query_logger is None:
+            _query_logger = AsyncLogWriter(
+                QUERY_LOG_PATH,
+                fmt=QUERY_LOG_FORMAT,
+                fieldnames=QUERY_LOG_FIELDS,
+                max_queue=int(os.getenv("QUERY_LOG_QUEUE", "10000")),
+                flush_s=float(os.getenv("QUERY_LOG_FLUSH_S", "1")),
+                max_bytes=int(float(os.getenv("QUERY_LOG_MAX_MB", "10")) * 1024 * 1024),
+                rotate_s=float(os.getenv("QUERY_LOG_ROTATE_S", "0")),
+                backups=int(os.getenv("QUERY_LOG_BACKUPS", "5")),
+            )
+            atexit.register(_query_logger.close)
+        return _query_logger
+
 def log_query(row: dict):
     if not LOG_QUERIES:
         return
-    os.makedirs("logs", exist_ok=True)
-    path = os.path.join("logs", "queries.csv")
-    header = ["ts","query","mode","k","include","exclude","lang_forced","lang_detected","top_files","top_langs","answer_len","corpus_size"]
-    write_header = not os.path.exists(path)
-    with open(path, "a", newline="", encoding="utf-8") as f:
-        w = csv.DictWriter(f, fieldnames=header)
-        if write_header:
-            w.writeheader()
-        w.writerow(row)
-
-def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", link_mode="github", trace: bool = False, strict: bool = False):
+    query_logger().log(row)
+
+# --- Latency: per-stage timers -> trace "timings_ms", windowed p50/p95/p99, slow-request log ---
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+SLOW_LOG_PATH = os.getenv("SLOW_LOG_PATH", os.path.join("logs", "slow_requests.jsonl"))
+stage_latency = LatencyStats(window=int(os.getenv("LATENCY_WINDOW", "2048")))
+
+def log_slow_request(args, mode: str, timings: dict):
+    """Append one JSON line with the stage breakdown of a request slower than SLOW_REQUEST_MS."""
+    query, k, _mode, include, lang, exclude = args[:6]
+    row = {
+        "ts": _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds"),
+        "query": query,
+        "mode": mode,
+        "k": k,
+        "include": include or "",
+        "exclude": exclude or "",
+        "lang": lang,
+        "corpus": args[-1] or DEFAULT_CORPUS,
+        "timings_ms": timings,
+    }
+    os.makedirs(os.path.dirname(SLOW_LOG_PATH) or ".", exist_ok=True)
+    with open(SLOW_LOG_PATH, "a", encoding="utf-8") as f:
+        f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+# --- Metrics (Prometheus text via server.py /metrics, `cli.py stats`) ---
+_REQUESTS = METRICS.counter("answer_requests_total", "answer() calls by requested mode", ("mode",))
+_COALESCED = METRICS.counter("answer_coalesced_total", "answer() calls served from an identical in-flight call")
+_OUTCOMES = METRICS.counter("answer_outcomes_total", "Computed answers by mode used and outcome", ("mode", "outcome"))
+_FALLBACKS = METRICS.counter("semantic_fallback_total", "Semantic/Hybrid requests answered with TF-IDF", ("requested",))
+_ERRORS = METRICS.counter("answer_errors_total", "answer() computations that raised", ("error",))
+_LATENCY = METRICS.histogram("answer_latency_seconds", "answer() computation time by mode used", ("mode",))
+_STAGE_LATENCY = METRICS.histogram("answer_stage_seconds", "answer() stage time by mode used", ("mode", "stage"))
+_SEMANTIC_READY = METRICS.gauge("semantic_ready", "1 if the embedding model and doc embeddings are loaded")
+_CORPORA_LOADED = METRICS.gauge("corpora_loaded", "Corpus indexes currently in memory")
+_CORPORA_BYTES = METRICS.gauge("corpora_bytes", "Estimated bytes held by loaded corpus indexes")
+_CORPORA_EVICTIONS = METRICS.gauge("corpora_evictions", "Corpus indexes evicted since start")
+_INFLIGHT = METRICS.gauge("answer_inflight", "Distinct answer() computations in flight")
+_BATCHER = METRICS.gauge("embed_batcher", "Query-embedding micro-batcher counters", ("stat",))
+_QUERY_LOG = METRICS.gauge("query_log", "Async query log counters (written, dropped, queued, ...)", ("stat",))
+_FAQ = METRICS.counter("faq_fast_path_total", "answer() lookups in the FAQ question index", ("result",))
+_QUERY_EMB = METRICS.gauge("query_embedding_cache", "Query-embedding memo (hits, misses, size)", ("stat",))
+_UI_BATCHES = METRICS.gauge("ui_batches", "Batched UI Search calls (batches, requests, mean_batch, restarts, ...)", ("stat",))
+_EVAL_JOBS = METRICS.gauge("eval_jobs", "In-app eval jobs (submitted, memo_hits, joined, done, cancelled, failed, running)", ("stat",))
+_WARMUP = METRICS.gauge("cache_warmup", "Last cache warm-up run (planned, executed, coverage, elapsed_s, ...)", ("stat",))
+
+def _collect_metrics():
+    _SEMANTIC_READY.set(1.0 if _semantic_ready else 0.0)
+    _CORPORA_LOADED.set(len(corpora.loaded()))
+    _CORPORA_BYTES.set(corpora.nbytes())
+    _CORPORA_EVICTIONS.set(corpora.evictions)
+    _INFLIGHT.set(_inflight.stats()["inflight"])
+    b = query_batcher.stats()
+    for stat in ("requests", "batches", "errors", "mean_batch", "mean_queue_wait_ms", "mean_encode_ms"):
+        _BATCHER.set(b[stat], stat=stat)
+    if _query_logger is not None:
+        for stat, v in _query_logger.stats().items():
+            _QUERY_LOG.set(v, stat=stat)
+    info = _cached_query_embedding.cache_info()
+    for stat in ("hits", "misses", "currsize"):
+        _QUERY_EMB.set(getattr(info, stat), stat=stat)
+    for stat, v in eval_jobs.stats().items():
+        _EVAL_JOBS.set(v, stat=stat)
+    if _ui_offload is not None:
+        for stat, v in _ui_offload.stats().items():
+            _UI_BATCHES.set(v, stat=stat)
+    report = warmup_report()
+    if report is not None:
+        for stat in ("planned", "executed", "errors", "skipped", "coverage", "elapsed_s", "deferrals", "deferred_s"):
+            _WARMUP.set(report[stat], stat=stat)
+
+METRICS.add_collector(_collect_metrics)
+
+# --- FAQ fast path: known questions skip retrieval (app_pkg.faq) ---
+FAQ_FAST_PATH = os.getenv("FAQ_FAST_PATH", "1") != "0"
+
+def faq_hit_rate() -> float:
+    hits, misses = _FAQ.value(result="hit"), _FAQ.value(result="miss")
+    return hits / (hits + misses) if hits + misses else 0.0
+
+def _faq_lookup(ix, query, allow, lang):
+    """(normalized question, answer ids) if `query` is a known question with usable answers, else None."""
+    hit = ix.questions.lookup(query)
+    if hit is not None:
+        q, ids = hit
+        ids = [i for i in ids if (allow is None or allow[i]) and (lang not in ("de", "en", "ar") or ix.docs[i]["lang"] == lang)]
+        hit = (q, ids) if ids else None
+    _FAQ.inc(result="miss" if hit is None else "hit")
+    return hit
+
+# --- Cache warm-up (app_pkg.warmup): replay common questions after start/deploy ---
+# Sample questions offered in the UI, and what answer() expands clarify replies "1".."4" into.
+SAMPLE_QUESTIONS = [
+    "Welche Unterlagen brauche ich für den Wohngeldantrag?",
+    "Wo stelle ich den Wohngeldantrag in meiner Stadt?",
+    "Wie lange dauert die Bearbeitung vom Wohngeld?",
+    "Wie wird die Höhe des Wohngelds berechnet?",
+    "Wann sollte ich den Weiterleistungsantrag stellen?",
+]
+CLARIFY_EXPANSIONS = {
+    "1": "Wohngeld eligibility requirements Voraussetzungen wer kann beantragen",
+    "2": "Wohngeld required documents Unterlagen Nachweise beizufügen",
+    "3": "Wohngeld income calculation Einkommen Freibeträge Vermögen berücksichtigt",
+    "4": "Wohngeld where to apply Antrag stellen zuständig Bearbeitungszeit",
+}
+WARMUP_ON_START = os.getenv("WARMUP_ON_START", "0") == "1"
+WARMUP_INTERVAL_S = float(os.getenv("WARMUP_INTERVAL_S", "0"))  # 0 = once
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "20"))  # most frequent logged queries
+WARMUP_MODES = [m.strip() for m in os.getenv("WARMUP_MODES", "TF-IDF,Hybrid").split(",") if m.strip()]
+WARMUP_INCLUDES = os.getenv("WARMUP_INCLUDES", ",wohngeld").split(",")  # "" = no filter
+WARMUP_K = int(os.getenv("WARMUP_K", "3"))
+WARMUP_IDLE_S = float(os.getenv("WARMUP_IDLE_S", "2"))  # traffic within this window defers warm-up
+WARMUP_MAX_DEFER_S = float(os.getenv("WARMUP_MAX_DEFER_S", "60"))
+_warmup_tls = threading.local()
+_last_request = [0.0]  # monotonic time of the last non-warm-up answer() call
+_warmer = None
+
+def _is_warmup() -> bool:
+    return getattr(_warmup_tls, "active", False)
+
+def live_traffic() -> bool:
+    """True while user requests are in flight or arrived within WARMUP_IDLE_S."""
+    recent = _last_request[0] and time.monotonic() - _last_request[0] < WARMUP_IDLE_S
+    return bool(recent) or _inflight.stats()["inflight"] > 0
+
+def warmup_queries(top_n: int = None):
+    """[(query, source)]: UI samples, clarify replies, then the most frequent logged queries."""
+    top_n = WARMUP_TOP_N if top_n is None else top_n
+    return query_set(
+        ("samples", SAMPLE_QUESTIONS),
+        ("clarify", list(CLARIFY_EXPANSIONS)),
+        ("logs", top_logged_queries(QUERY_LOG_PATH, top_n)),
+    )
+
+def cache_warmer(queries=None, modes=None, includes=None, k: int = None, corpus: str = None) -> CacheWarmer:
+    """Warmer over `queries` (default: warmup_queries()) x modes x include filters, yielding to live_traffic()."""
+    combos = [
+        {"k": WARMUP_K if k is None else k, "mode": m, "include": inc, "corpus": corpus}
+        for m in (modes or WARMUP_MODES)
+        for inc in (WARMUP_INCLUDES if includes is None else includes)
+    ]
+
+    def run(query, **kw):
+        _warmup_tls.active = True
+        try:
+            answer(query, **kw)
+        finally:
+            _warmup_tls.active = False
+
+    return CacheWarmer(run, warmup_queries() if queries is None else queries, combos, busy=live_traffic,
+                       max_defer_s=WARMUP_MAX_DEFER_S)
+
+def warm_caches(**kw) -> dict:
+    """Run one warm-up now (blocking) and return its report."""
+    global _warmer
+    w = cache_warmer(**kw)
+    report = w.run()
+    _warmer = w
+    return report
+
+def start_warmer(interval_s: float = None) -> CacheWarmer:
+    """Warm in the background (once, or every WARMUP_INTERVAL_S); idempotent."""
+    global _warmer
+    if _warmer is None or _warmer._thread is None:
+        _warmer = cache_warmer()
+        _warmer.start(WARMUP_INTERVAL_S if interval_s is None else interval_s)
+    return _warmer
+
+def warmup_report():
+    return _warmer.report() if _warmer is not None else None
+
+# --- Single-flight: identical concurrent answer() calls share one computation ---
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "1") != "0"
+_inflight = SingleFlight()
+
+def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", link_mode="github", trace: bool = False, strict: bool = False,
+           level: str = "passage", file_agg: str = "max", corpus: str = None):
+    """Answer `query` from the indexed docs.
+
+    corpus selects a named corpus from `CORPORA` (None = default); its index is
+    built on first use.
+
+    level="file" ranks files instead of passages: passage scores are reduced per file
+    (`file_agg` = "max" or "top2" mean) and each of the top-k files contributes its
+    best passage, so no two sources come from the same file.
+
+    Concurrent calls with identical arguments are coalesced (COALESCE_REQUESTS=0 turns
+    this off): one computes, the others get a copy with their own trace_id/timestamp.
+    """
+    args = (query, k, mode, include, lang, exclude, link_mode, trace, strict, level, file_agg, corpus)
+    _REQUESTS.inc(mode=mode)
+    if not _is_warmup():
+        _last_request[0] = time.monotonic()
+    key = args[:-1] + (corpus or DEFAULT_CORPUS,)
+    try:
+        hash(key)
+    except TypeError:
+        key = None
+    if not COALESCE_REQUESTS or key is None:
+        return _timed_answer(args)
+    res, shared = _inflight.do(key, lambda: _timed_answer(args))
+    if shared:
+        _COALESCED.inc()
+    if shared and trace:
+        ans, src, tr = res
+        return ans, src, json.dumps(restamp_trace(json.loads(tr)), ensure_ascii=False, indent=2)
+    return res
+
+def _timed_answer(args):
+    tm = StageTimer()
+    try:
+        res = _answer(*args, tm)
+    except Exception as e:
+        _ERRORS.inc(error=type(e).__name__)
+        raise
+    timings = tm.as_dict()
+    used = tm.label or args[2]
+    stage_latency.record(used, timings)
+    if args[2] in ("Semantic", "Hybrid") and used == "TF-IDF":
+        _FALLBACKS.inc(requested=args[2])
+    for stage, ms in timings.items():
+        if stage == "total":
+            _LATENCY.observe(ms / 1000.0, mode=used)
+        else:
+            _STAGE_LATENCY.observe(ms / 1000.0, mode=used, stage=stage)
+    if SLOW_REQUEST_MS > 0 and timings["total"] >= SLOW_REQUEST_MS:
+        log_slow_request(args, used, timings)
+    return res
+
+def _answer(query, k, mode, include, lang, exclude, link_mode, trace, strict, level, file_agg, corpus, tm):
+    ix = get_corpus(corpus)
+    tm.mark("index")
     if not query.strip():
+        _OUTCOMES.inc(mode=mode, outcome="empty")
         if trace:
             trace_id = str(uuid.uuid4())
             ts = _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
@@ -192,6 +572,7 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
                 "link_mode": link_mode,
                 "query": query,
                 "sniper_trace_v1": sniper_trace_v1,
+                "timings_ms": tm.as_dict(),
             }
 
             return "Ask a question.", "", json.dumps(trace_payload, ensure_ascii=False, indent=2)
@@ -216,12 +597,7 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
                 extra = (m.group(1) or "").strip()
 
         if ok:
-            _expand = {
-                "1": "Wohngeld eligibility requirements Voraussetzungen wer kann beantragen",
-                "2": "Wohngeld required documents Unterlagen Nachweise beizufügen",
-                "3": "Wohngeld income calculation Einkommen Freibeträge Vermögen berücksichtigt",
-                "4": "Wohngeld where to apply Antrag stellen zuständig Bearbeitungszeit",
-            }[_sel]
+            _expand = CLARIFY_EXPANSIONS[_sel]
             query = f"{_expand} {extra}".strip()
 
     q_lang = lang if lang in ("de", "en", "ar") else detect_lang(query)
@@ -236,6 +612,9 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
             "include": include,
             "exclude": exclude,
             "link_mode": link_mode,
+            "level": level,
+            "corpus": ix.name,
+            "index_version": ix.version,
             "semantic_ready": _semantic_ready,
         }
 
@@ -254,119 +633,98 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
         }
         if (len(_toks & _en_hint) >= 2) and (len(_toks & _de_hint) == 0):
             q_lang = "en"
+    tm.mark("lang_detect")
     includes = [s.strip().lower() for s in (include or "").split(",") if s.strip()] or None
     excludes = [s.strip().lower() for s in (exclude or "").split(",") if s.strip()] or None
+    allow = ix.file_mask(includes, excludes)
+    tm.mark("filters")
+
+    # Known question (alias, Q:/A: or question-headed passage): answer passages without retrieval.
+    # Not in strict mode: the caller insists on the requested retrieval mode (or its error).
+    use_faq = FAQ_FAST_PATH and not strict
+    faq = _faq_lookup(ix, query, allow, lang) if use_faq else None
+    if use_faq:
+        tm.mark("faq")
 
     def _tfidf_pool() -> int:
-        # Wider pool helps ensure language preference has candidates (especially EN/AR).
-        pool = max(k * 10, 200)
-        if q_lang in ("en", "ar"):
-            pool = max(pool, 1200)
-        return pool
+        return tfidf_pool(k)
 
     # retrieval confidence helpers
     tfidf_score_by_id = {}
     used_semantic_scores = False
 
-    if mode == "TF-IDF":
-        passages, scores = tfidf.search(query, k=_tfidf_pool())
-        order = np.argsort(scores)[::-1]
-        idx_map = [DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-        order_idxs = [idx for j in order for idx in [idx_map[j]] if idx is not None]
-        for p, s in zip(passages, scores):
-            idx = DOC_INDEX.get((p["path"], p["text"]))
-            if idx is None:
-                continue
-            prev = tfidf_score_by_id.get(idx)
-            s = float(s)
-            if prev is None or s > prev:
-                tfidf_score_by_id[idx] = s
+    if faq is not None:
+        order_idxs = list(faq[1])
+        # Rank-derived scores (file-level reduction only); the score gates below are skipped for FAQ hits.
+        tfidf_score_by_id = {i: float(len(order_idxs) - r) for r, i in enumerate(order_idxs)}
+
+    elif mode == "TF-IDF":
+        order_idxs, tfidf_score_by_id = ix.tfidf_rank(query, _tfidf_pool(), q_lang, allow, fill=k)
+        tm.mark("tfidf")
 
     elif mode == "Hybrid":
         # 1) semantic query embedding (once)
-        _init_embeddings()
+        _init_embeddings(ix)
         if not _semantic_ready:
             if strict:
                 raise SemanticUnavailableError("Semantic embeddings unavailable (strict mode)")
             mode = "TF-IDF"
         if mode == "Hybrid":
-            q_emb = embedder.encode(query, convert_to_numpy=True)
-            sem_scores = cos_scores_np(q_emb, doc_embeddings)
+            q_emb = _encode_query(query)
+            tm.mark("embed")
+            sem_order, sem_scores = ix.semantic_search(q_emb, q_lang, allow, fill=k)
             used_semantic_scores = True
+            tm.mark("semantic")
 
-            # 2) lexical candidate pool (broad)
-            passages, scores = tfidf.search(query, k=_tfidf_pool())
-            order = np.argsort(scores)[::-1]
-            idx_map = [DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-            tf_order = [idx for j in order for idx in [idx_map[j]] if idx is not None]
+            # 2) lexical candidate pool (broad); its scores back the gate for passages semantic did not score
+            tf_order, tfidf_score_by_id = ix.tfidf_rank(query, _tfidf_pool(), q_lang, allow, fill=k)
+            tm.mark("tfidf")
 
             # 3) fuse semantic + lexical using Reciprocal Rank Fusion (RRF)
-            # Guardrail: only let semantic vote with its top-N to avoid long-tail noise.
-            sem_order = sem_scores.argsort()[::-1].tolist()
-            SEM_CAND = 300
-            TF_CAND = min(len(tf_order), 1200)
-            k0 = 90.0
-
-            rrf = {}
-            # Lexical first: if TF-IDF already found the right file, don't let semantic tail drag it down.
-            for r, i in enumerate(tf_order[:TF_CAND]):
-                rrf[i] = rrf.get(i, 0.0) + 1.0 / (k0 + r + 1)
-            for r, i in enumerate(sem_order[:SEM_CAND]):
-                rrf[i] = rrf.get(i, 0.0) + 1.0 / (k0 + r + 1)
-
-            order_idxs = [i for i, _ in sorted(rrf.items(), key=lambda x: x[1], reverse=True)]
+            order_idxs, rrf = rrf_fuse(tf_order, sem_order)
+            tm.mark("fusion")
         else:
-            passages, scores = tfidf.search(query, k=_tfidf_pool())
-            order = np.argsort(scores)[::-1]
-            idx_map = [DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-            order_idxs = [idx for j in order for idx in [idx_map[j]] if idx is not None]
-            for p, s in zip(passages, scores):
-                idx = DOC_INDEX.get((p["path"], p["text"]))
-                if idx is None:
-                    continue
-                prev = tfidf_score_by_id.get(idx)
-                s = float(s)
-                if prev is None or s > prev:
-                    tfidf_score_by_id[idx] = s
+            tm.mark("embed")
+            order_idxs, tfidf_score_by_id = ix.tfidf_rank(query, _tfidf_pool(), q_lang, allow, fill=k)
+            tm.mark("tfidf")
     else:  # Semantic
-        _init_embeddings()
+        _init_embeddings(ix)
         if not _semantic_ready:
             if strict:
                 raise SemanticUnavailableError("Semantic embeddings unavailable (strict mode)")
+            tm.mark("embed")
             # fallback to TF-IDF if semantic deps are missing
-            passages, scores = tfidf.search(query, k=_tfidf_pool())
-            order = np.argsort(scores)[::-1]
-            idx_map = [DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-            order_idxs = [idx for j in order for idx in [idx_map[j]] if idx is not None]
-            for p, s in zip(passages, scores):
-                idx = DOC_INDEX.get((p["path"], p["text"]))
-                if idx is None:
-                    continue
-                prev = tfidf_score_by_id.get(idx)
-                s = float(s)
-                if prev is None or s > prev:
-                    tfidf_score_by_id[idx] = s
+            order_idxs, tfidf_score_by_id = ix.tfidf_rank(query, _tfidf_pool(), q_lang, allow, fill=k)
+            tm.mark("tfidf")
         else:
-            q_emb = embedder.encode(query, convert_to_numpy=True)
-            scores = cos_scores_np(q_emb, doc_embeddings)
+            q_emb = _encode_query(query)
+            tm.mark("embed")
+            order_idxs, scores = ix.semantic_search(q_emb, q_lang, allow, fill=k)
             used_semantic_scores = True
-            order_idxs = scores.argsort()[::-1].tolist()
+            tm.mark("semantic")
     # filename filter (run AFTER we have order_idxs)
     if includes or excludes:
-        order_idxs = [i for i in order_idxs if file_ok(docs[i]["path"], includes, excludes)]
+        order_idxs = [i for i in order_idxs if file_ok(ix.docs[i]["path"], includes, excludes)]
     # forced-language with backfill up to K
     if lang in ("de", "en", "ar"):
-        same = [i for i in order_idxs if docs[i]["lang"] == lang]
+        same = [i for i in order_idxs if ix.docs[i]["lang"] == lang]
         if len(same) >= k:
             order_idxs = same
         else:
-            backfill = [i for i in order_idxs if docs[i]["lang"] != lang]
+            backfill = [i for i in order_idxs if ix.docs[i]["lang"] != lang]
             order_idxs = same + backfill
 
+    if level == "file":
+        rank_scores = rrf if mode == "Hybrid" else (scores if used_semantic_scores else tfidf_score_by_id)
+        order_idxs = ix.best_passage_per_file(order_idxs, rank_scores, how=file_agg)
+
     # final selection with lang preference
-    chosen = _prefer_lang(order_idxs, q_lang, k)
-    top = [docs[i] for i in chosen]
+    chosen = ix.prefer_lang(order_idxs, q_lang, k)
+    top = [ix.docs[i] for i in chosen]
+    tm.mark("select")
+    tm.label = "FAQ" if faq is not None else mode if used_semantic_scores else "TF-IDF"  # mode actually used
     if not top:
+        _OUTCOMES.inc(mode=tm.label, outcome="no_results")
         if trace:
             trace_id = str(uuid.uuid4())
             ts = _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
@@ -391,7 +749,10 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
                 "k": k,
                 "link_mode": link_mode,
                 "query": query,
+                "corpus": ix.name,
+                "index_version": ix.version,
                 "sniper_trace_v1": sniper_trace_v1,
+                "timings_ms": tm.as_dict(),
             }
 
             return "No results.", "", json.dumps(trace_payload, ensure_ascii=False, indent=2)
@@ -403,7 +764,9 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
         if used_semantic_scores:
             try:
                 if mode == "Hybrid":
-                    return float(sem_scores[idx])
+                    s = float(sem_scores[idx])
+                    # -1.0 = outside the routed slice / semantic top-N: ranked by TF-IDF alone.
+                    return s if s > -1.0 else tfidf_score_by_id.get(idx)
                 return float(scores[idx])
             except Exception:
                 return None
@@ -413,14 +776,14 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
     s2 = _score_for(chosen[1]) if len(chosen) > 1 else None
 
     # Thresholds are intentionally conservative; we’ll tune later with a few examples.
-    if used_semantic_scores:
-        MIN_TOP, MIN_GAP = 0.25, 0.03
-    else:
-        MIN_TOP, MIN_GAP = 0.05, 0.01
+    family = "semantic" if used_semantic_scores else "tfidf"
+    MIN_TOP, MIN_GAP = ABSTAIN_MIN_TOP[family], ABSTAIN_MIN_GAP[family]
 
     abstained = False
     abstain_reason = ""
-    if s1 is None:
+    if faq is not None:
+        pass  # curated question match: confident by construction
+    elif s1 is None:
         abstained = True
         abstain_reason = "no usable retrieval scores"
     elif s1 < MIN_TOP:
@@ -455,7 +818,7 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
     has_alpha = bool(re.search(r"[A-Za-zÄÖÜäöü\u0600-\u06FF]", query))
 
     broad_clarify = topic_only
-    if has_alpha and (not broad_clarify) and len(query.strip()) <= 32 and len(_kw2) <= 2:
+    if has_alpha and (not broad_clarify) and faq is None and len(query.strip()) <= 32 and len(_kw2) <= 2:
         borderline = (s1 is not None and s1 < (MIN_TOP * 1.5))
         ambiguous = (s2 is not None and (s1 - s2) < (MIN_GAP * 1.5))
         if borderline or ambiguous:
@@ -470,10 +833,13 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
         + " "
         + " ".join(os.path.basename(d["path"]) for d in top)
     ).lower()
-    if (not topic_only) and _kw2 and not any(t in _hay for t in _kw2):
+    if (not topic_only) and faq is None and _kw2 and not any(t in _hay for t in _kw2):
         abstained = True
         abstain_reason = "no lexical overlap with retrieved sources"
 
+    tm.mark("gating")
+    _OUTCOMES.inc(mode=tm.label, outcome="abstain" if abstained else "clarify" if broad_clarify else "answered")
+
     # -------- Sources (Markdown with highlights) --------
     def _short(s, n=240):
         s = " ".join(s.split())
@@ -579,34 +945,43 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
             suffix = f" (`{src_file}`)" if src_file else ""
             answer_text = f"{answer_text}\n\nSource: [{answer_src + 1}]{suffix}"
     sources = "### Sources\n" + header + "\n\n" + "\n\n".join(lines)
-    log_query({
-        "ts": _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds"),
-        "query": query,
-        "mode": mode,
-        "k": k,
-        "include": include or "",
-        "exclude": exclude or "",
-        "lang_forced": lang,
-        "lang_detected": q_lang,
-        "top_files": "|".join(os.path.basename(d["path"]) for d in top),
-        "top_langs": "|".join(d["lang"] for d in top),
-        "answer_len": len(answer_text),
-        "corpus_size": len(docs),
-    })
+    if LOG_QUERIES and not _is_warmup():  # warm-up replays must not feed the next warm-up
+        log_query({
+            "ts": _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds"),
+            "query": query,
+            "mode": mode,
+            "k": k,
+            "include": include or "",
+            "exclude": exclude or "",
+            "lang_forced": lang,
+            "lang_detected": q_lang,
+            "top_files": "|".join(os.path.basename(d["path"]) for d in top),
+            "top_langs": "|".join(d["lang"] for d in top),
+            "answer_len": len(answer_text),
+            "corpus_size": len(ix.docs),
+        })
     stamp = _dt.datetime.now(_dt.timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
     sources = f"Time: {stamp} • Mode: {mode} • k={k} • lang={q_lang}\n\n" + sources
+    tm.mark("render")
 
     if trace:
         # Minimal, stable trace for demos: what settings were used + what sources were chosen.
         trace_payload = trace_payload or {}
         trace_payload.update(
             {
-                "final_mode": mode,
+                "final_mode": "FAQ" if faq is not None else mode,
                 "final_q_lang": q_lang,
                 "clarify": bool(broad_clarify),
                 "abstained": bool(abstained),
                 "abstain_reason": abstain_reason,
                 "tfidf_pool": _tfidf_pool(),
+                "faq": {
+                    "enabled": use_faq,
+                    "hit": faq is not None,
+                    "question": faq[0] if faq is not None else None,
+                    "hit_rate": round(faq_hit_rate(), 4),
+                    "lookups": int(_FAQ.value(result="hit") + _FAQ.value(result="miss")),
+                },
                 "top_docs": [
                     {
                         "rank": j + 1,
@@ -638,7 +1013,7 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
 
         sources_v1 = []
         for rank, idx in enumerate(chosen, start=1):
-            d = docs[idx]
+            d = ix.docs[idx]
             chunk_text = d.get("text", "") or ""
             chunk_hash = hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()
             retrieval_score = _to_01(_score_for(idx))
@@ -668,115 +1043,282 @@ def answer(query, k=3, mode="Semantic", include="", lang="auto", exclude="", lin
             "verdict_reason": sniper_reason,
             "answer": None if sniper_verdict == TrafficLight.RED else answer_text,
             "sources": sources_v1,
-            "model_version": MODEL_NAME,
+            "model_version": EMBEDDING_MODEL,
             "pipeline_version": pipeline_version,
         }
+        tm.mark("trace")
+        trace_payload["timings_ms"] = tm.as_dict()
 
         return answer_text, sources, json.dumps(trace_payload, ensure_ascii=False, indent=2)
 
     return answer_text, sources
 
 # ----------------- In-app Eval (lazy import to avoid circular) -----------------
-def eval_ui(k, include, lang):
-    from eval import evaluate_run
+# Runs as a background job (app_pkg.jobs) on its own pool, never on the request worker that
+# clicked: progress + cancel in the UI, results memoized per (corpus fingerprint, model, k, include, lang).
+EVAL_FILE = "data/wohngeld_eval.jsonl"
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", "1"))
+EVAL_MEMO = int(os.getenv("EVAL_MEMO", "32"))  # memoized eval results (0 = off)
+EVAL_POLL_S = 0.5
+eval_jobs = JobRunner(workers=EVAL_WORKERS, memo=EVAL_MEMO, name="eval")
+
+def eval_key(k, include, lang, corpus=None):
+    """Memo key: the corpus snapshot and eval file contents, the embedding model and the options.
+
+    Cheap on the caller's thread: a loaded corpus contributes its snapshot fingerprint, an
+    unloaded one the (path, size, mtime) fingerprint of its doc root; nothing is built here.
+    """
+    name = corpus or DEFAULT_CORPUS
+    if name not in CORPORA:
+        raise ValueError(f"unknown corpus: {name!r} (known: {', '.join(CORPORA)})")
+    ix = corpora.peek(name)
+    if ix is None:
+        corpus_fp = corpus_fingerprint(CORPORA[name])
+    else:
+        corpus_fp = getattr(ix, "fingerprint", None) or f"v{ix.version}"
+    try:
+        st = os.stat(EVAL_FILE)
+        eval_fp = f"{st.st_size}:{st.st_mtime_ns}"
+    except OSError:
+        eval_fp = ""
+    model = "" if SEMANTIC_DISABLED else EMBEDDING_MODEL
+    return (name, corpus_fp, eval_fp, model, int(k), (include or "").strip().lower(), lang or "auto")
+
+def eval_ranking(ix: CorpusIndex, query, mode, q_lang, k):
+    """Eval candidates for one query: (ranked ids, score per id) in "tfidf"/"semantic"/"hybrid".
+
+    Shared by the in-app eval and `cli.py eval`, so both rank exactly like answer()
+    (language-routed TF-IDF pool, per-language embedding slice, rrf_fuse). Semantic
+    modes fall back to TF-IDF when no embedding backend is available.
+    """
+    m = mode.lower()
+    if m in ("hybrid", "semantic"):
+        _init_embeddings(ix)
+        if not _semantic_ready:
+            m = "tfidf"
+    if m == "tfidf":
+        return ix.tfidf_rank(query, tfidf_pool(k), q_lang)
+    sem_order, sem_scores = ix.semantic_search(_encode_query(query), q_lang)
+    if m == "semantic":
+        return sem_order, sem_scores
+    tf_order, _ = ix.tfidf_rank(query, tfidf_pool(k), q_lang)
+    return rrf_fuse(tf_order, sem_order)
+
+def _run_eval_job(job, k, include, lang, corpus=None):
+    from app_pkg.evaluation import KeywordIndex, rank_metrics, run_eval
     # self-contained eval (no cli import)
     k = int(k)
+    ix = get_corpus(corpus)
     includes = [s.strip().lower() for s in (include or "").split(",") if s.strip()] or None
 
     # load eval items
     items = []
-    try:
-        with open("data/wohngeld_eval.jsonl", "r", encoding="utf-8") as f:
-            for line in f:
-                line = line.strip()
-                if line:
-                    items.append(json.loads(line))
-    except Exception as e:
-        return f"**Eval error:** {e}"
-
-    def _ground_truth_ids(item):
-        kw = [x.lower() for x in item.get("keywords", [])]
-        lang_item = item.get("lang", "en")
-        ids = []
-        for i, d in enumerate(docs):
-            if d["lang"] != lang_item:
-                continue
-            if not file_ok(d["path"], includes, None):
-                continue
-            text = d["text"].lower()
-            if not kw or any(kword in text for kword in kw):
-                ids.append(i)
-        return ids
-
-    def _predict_ids(query, mode):
-        m = mode.lower()
-        if m == "tfidf":
-            passages, scores = tfidf.search(query, k=max(k * 10, 200))
-            order = np.argsort(scores)[::-1]
-            idx_map = [DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-            ranked = [idx for j in order for idx in [idx_map[j]] if idx is not None]
-        elif m == "hybrid":
-            _init_embeddings()
-            if not _semantic_ready:
-                passages, scores = tfidf.search(query, k=max(k * 10, 200))
-                order = np.argsort(scores)[::-1]
-                idx_map = [DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-                ranked = [idx for j in order for idx in [idx_map[j]] if idx is not None]
-                ranked = [i for i in ranked if file_ok(docs[i]["path"], includes, None)]
-                q_lang = detect_lang(query)
-                return _prefer_lang(ranked, q_lang, k)
-            q_emb = embedder.encode(query, convert_to_numpy=True)
-            sem_scores = cos_scores_np(q_emb, doc_embeddings)
-            sem_order = sem_scores.argsort()[::-1].tolist()
-            passages, scores = tfidf.search(query, k=max(k * 10, 200))
-            order = np.argsort(scores)[::-1]
-            idx_map = [DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-            tf_order = [idx for j in order for idx in [idx_map[j]] if idx is not None]
-            # Guardrail: only let semantic vote with its top-N to avoid long-tail noise.
-            SEM_CAND = 300
-            TF_CAND = min(len(tf_order), 1200)
-            k0 = 90.0
-
-            rrf = {}
-            for r, i in enumerate(tf_order[:TF_CAND]):
-                rrf[i] = rrf.get(i, 0.0) + 1.0 / (k0 + r + 1)
-            for r, i in enumerate(sem_order[:SEM_CAND]):
-                rrf[i] = rrf.get(i, 0.0) + 1.0 / (k0 + r + 1)
-
-            ranked = [i for i, _ in sorted(rrf.items(), key=lambda x: x[1], reverse=True)]
-        else:  # semantic
-            _init_embeddings()
-            if not _semantic_ready:
-                passages, scores = tfidf.search(query, k=max(k * 10, 200))
-                order = np.argsort(scores)[::-1]
-                idx_map = [DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-                ranked = [idx for j in order for idx in [idx_map[j]] if idx is not None]
-                ranked = [i for i in ranked if file_ok(docs[i]["path"], includes, None)]
-                q_lang = detect_lang(query)
-                return _prefer_lang(ranked, q_lang, k)
-            q_emb = embedder.encode(query, convert_to_numpy=True)
-            scores = cos_scores_np(q_emb, doc_embeddings)
-            ranked = scores.argsort()[::-1].tolist()
+    with open(EVAL_FILE, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                items.append(json.loads(line))
+
+    def _predict_ids(query, mode, q_lang, k):
+        job.check()
+        ranked, _ = eval_ranking(ix, query, mode, q_lang, k)
 
         # filename filter + language preference to top-k
-        ranked = [i for i in ranked if file_ok(docs[i]["path"], includes, None)]
-        q_lang = detect_lang(query)
-        ranked = _prefer_lang(ranked, q_lang, k)
+        ranked = [i for i in ranked if file_ok(ix.docs[i]["path"], includes, None)]
+        ranked = ix.prefer_lang(ranked, q_lang, k)
         return ranked
 
-    gt = [_ground_truth_ids(it) for it in items]
+    modes = ["tfidf", "semantic", "hybrid"]
+    job.total = len(items) * len(modes)
+    kw_index = KeywordIndex(ix.docs)
+    keep = (lambda p: file_ok(p, includes, None)) if includes else None
+    gt = [kw_index.ground_truth([x.lower() for x in it.get("keywords", [])], it.get("lang", "en"), keep=keep) for it in items]
+    q_langs = detect_langs([it["q"] for it in items]) if lang in (None, "", "auto") else [lang] * len(items)
+    _init_embeddings(ix)  # once, before the mode threads start
+    job.check()
+    runs = run_eval([it["q"] for it in items], q_langs, _predict_ids, modes, [k], progress=job.advance)
     lines = []
-    for m in ["tfidf", "semantic", "hybrid"]:
-        preds = [_predict_ids(it["q"], m) for it in items]
-        res = evaluate_run(gt, preds, k=k)
-        lines.append(f"- {m.title()}: **P@{k} = {res['p_at_k']:.2f}**, **R@{k} = {res['r_at_k']:.2f}**")
-    return "### Eval (data/wohngeld_eval.jsonl)\n" + "\n".join(lines)
+    for m in modes:
+        res = rank_metrics(gt, runs[m]["predictions"], [k])[k]
+        p50 = runs[m]["latency"]["p50_ms"]
+        lines.append(
+            f"- {m.title()}: **P@{k} = {res['p_at_k']:.2f}**, **R@{k} = {res['r_at_k']:.2f}**, "
+            f"MRR = {res['mrr']:.2f}, nDCG@{k} = {res['ndcg']:.2f} (p50 {p50:.1f} ms)"
+        )
+    return f"### Eval ({EVAL_FILE})\n" + "\n".join(lines)
+
+def start_eval(k, include, lang, corpus=None):
+    """Background eval job for these options (memoized result, the running job, or a new one)."""
+    return eval_jobs.submit(eval_key(k, include, lang, corpus), lambda job: _run_eval_job(job, k, include, lang, corpus))
+
+def eval_status_md(job) -> str:
+    st = job.status()
+    if st["state"] == "done":
+        note = " _(cached)_" if st["memo_hit"] else f" _({st['elapsed_s']:.1f} s)_"
+        return job.result + "\n\n" + note.strip()
+    if st["state"] == "cancelled":
+        return "Eval cancelled."
+    if st["state"] == "failed":
+        return f"**Eval error:** {st['error']}"
+    if st["state"] == "queued":
+        return "Eval queued…"
+    return f"Evaluating… {st['done']}/{st['total']} rankings ({st['progress']:.0%}, {st['elapsed_s']:.1f} s)"
+
+def eval_ui(k, include, lang, corpus=None):
+    """Blocking eval: start (or reuse) the background job and wait for its markdown."""
+    job = start_eval(k, include, lang, corpus)
+    job.wait()
+    return eval_status_md(job)
+
+def eval_ui_stream(k, include, lang, corpus=None):
+    """UI handler: yields progress while the job runs on the eval pool, then the result."""
+    job = start_eval(k, include, lang, corpus)
+    while not job.wait(EVAL_POLL_S):
+        yield eval_status_md(job)
+    yield eval_status_md(job)
+
+def cancel_eval_ui(k, include, lang, corpus=None):
+    if eval_jobs.cancel(eval_key(k, include, lang, corpus)):
+        return "Cancelling eval…"
+    return "No eval running for these settings."
+
+def reload_ui(corpus):
+    ix = reload_corpus(corpus, wait=True)
+    return f"Reloaded **{ix.name}** → index version {ix.version} ({len(ix.docs)} passages)."
 def _reset_defaults():
     # k, mode, include, exclude, lang, link_mode
     return 3, "TF-IDF", "wohngeld", "", "auto", "github"
 def _fill_q(s: str) -> str:
     return s or ""
 
+# --- Footprint report (app_pkg.footprint): `cli.py stats index`, server GET /stats ---
+# >0: trace allocations with tracemalloc while startup() builds the index/model and keep the top N
+# (PYTHONTRACEMALLOC=1 traces from interpreter start instead; tracing stops after startup either way).
+TRACEMALLOC_TOP = int(os.getenv("TRACEMALLOC_TOP", "0"))
+startup_trace = StartupTrace(TRACEMALLOC_TOP or 10)
+
+def startup(names=None, semantic: bool = False, trace_top: int = None):
+    """Build the default corpus (and `names`), optionally the model, under the startup trace."""
+    import tracemalloc
+
+    top = TRACEMALLOC_TOP if trace_top is None else int(trace_top)
+    traced = top > 0 or tracemalloc.is_tracing()
+    if traced:
+        startup_trace.top = top or startup_trace.top
+        startup_trace.start()
+    try:
+        for name in [DEFAULT_CORPUS, *(names or [])]:
+            get_corpus(name)
+        if semantic:
+            for name in [DEFAULT_CORPUS, *(names or [])]:
+                _init_embeddings(get_corpus(name))
+    finally:
+        if traced:
+            startup_trace.stop()
+
+def footprint_report(names=None) -> dict:
+    """Memory report: loaded corpora (or `names`, built if needed), model, caches, RSS, startup trace."""
+    names = list(names) if names else corpora.loaded()
+    report_corpora = {}
+    for name in names:
+        ix = get_corpus(name)
+        report_corpora[name] = {"version": ix.version, "fingerprint": ix.fingerprint, **ix.footprint()}
+    idx_bytes = sum(c["bytes"] for c in report_corpora.values())
+    n_passages = sum(c["passages"]["passages"] for c in report_corpora.values())
+    model = model_footprint(embedder) if _semantic_ready else None
+    return {
+        "timestamp": _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds"),
+        "process": process_memory(),
+        "model": model,
+        "corpora": report_corpora,
+        "totals": {
+            "passages": n_passages,
+            "index_bytes": idx_bytes,
+            "model_bytes": model["bytes"] if model else 0,
+            "bytes_per_passage": round(idx_bytes / max(1, n_passages), 1),
+        },
+        "caches": {
+            "query_embeddings": _cached_query_embedding.cache_info()._asdict(),
+            "lang_detect": detect_cache_info(),
+            "corpus_registry": {
+                "loaded": len(corpora.loaded()),
+                "bytes": corpora.nbytes(),
+                "budget_bytes": corpora.budget_bytes,
+                "evictions": corpora.evictions,
+            },
+            "eval_results": {"memoized": eval_jobs.stats()["memoized"], "max": EVAL_MEMO},
+        },
+        "startup_trace": startup_trace.report,
+    }
+
+# --- Gradio request path (app_pkg.ui): queued batch=True Search, retrieval offloaded to a pool ---
+UI = ui_config_from_env(default_workers=runtime.default_workers())
+UI_ANSWER_ARGS = ("k", "mode", "include", "lang", "exclude", "link_mode", "level", "corpus")
+_ui_offload = None
+
+def _offload_init(runtime_cfg=None):
+    """Offload worker start: thread limits, then the default index (the model only with UI_EAGER_MODEL=1)."""
+    if runtime_cfg is not None:
+        runtime.apply(runtime_cfg)
+    # The UI defaults to TF-IDF: N workers holding a model nobody asked for multiply the footprint.
+    startup(semantic=UI.eager_model)
+    if float(os.getenv("DOCS_WATCH_S", "0")) > 0:
+        start_docs_watcher()  # process workers watch their own snapshots
+    if WARMUP_ON_START:
+        start_warmer()  # caches are per process
+
+def _sync_corpus(name, fingerprint):
+    """Follow the UI process' snapshot: reload when it differs from ours and the docs moved on."""
+    ix = corpora.peek(name or DEFAULT_CORPUS)
+    mine = getattr(ix, "fingerprint", None)
+    if not fingerprint or mine in (None, fingerprint):
+        return
+    if corpus_fingerprint(CORPORA[name or DEFAULT_CORPUS]) != mine:
+        reload_corpus(name, wait=True)
+
+def answer_batch(requests) -> list:
+    """Batched answer API: [{"query", "k", "mode", ..., "trace": bool}] -> [(answer, sources, trace JSON or "")].
+
+    Semantic/Hybrid requests run on threads so their query encodes share micro-batches.
+    A failing request gets an error answer instead of failing the whole batch.
+    """
+    def one(req):
+        kw = {a: req[a] for a in UI_ANSWER_ARGS if a in req}
+        try:
+            _sync_corpus(kw.get("corpus"), req.get("index_fp"))
+            if req.get("trace"):
+                return answer(req["query"], trace=True, **kw)
+            a, s = answer(req["query"], **kw)
+            return a, s, ""
+        except Exception as e:
+            return f"Error: {type(e).__name__}: {e}", "", ""
+
+    if len(requests) > 1 and any(r.get("mode") in ("Semantic", "Hybrid") for r in requests):
+        with concurrent.futures.ThreadPoolExecutor(min(len(requests), EMBED_BATCH_MAX), thread_name_prefix="batch") as pool:
+            return list(pool.map(one, requests))
+    return [one(r) for r in requests]
+
+def ui_offload() -> AnswerOffload:
+    """The UI's answer pool (UI_POOL / UI_WORKERS), created on first use."""
+    global _ui_offload
+    if _ui_offload is None:
+        cfg = runtime.from_env("process", UI.workers) if UI.pool == "process" else None
+        _ui_offload = AnswerOffload(answer_batch, UI.pool, UI.workers, initializer=_offload_init, initargs=(cfg,))
+    return _ui_offload
+
+def answer_ui_batch(queries, ks, modes, includes, langs, excludes, link_modes, show_traces, corpus_names):
+    """Gradio `batch=True` Search handler: one list per input in, one list per output back."""
+    reqs = []
+    for q, k, mode, inc, lang, exc, lm, show, name in zip(queries, ks, modes, includes, langs, excludes, link_modes,
+                                                         show_traces, corpus_names):
+        ix = corpora.peek(name or DEFAULT_CORPUS)
+        reqs.append({
+            "query": q, "k": int(k), "mode": mode, "include": inc, "lang": lang, "exclude": exc, "link_mode": lm,
+            "corpus": name, "trace": bool(show), "index_fp": getattr(ix, "fingerprint", None),
+        })
+    res = ui_offload().run(reqs)
+    return [r[0] for r in res], [r[1] for r in res], [r[2] for r in res]
+
 # ----------------- UI -----------------
 
 # Gradio UI is constructed only on demand, not at import-time.
@@ -791,8 +1333,12 @@ def build_demo():
     Kept out of module import-time so tests can import `app` even when Gradio
     isn't installed.
     """
+    global gr
     if gr is None:
-        raise RuntimeError("Gradio is not installed. Install it to run the UI.")
+        try:
+            import gradio as gr
+        except Exception:
+            raise RuntimeError("Gradio is not installed. Install it to run the UI.") from None
 
     with gr.Blocks(css=CSS, title="P1 — Mini FAQ (EN/DE/AR)") as demo:
         gr.Markdown("### Multilingual FAQ (EN/DE/AR) — language-aware retrieval")
@@ -834,17 +1380,17 @@ def build_demo():
                 value="github",
                 scale=1,
             )
+            corpus = gr.Dropdown(
+                label="Corpus",
+                choices=corpora.names(),
+                value=DEFAULT_CORPUS,
+                scale=1,
+            )
             show_trace = gr.Checkbox(label="Show trace", value=False, scale=1)
         with gr.Row():
             sample = gr.Dropdown(
                 label="Sample question",
-                choices=[
-                    "Welche Unterlagen brauche ich für den Wohngeldantrag?",
-                    "Wo stelle ich den Wohngeldantrag in meiner Stadt?",
-                    "Wie lange dauert die Bearbeitung vom Wohngeld?",
-                    "Wie wird die Höhe des Wohngelds berechnet?",
-                    "Wann sollte ich den Weiterleistungsantrag stellen?",
-                ],
+                choices=SAMPLE_QUESTIONS,
                 value=None,
                 scale=3,
             )
@@ -852,24 +1398,24 @@ def build_demo():
         src = gr.Markdown(label="Top sources", elem_id="source_box")
         tr = gr.Textbox(label="Trace (JSON)", lines=10, interactive=True, show_copy_button=True)
 
-        def answer_ui(query, k, mode, include, lang, exclude, link_mode, show_trace):
-            if show_trace:
-                a, s, t = answer(query, k, mode, include, lang, exclude, link_mode, trace=True)
-                return a, s, t
-            a, s = answer(query, k, mode, include, lang, exclude, link_mode, trace=False)
-            return a, s, ""
-
         go = gr.Button("Search")
-        go.click(answer_ui, [q, k, mode, include, lang, exclude, link_mode, show_trace], [ans, src, tr])
+        go.click(answer_ui_batch, [q, k, mode, include, lang, exclude, link_mode, show_trace, corpus], [ans, src, tr],
+                 batch=True, max_batch_size=UI.max_batch, concurrency_limit=UI.concurrency)
         sample.change(_fill_q, [sample], [q])
         reset = gr.Button("Reset filters")
         reset.click(_reset_defaults, [], [k, mode, include, exclude, lang, link_mode])
+        with gr.Row():
+            rbtn = gr.Button("Reload docs")
+            rmd = gr.Markdown()
+            rbtn.click(reload_ui, [corpus], [rmd])
         with gr.Row():
             ebtn = gr.Button("Evaluate (P@K / R@K)")
+            cbtn = gr.Button("Cancel eval")
             emd = gr.Markdown()
-            ebtn.click(eval_ui, [k, include, lang], [emd])
+            ebtn.click(eval_ui_stream, [k, include, lang, corpus], [emd])
+            cbtn.click(cancel_eval_ui, [k, include, lang, corpus], [emd])
 
-    return demo
+    return demo.queue(default_concurrency_limit=UI.concurrency, max_size=UI.queue_size or None)
 
 
 # Expose a module-level name for compatibility. It's only built on demand.
@@ -877,5 +1423,11 @@ demo = None
 
 
 if __name__ == "__main__":
+    runtime.apply(runtime.from_env())
+    if float(os.getenv("DOCS_WATCH_S", "0")) > 0:
+        start_docs_watcher()
+    if WARMUP_ON_START and UI.pool != "process":
+        start_warmer()
+    ui_offload().start()  # index + model loaded in every worker before the first user
     demo = build_demo()
     demo.launch()
@@ -0,0 +1,258 @@
+"""
+Bulk answering: stream questions from JSONL, answer them on a worker pool and
+write the answers back as JSONL in input order.
+
+- input (`read_items()`): one question per line, either a JSON object with
+  "query" (or "question" / "q"), an optional "id" and per-item overrides
+  (mode, k, include, exclude, lang, level, corpus), a JSON string, or plain
+  text. Blank lines and "#" comments are skipped; "-" reads stdin.
+- order: at most `window` questions are pending; a row is written as soon as
+  every earlier row is, so output order equals input order while memory is
+  bounded by the window, not by the file.
+- resume (`completed()`): every row carries its input line number "n"; rerun
+  with the same output file and already answered lines are skipped (a torn
+  last line from an interrupted run is cut off first), the rest is appended.
+- duplicates: identical questions with identical options are answered once
+  (the last `memo` distinct ones are remembered) and the row is repeated.
+- progress: `progress(stats)` every `progress_s` seconds and once at the end
+  (done, errors, duplicates, q/s, item latency p50/p95).
+- entry points: `cli.py ask --batch` and `ask.py --batch` both go through
+  `item_options()` (per-item answer() overrides) and `run_ask_batch()`
+  (resume/overwrite, stderr progress, final stats line).
+
+Encoding is batched by the caller's `answer()`: the workers' concurrent query
+embeddings are coalesced by the app's micro-batcher (`app_pkg.batching`).
+
+    with open("answers.jsonl", "a", encoding="utf-8") as out:
+        run_batch(read_items("questions.jsonl", skip=completed("answers.jsonl")), fn, out, workers=4)
+
+Dependency-light (stdlib only; no imports from app.py).
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+QUERY_KEYS = ("query", "question", "q")
+# answer() options an item may override (the same set server.py accepts per request).
+ITEM_OPTIONS = ("k", "mode", "include", "exclude", "lang", "level", "file_agg", "corpus", "strict")
+
+
+def parse_item(line: str):
+    """Item dict for one input line ({"error": ...} if unusable), None for blank/comment lines."""
+    s = line.strip()
+    if not s or s.startswith("#"):
+        return None
+    try:
+        obj = json.loads(s)
+    except ValueError:
+        if s.startswith(("{", "[")):
+            return {"query": "", "error": "invalid JSON"}
+        return {"query": s}
+    if isinstance(obj, str):
+        obj = {"query": obj}
+    if not isinstance(obj, dict):
+        return {"query": "", "error": "expected a JSON object, string or plain text"}
+    item = dict(obj)
+    q = next((item.pop(key) for key in QUERY_KEYS if isinstance(item.get(key), str) and item[key].strip()), "")
+    for key in QUERY_KEYS:
+        item.pop(key, None)
+    item["query"] = q.strip()
+    if not item["query"]:
+        item["error"] = "missing query"
+    return item
+
+
+def read_items(path: str, skip=()):
+    """Yield (line number, item) for every question line not in `skip` (streaming)."""
+    f = sys.stdin if path == "-" else open(path, "r", encoding="utf-8")
+    try:
+        for n, line in enumerate(f):
+            if n in skip:
+                continue
+            item = parse_item(line)
+            if item is not None:
+                yield n, item
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def count_items(path: str):
+    """Question lines in `path` (None for stdin), for progress percentages."""
+    if path == "-":
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return sum(1 for line in f if line.strip() and not line.lstrip().startswith("#"))
+
+
+def completed(out_path: str) -> set:
+    """Input line numbers already answered in `out_path`; truncates a torn trailing line."""
+    done = set()
+    if not out_path or not os.path.exists(out_path):
+        return done
+    good = 0  # byte offset after the last complete row
+    with open(out_path, "rb") as f:
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break
+            try:
+                done.add(int(json.loads(raw)["n"]))
+            except (ValueError, KeyError, TypeError):
+                break
+            good += len(raw)
+    if good != os.path.getsize(out_path):
+        with open(out_path, "r+b") as f:
+            f.truncate(good)
+    return done
+
+
+def item_options(item: dict, defaults: dict) -> dict:
+    """answer() keyword arguments for `item`: its ITEM_OPTIONS overrides over `defaults`."""
+    opts = {**defaults, **{key: item[key] for key in ITEM_OPTIONS if key in item}}
+    if "k" in opts:
+        opts["k"] = int(opts["k"])
+    return opts
+
+
+def answer_row(ans: str, src: str, trace: dict, with_trace: bool = False) -> dict:
+    """Output fields for one answer()/server response."""
+    row = {
+        "answer": ans,
+        "sources": src,
+        "mode": trace.get("final_mode") or trace.get("mode"),
+        "lang": trace.get("final_q_lang") or trace.get("q_lang"),
+        "abstained": bool(trace.get("abstained")),
+        "doc_ids": [d.get("id") for d in trace.get("top_docs") or []],
+    }
+    if with_trace:
+        row["trace"] = trace
+    return row
+
+
+def _percentile(sorted_vals, q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    i = min(len(sorted_vals) - 1, max(0, int(round(q * (len(sorted_vals) - 1)))))
+    return sorted_vals[i]
+
+
+def _memo_key(item: dict) -> str:
+    return json.dumps({k: v for k, v in item.items() if k != "id"}, sort_keys=True, ensure_ascii=False, default=str)
+
+
+def run_batch(items, fn, out, workers: int = 4, window: int = 0, memo: int = 10000, progress=None,
+              progress_s: float = 5.0, total: int = None) -> dict:
+    """Answer `(n, item)` pairs with `fn(item) -> dict` on `workers` threads; write rows to `out` in order.
+
+    Each row is {"n", "id", "query", **fn(item)} or {"n", "id", "query", "error"};
+    a failing item is recorded and the batch goes on. Returns the final stats.
+    """
+    workers = max(1, int(workers))
+    window = max(1, int(window or workers * 4))
+    latencies = []
+    stats = {"done": 0, "errors": 0, "duplicates": 0, "total": total, "interrupted": False}
+    t0 = last = time.perf_counter()
+
+    def timed(item):
+        t = time.perf_counter()
+        try:
+            return fn(item)
+        finally:
+            latencies.append(time.perf_counter() - t)
+
+    def write(n, item, fut):
+        row = {"n": n, "id": item.get("id", n), "query": item.get("query", "")}
+        err = item.get("error")
+        if err is None:
+            try:
+                row.update(fut.result())
+            except Exception as e:
+                err = f"{type(e).__name__}: {e}"
+        if err is not None:
+            row["error"] = err
+            stats["errors"] += 1
+        out.write(json.dumps(row, ensure_ascii=False) + "\n")
+        stats["done"] += 1
+
+    def tick(final=False):
+        nonlocal last
+        now = time.perf_counter()
+        if not final and now - last < progress_s:
+            return
+        last = now
+        out.flush()
+        elapsed = now - t0
+        lat = sorted(latencies)
+        stats.update(
+            elapsed_s=round(elapsed, 3),
+            qps=round(stats["done"] / elapsed, 2) if elapsed > 0 else 0.0,
+            p50_ms=round(_percentile(lat, 0.50) * 1000.0, 3),
+            p95_ms=round(_percentile(lat, 0.95) * 1000.0, 3),
+        )
+        if progress is not None:
+            progress(dict(stats))
+
+    pending = deque()
+    cache = OrderedDict()
+    pool = ThreadPoolExecutor(workers, thread_name_prefix="batch")
+    try:
+        for n, item in items:
+            fut = None
+            if "error" not in item:
+                key = _memo_key(item) if memo else None
+                fut = cache.get(key) if key is not None else None
+                if fut is not None:
+                    stats["duplicates"] += 1
+                    cache.move_to_end(key)
+                else:
+                    fut = pool.submit(timed, item)
+                    if key is not None:
+                        cache[key] = fut
+                        if len(cache) > memo:
+                            cache.popitem(last=False)
+            pending.append((n, item, fut))
+            while pending and (len(pending) >= window or pending[0][2] is None or pending[0][2].done()):
+                write(*pending.popleft())
+                tick()
+        while pending:
+            write(*pending.popleft())
+            tick()
+    except KeyboardInterrupt:
+        stats["interrupted"] = True  # rows written so far are complete; rerun to resume
+    finally:
+        pool.shutdown(wait=not stats["interrupted"], cancel_futures=stats["interrupted"])
+        tick(final=True)
+    return stats
+
+
+def print_progress(st: dict, resumed: int = 0, file=None):
+    """One stderr progress line for `run_batch(progress=...)`; `resumed` rows count as answered."""
+    pct = f"/{st['total']}" if st["total"] is not None else ""
+    print(f"[batch] {st['done'] + resumed}{pct} answered, {st['errors']} errors, {st['duplicates']} duplicates, "
+          f"{st['qps']} q/s, p50 {st['p50_ms']} ms, p95 {st['p95_ms']} ms", file=file or sys.stderr)
+
+
+def run_ask_batch(path: str, out_path: str, fn, workers: int = 4, resume: bool = True) -> dict:
+    """Answer the questions in `path` into `out_path` ("-" = stdout) with `fn(item) -> row fields`.
+
+    Resumes an existing output file unless `resume=False` (then it is overwritten);
+    prints progress and the final stats (with "resumed" = rows skipped) to stderr.
+    """
+    to_stdout = out_path == "-"
+    done = set() if to_stdout or not resume else completed(out_path)
+    out = sys.stdout if to_stdout else open(out_path, "a" if resume else "w", encoding="utf-8")
+    try:
+        stats = run_batch(read_items(path, skip=done), fn, out, workers=workers,
+                          progress=lambda st: print_progress(st, len(done)), total=count_items(path))
+    finally:
+        if not to_stdout:
+            out.close()
+    stats["resumed"] = len(done)
+    print(json.dumps(stats), file=sys.stderr)
+    return stats
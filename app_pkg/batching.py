@@ -0,0 +1,122 @@
+"""
+Micro-batching for query embeddings.
+
+Concurrent Semantic/Hybrid requests each need one query embedding. Encoding
+them one by one runs the transformer at batch size 1; `MicroBatcher` instead
+queues them, lets a single dispatcher thread collect whatever arrives within
+`max_wait_ms` (up to `max_batch` texts), encodes the lot in one call and hands
+each caller its own row.
+
+Dependency-light: the encoder is any callable `list[str] -> array (n, dim)`.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class MicroBatcher:
+    """Coalesce concurrent `encode(text)` calls into batched `encode_batch(texts)` calls.
+
+    max_wait_ms=0 (or max_batch=1) disables batching: `encode()` calls the
+    encoder directly on the caller's thread, counters still update.
+    """
+
+    def __init__(self, encode_batch, max_batch: int = 32, max_wait_ms: float = 3.0):
+        self.encode_batch = encode_batch
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_s = max(0.0, float(max_wait_ms)) / 1000.0
+        self._q = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stats = {
+            "requests": 0,
+            "batches": 0,
+            "errors": 0,
+            "max_batch_seen": 0,
+            "queue_wait_ms": 0.0,
+            "encode_ms": 0.0,
+        }
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_batch > 1 and self.max_wait_s > 0.0
+
+    def encode(self, text: str, timeout: float = None) -> np.ndarray:
+        """Embedding of `text` (1-D), computed in a batch with concurrent callers."""
+        if not self.enabled:
+            return self._run([text], [time.perf_counter()])[0]
+        fut = Future()
+        self._q.put((text, time.perf_counter(), fut))
+        self._ensure_thread()
+        return fut.result(timeout)
+
+    def stats(self) -> dict:
+        """Throughput/latency counters (totals plus per-request/per-batch means)."""
+        with self._lock:
+            s = dict(self._stats)
+        s["mean_batch"] = round(s["requests"] / s["batches"], 2) if s["batches"] else 0.0
+        s["mean_queue_wait_ms"] = round(s["queue_wait_ms"] / s["requests"], 3) if s["requests"] else 0.0
+        s["mean_encode_ms"] = round(s["encode_ms"] / s["batches"], 3) if s["batches"] else 0.0
+        s["queue_wait_ms"] = round(s["queue_wait_ms"], 3)
+        s["encode_ms"] = round(s["encode_ms"], 3)
+        s["max_batch"] = self.max_batch
+        s["max_wait_ms"] = self.max_wait_s * 1000.0
+        return s
+
+    # ----------------- Dispatcher -----------------
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="embed-batcher", daemon=True)
+                self._thread.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._q.get()]
+            deadline = time.perf_counter() + self.max_wait_s
+            while len(batch) < self.max_batch:
+                left = deadline - time.perf_counter()
+                if left <= 0:
+                    break
+                try:
+                    batch.append(self._q.get(timeout=left))
+                except queue.Empty:
+                    break
+            texts = [b[0] for b in batch]
+            futs = [b[2] for b in batch]
+            try:
+                out = self._run(texts, [b[1] for b in batch])
+            except Exception as e:
+                for f in futs:
+                    f.set_exception(e)
+                continue
+            for f, row in zip(futs, out):
+                f.set_result(row)
+
+    def _run(self, texts, enqueued):
+        t0 = time.perf_counter()
+        try:
+            out = np.asarray(self.encode_batch(texts))
+            if out.ndim != 2 or len(out) != len(texts):
+                raise ValueError(f"encode_batch returned shape {out.shape} for {len(texts)} texts")
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+            raise
+        t1 = time.perf_counter()
+        with self._lock:
+            s = self._stats
+            s["requests"] += len(texts)
+            s["batches"] += 1
+            s["max_batch_seen"] = max(s["max_batch_seen"], len(texts))
+            s["queue_wait_ms"] += sum(t0 - t for t in enqueued) * 1000.0
+            s["encode_ms"] += (t1 - t0) * 1000.0
+        return out
@@ -0,0 +1,110 @@
+"""
+Embedder backends for Semantic/Hybrid retrieval.
+
+Everything that embeds text (passage embeddings in `CorpusIndex`, the query
+micro-batcher, `cli.py eval`) only sees the `Embedder` interface:
+
+    emb = get_embedder("hashing")        # or "sentence-transformers[:model]", "hashing:512"
+    emb.name, emb.dim                    # cache/version key, vector width
+    emb.encode_batch(["a", "b"])         # float32 array (2, dim)
+
+Backends:
+- `SentenceTransformerEmbedder`: the production model (needs the
+  `sentence_transformers` package and the weights; `ModuleNotFoundError` if
+  the package is missing, so callers can fall back to TF-IDF).
+- `HashingEmbedder`: deterministic signed feature hashing of word tokens. No
+  model, no network, ~µs per passage: lets semantic, hybrid and cache code
+  paths be tested and load-tested at any corpus size. Not a semantic model.
+
+Dependency-light (no imports from app.py).
+"""
+
+from __future__ import annotations
+
+import re
+import zlib
+from typing import Protocol, Sequence
+
+import numpy as np
+
+DEFAULT_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+
+
+class SemanticUnavailableError(RuntimeError):
+    """Raised when semantic retrieval is requested but unavailable in strict mode."""
+_WORD_RE = re.compile(r"\w{3,}", re.UNICODE)
+
+
+class Embedder(Protocol):
+    """Minimal embedding interface retrieval depends on."""
+
+    name: str  # identifies the vector space (embedding cache key, shared-index checks)
+    dim: int
+
+    def encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        """float32 array of shape (len(texts), dim); rows need not be normalized."""
+        ...
+
+
+class SentenceTransformerEmbedder:
+    """`sentence_transformers.SentenceTransformer` behind the `Embedder` interface."""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, batch_size: int = 32):
+        from sentence_transformers import SentenceTransformer  # optional dependency
+
+        self.model = SentenceTransformer(model_name)
+        self.name = model_name
+        self.dim = int(self.model.get_sentence_embedding_dimension())
+        self.batch_size = int(batch_size)
+
+    def encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        emb = self.model.encode(
+            texts, convert_to_numpy=True, batch_size=max(1, min(self.batch_size, len(texts))), show_progress_bar=False
+        )
+        return np.asarray(emb, dtype=np.float32).reshape(len(texts), self.dim)
+
+
+class HashingEmbedder:
+    """Deterministic offline stand-in: signed hashing of lowercased word tokens into `dim` buckets."""
+
+    def __init__(self, dim: int = 256):
+        self.dim = int(dim)
+        self.name = f"hashing-{self.dim}"
+
+    def encode_batch(self, texts: Sequence[str]) -> np.ndarray:
+        texts = list(texts)
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            hs = np.fromiter(
+                (zlib.crc32(t.encode("utf-8")) for t in _WORD_RE.findall(text.lower())), dtype=np.uint32
+            )
+            if hs.size:
+                signs = np.where(hs & 0x80000000, 1.0, -1.0).astype(np.float32)
+                np.add.at(out[row], (hs % self.dim).astype(np.intp), signs)
+        return out
+
+
+def parse_spec(spec: str, model_name: str = DEFAULT_MODEL):
+    """ "hashing:512" -> ("hashing", "512"); "sentence-transformers" -> (.., model_name)."""
+    kind, _, arg = (spec or "sentence-transformers").strip().partition(":")
+    kind = kind.strip().lower()
+    if kind in ("st", "sentence-transformers", "sentence_transformers"):
+        return "sentence-transformers", arg or model_name
+    if kind == "hashing":
+        return "hashing", arg or "256"
+    raise ValueError(f"unknown embedder: {spec!r} (use 'sentence-transformers[:model]' or 'hashing[:dim]')")
+
+
+def embedder_name(spec: str, model_name: str = DEFAULT_MODEL) -> str:
+    """`name` the backend for `spec` will report, without loading it."""
+    kind, arg = parse_spec(spec, model_name)
+    return arg if kind == "sentence-transformers" else f"hashing-{int(arg)}"
+
+
+def get_embedder(spec: str = None, model_name: str = DEFAULT_MODEL) -> Embedder:
+    """Build the backend for `spec` (e.g. the EMBEDDER env var)."""
+    kind, arg = parse_spec(spec, model_name)
+    if kind == "hashing":
+        return HashingEmbedder(int(arg))
+    return SentenceTransformerEmbedder(arg)
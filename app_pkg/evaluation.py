@@ -0,0 +1,158 @@
+"""
+One-pass retrieval evaluation: rank once, score every k.
+
+- `KeywordIndex` answers keyword ground truth ("passages in the item's language
+  whose text contains any keyword") from one joined, lowercased text buffer:
+  each distinct keyword is located with `str.find` once for the whole eval set
+  instead of rescanning every passage per item.
+- `rank_metrics()` turns rankings + ground truth into P/R@k, MRR@k and nDCG@k
+  for a whole list of k values with NumPy (one relevance matrix per run);
+  `per_query_metrics()` keeps the per-query arrays (e.g. to average subsets).
+- `run_eval()` ranks each query once per mode up to max(k), modes in parallel
+  threads, and records per-query latency (p50/p95/p99 next to quality).
+
+P@k and R@k follow `eval.py` (P@k divides by min(k, len(prediction)), empty
+ground truth counts as perfect recall), so single-k numbers are unchanged.
+
+Dependency-light (no imports from app.py): callers pass the passages and a
+`rank(query, mode, q_lang, k) -> [doc ids]` function.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import time
+
+import numpy as np
+
+
+class KeywordIndex:
+    """Substring keyword -> passage-id lookups over one corpus (computed once per keyword)."""
+
+    _SEP = "\x00"
+
+    def __init__(self, docs):
+        texts = [d.get("text", "").lower() for d in docs]
+        self.n = len(texts)
+        self.langs = np.array([d.get("lang", "en") for d in docs])
+        self.paths = [d.get("path", "") for d in docs]
+        self._blob = self._SEP.join(texts)
+        lens = np.fromiter((len(t) + 1 for t in texts), dtype=np.int64, count=self.n)
+        self._starts = np.concatenate(([0], np.cumsum(lens)[:-1])) if self.n else np.zeros(0, dtype=np.int64)
+        self._ends = self._starts + lens  # one past the separator
+        self._cache = {}
+
+    def ids(self, keyword: str) -> np.ndarray:
+        """Sorted ids of passages containing `keyword` (case-insensitive substring)."""
+        kw = keyword.lower()
+        hit = self._cache.get(kw)
+        if hit is None:
+            found, pos, blob = [], 0, self._blob
+            while kw:
+                pos = blob.find(kw, pos)
+                if pos < 0:
+                    break
+                i = int(np.searchsorted(self._starts, pos, side="right")) - 1
+                found.append(i)
+                pos = int(self._ends[i])  # next passage: each passage counted once
+            hit = self._cache[kw] = np.asarray(found, dtype=np.int64)
+        return hit
+
+    def ground_truth(self, keywords, lang: str, keep=None) -> list:
+        """Ids in `lang` (and passing `keep(path)`) that contain any keyword; all of them if no keywords."""
+        mask = self.langs == lang
+        if keywords:
+            any_kw = np.zeros(self.n, dtype=bool)
+            for kw in keywords:
+                any_kw[self.ids(kw)] = True
+            mask &= any_kw
+        ids = np.flatnonzero(mask).tolist()
+        return [i for i in ids if keep(self.paths[i])] if keep is not None else ids
+
+
+def relevance(ground_truth, predictions, kmax: int):
+    """(rel[q, rank] bool matrix up to `kmax`, prediction lengths, ground-truth sizes)."""
+    nq = len(ground_truth)
+    rel = np.zeros((nq, kmax), dtype=bool)
+    n_pred = np.zeros(nq, dtype=np.int64)
+    n_gt = np.zeros(nq, dtype=np.int64)
+    for q, (gt, pred) in enumerate(zip(ground_truth, predictions)):
+        gt = set(gt or ())
+        pred = list(pred)[:kmax]
+        n_pred[q], n_gt[q] = len(pred), len(gt)
+        rel[q, : len(pred)] = [p in gt for p in pred]
+    return rel, n_pred, n_gt
+
+
+def per_query_metrics(rel, n_pred, n_gt, k: int) -> dict:
+    """Per-query arrays {"p_at_k", "r_at_k", "mrr", "ndcg"} at cut-off `k` (k <= rel.shape[1])."""
+    nq = rel.shape[0]
+    if not nq:
+        return {m: np.zeros(0) for m in ("p_at_k", "r_at_k", "mrr", "ndcg")}
+    ranks = np.arange(1, k + 1)
+    top = rel[:, :k]
+    h = top.sum(axis=1)
+    first = np.where(top.any(axis=1), top.argmax(axis=1) + 1, 0)  # 1-based rank of first hit, 0 = none
+    dcg = (top / np.log2(ranks + 1)).sum(axis=1)
+    ideal = (1.0 / np.log2(ranks + 1)).cumsum()
+    n_ideal = np.minimum(n_gt, k)
+    idcg = np.where(n_ideal > 0, ideal[np.maximum(n_ideal, 1) - 1], 1.0)
+    return {
+        "p_at_k": h / np.maximum(1, np.minimum(k, n_pred)),
+        "r_at_k": np.where(n_gt > 0, h / np.maximum(1, n_gt), 1.0),
+        "mrr": np.where(first > 0, 1.0 / np.maximum(1, first), 0.0),
+        "ndcg": np.where(n_gt > 0, dcg / idcg, 1.0),
+    }
+
+
+def rank_metrics(ground_truth, predictions, ks) -> dict:
+    """{k: {"p_at_k", "r_at_k", "mrr", "ndcg"}} macro-averaged over queries."""
+    ks = sorted({int(k) for k in ks})
+    rel, n_pred, n_gt = relevance(ground_truth, predictions, max(ks))
+    out = {}
+    for k in ks:
+        per_q = per_query_metrics(rel, n_pred, n_gt, k)
+        out[k] = {m: float(v.mean()) if len(v) else 0.0 for m, v in per_q.items()}
+    return out
+
+
+def latency_percentiles(seconds) -> dict:
+    ms = np.asarray(seconds, dtype=float) * 1000.0
+    if not len(ms):
+        return {"n": 0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "mean_ms": 0.0}
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "n": int(len(ms)),
+        "p50_ms": round(float(p50), 3),
+        "p95_ms": round(float(p95), 3),
+        "p99_ms": round(float(p99), 3),
+        "mean_ms": round(float(ms.mean()), 3),
+    }
+
+
+def rank_all(queries, q_langs, rank, mode: str, k: int, progress=None):
+    """(rankings, per-query seconds) for one mode, each query ranked once at depth `k`.
+
+    `progress()` is called after every ranked query (it may raise to abort the run).
+    """
+    preds, secs = [], []
+    for q, ql in zip(queries, q_langs):
+        t0 = time.perf_counter()
+        preds.append(list(rank(q, mode, ql, k)))
+        secs.append(time.perf_counter() - t0)
+        if progress is not None:
+            progress()
+    return preds, secs
+
+
+def run_eval(queries, q_langs, rank, modes, ks, parallel: bool = True, progress=None) -> dict:
+    """{mode: {"predictions": [...], "latency": {...}}}: one ranking per query and mode at max(ks)."""
+    kmax = max(int(k) for k in ks)
+    modes = list(modes)
+    if parallel and len(modes) > 1:
+        with concurrent.futures.ThreadPoolExecutor(len(modes), thread_name_prefix="eval") as pool:
+            futs = {m: pool.submit(rank_all, queries, q_langs, rank, m, kmax, progress) for m in modes}
+            done = {m: f.result() for m, f in futs.items()}
+    else:
+        done = {m: rank_all(queries, q_langs, rank, m, kmax, progress) for m in modes}
+    return {m: {"predictions": preds, "latency": latency_percentiles(secs)} for m, (preds, secs) in done.items()}
@@ -0,0 +1,113 @@
+"""
+FAQ fast path: O(1) lookup of known questions before any retrieval.
+
+The docs already spell out the questions they answer:
+
+- "Aliasfragen" blocks (`docs/wohngeld/*_de.txt`): a bulleted list of question
+  phrasings; they map to the file's content passages (meta header, alias and
+  "Stichwörter" blocks excluded).
+- `Q:` / `A:` files (`docs/faq/**`, same layout `tools/codex_cli parse_qa`
+  reads): the question maps to the passage holding its `A:` line.
+- Question-headed passages ("Welche Unterlagen brauche ich für Wohngeld?"
+  followed by the answer lines): the question maps to that passage.
+
+Questions and queries go through the same `normalize_question()` (NFKC,
+casefold, umlaut folding ä->ae / ö->oe / ü->ue / ß->ss, combining marks and
+punctuation dropped, whitespace collapsed), so "welche unterlagen brauche ich
+fuer wohngeld" hits the same entry as the original. Anything else misses and
+`answer()` retrieves as usual.
+
+    qi = QuestionIndex(docs)
+    qi.lookup("Welche Unterlagen brauche ich für Wohngeld?")  # (normalized question, (ids...)) or None
+
+Dependency-light (stdlib only; no imports from app.py).
+"""
+
+from __future__ import annotations
+
+import unicodedata
+
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue", "ß": "ss"})
+MAX_QUESTION_CHARS = 200
+
+
+def normalize_question(s: str) -> str:
+    s = unicodedata.normalize("NFKC", s or "").casefold().translate(_UMLAUTS)
+    out = []
+    for ch in unicodedata.normalize("NFKD", s):
+        cat = unicodedata.category(ch)
+        if cat == "Mn":
+            continue  # accents, Arabic diacritics
+        out.append(" " if cat[0] in "PSZC" else ch)
+    return " ".join("".join(out).split())
+
+
+def _is_alias_block(text: str) -> bool:
+    return text.lstrip().lower().startswith("aliasfragen")
+
+
+def _is_content(text: str) -> bool:
+    t = text.lstrip().lower()
+    return not (t.startswith("aliasfragen") or t.startswith("[meta]") or t.startswith("stichwörter"))
+
+
+def _qa_questions(text: str):
+    return [line[2:].strip() for line in text.splitlines() if line.startswith("Q:") and line[2:].strip()]
+
+
+def _headed_question(text: str):
+    first, sep, rest = text.strip().partition("\n")
+    first = first.strip()
+    if sep and rest.strip() and first.endswith(("?", "؟")) and len(first) <= MAX_QUESTION_CHARS:
+        return first
+    return None
+
+
+class QuestionIndex:
+    """Normalized question -> answer passage ids for one passage list."""
+
+    def __init__(self, docs):
+        by_file = {}
+        for i, d in enumerate(docs):
+            by_file.setdefault(d["path"], []).append(i)
+
+        direct, alias = {}, {}
+        for ids in by_file.values():
+            content = [i for i in ids if _is_content(docs[i]["text"])]
+            for pos, i in enumerate(ids):
+                text = docs[i]["text"]
+                if _is_alias_block(text):
+                    for line in text.splitlines()[1:]:
+                        q = line.strip().lstrip("-•*").strip()
+                        if q:
+                            alias.setdefault(normalize_question(q), []).extend(content)
+                    continue
+                for q in _qa_questions(text):
+                    has_answer = any(line.startswith("A:") for line in text.splitlines())
+                    target = i if has_answer or pos + 1 >= len(ids) else ids[pos + 1]
+                    direct.setdefault(normalize_question(q), []).append(target)
+                q = _headed_question(text)
+                if q and not text.lstrip().startswith(("Q:", "ID:")):
+                    direct.setdefault(normalize_question(q), []).append(i)
+
+        # A passage answering the question directly ranks before an alias file's content.
+        self._map = {}
+        for table in (direct, alias):
+            for q, ids in table.items():
+                if q:
+                    self._map[q] = tuple(dict.fromkeys(self._map.get(q, ()) + tuple(ids)))
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def __contains__(self, question: str) -> bool:
+        return normalize_question(question) in self._map
+
+    def lookup(self, query: str):
+        """(normalized question, answer ids) on a hit, else None."""
+        q = normalize_question(query)
+        ids = self._map.get(q)
+        return (q, ids) if ids else None
+
+    def questions(self):
+        return list(self._map)
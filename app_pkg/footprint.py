@@ -0,0 +1,212 @@
+"""
+Memory footprint of the loaded indexes, the embedding model and the caches.
+
+Answers "how much RAM does a worker need for N passages?" from the live
+objects instead of guesses:
+
+- `csr_footprint()` / `array_footprint()`: shape, nnz, dtype and bytes of the
+  TF-IDF matrices and the embedding store. Memory-mapped buffers (shared
+  index exports) are flagged `mapped`: workers share those pages;
+- `mapping_nbytes()`: deep size estimate of a vectorizer vocabulary (dict of
+  n-gram -> column), often larger than the matrices themselves;
+- `passage_footprint()`: passages per language and per file plus the bytes
+  of the passage store (text and Python object overhead for in-memory lists);
+- `model_footprint()`: parameter count and bytes of a torch-backed embedder;
+- `StartupTrace`: tracemalloc top allocators while the index is built and the
+  model loads (then tracing stops: it slows every allocation);
+- `process_memory()`: current and peak RSS.
+
+`CorpusIndex.footprint()` assembles the per-corpus part, `app.footprint_report()`
+the rest (`cli.py stats index`, server `GET /stats`); `render_text()` prints it.
+
+Dependency-light (NumPy + stdlib; no imports from app.py).
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import tracemalloc
+from collections import Counter
+
+import numpy as np
+
+MiB = 1024.0 * 1024.0
+
+
+def is_mapped(a) -> bool:
+    """True if `a` (or an array it views) is backed by a memory-mapped file."""
+    while a is not None:
+        if isinstance(a, np.memmap):
+            return True
+        a = getattr(a, "base", None)
+    return False
+
+
+def array_footprint(a) -> dict:
+    if a is None:
+        return None
+    return {"shape": list(a.shape), "dtype": str(a.dtype), "bytes": int(a.nbytes), "mapped": is_mapped(a)}
+
+
+def csr_footprint(X) -> dict:
+    parts = (X.data, X.indices, X.indptr)
+    return {
+        "shape": list(X.shape),
+        "nnz": int(X.nnz),
+        "density": round(X.nnz / max(1, X.shape[0] * X.shape[1]), 6),
+        "bytes": int(sum(p.nbytes for p in parts)),
+        "mapped": any(is_mapped(p) for p in parts),
+    }
+
+
+def mapping_nbytes(d) -> int:
+    """Approximate deep size of a str -> int dict (table + keys + values)."""
+    if not d:
+        return 0
+    return sys.getsizeof(d) + sum(sys.getsizeof(k) + sys.getsizeof(v) for k, v in d.items())
+
+
+def tfidf_footprint(vectorizer, X) -> dict:
+    """One TF-IDF component: matrix stats, vocabulary size and the vectorizer's own bytes."""
+    vocab = getattr(vectorizer, "vocabulary_", None)
+    idf = getattr(vectorizer, "idf_", None)
+    out = csr_footprint(X)
+    out["vocab"] = len(vocab) if vocab is not None else int(X.shape[1])
+    out["vocab_bytes"] = mapping_nbytes(vocab)
+    out["idf_bytes"] = int(idf.nbytes) if idf is not None else 0
+    return out
+
+
+def passage_footprint(docs, text_nbytes: int = None) -> dict:
+    """Passage counts per language / file and the passage store's bytes."""
+    by_lang, by_file = Counter(), Counter()
+    for d in docs:
+        by_lang[d.get("lang", "")] += 1
+        by_file[d.get("path", "")] += 1
+    out = {
+        "passages": len(docs),
+        "files": len(by_file),
+        "by_lang": dict(sorted(by_lang.items())),
+        "by_file": dict(sorted(by_file.items())),
+        "text_bytes": int(text_nbytes) if text_nbytes is not None else sum(len(d["text"].encode("utf-8")) for d in docs),
+    }
+    if isinstance(docs, list):
+        seen, total = set(), sys.getsizeof(docs)
+        for d in docs:
+            total += sys.getsizeof(d)
+            for v in d.values():
+                if id(v) not in seen:
+                    seen.add(id(v))
+                    total += sys.getsizeof(v)
+        out["bytes"], out["mapped"] = total, False
+    else:  # shared PassageStore: one text buffer + offset arrays, decoded on access
+        arrays = [getattr(docs, a, None) for a in ("_buf", "_offsets", "_doc_path", "_doc_lang")]
+        arrays = [a for a in arrays if a is not None]
+        out["bytes"] = int(sum(getattr(a, "nbytes", 0) for a in arrays))
+        out["mapped"] = any(is_mapped(a) for a in arrays)
+    return out
+
+
+def model_footprint(embedder) -> dict:
+    """Name, dimension, parameters and bytes of the loaded embedder (None if none is loaded)."""
+    if embedder is None:
+        return None
+    out = {"name": getattr(embedder, "name", type(embedder).__name__), "dim": getattr(embedder, "dim", None),
+           "params": 0, "bytes": 0}
+    model = getattr(embedder, "model", None)
+    if model is not None and hasattr(model, "parameters"):
+        tensors = list(model.parameters()) + list(getattr(model, "buffers", lambda: [])())
+        out["params"] = int(sum(t.numel() for t in model.parameters()))
+        out["bytes"] = int(sum(t.numel() * t.element_size() for t in tensors))
+    return out
+
+
+def process_memory() -> dict:
+    """Current RSS (Linux /proc) and peak RSS of this process, in bytes."""
+    rss = None
+    try:
+        with open("/proc/self/statm", "r") as f:
+            rss = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        peak = peak if sys.platform == "darwin" else peak * 1024
+    except (ImportError, OSError):
+        peak = None
+    return {"pid": os.getpid(), "rss_bytes": rss, "peak_rss_bytes": peak}
+
+
+class StartupTrace:
+    """tracemalloc over a startup phase: `start()`, build things, `stop()` keeps the top allocators."""
+
+    def __init__(self, top: int = 10):
+        self.top = int(top)
+        self.report = None
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():  # PYTHONTRACEMALLOC=1 may have started it with the interpreter
+            tracemalloc.start()
+
+    def stop(self):
+        """Snapshot, stop tracing and return {"traced_bytes", "peak_bytes", "top": [...]} (None if not tracing)."""
+        if not tracemalloc.is_tracing():
+            return self.report
+        snap = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        cwd = os.getcwd() + os.sep
+        top = []
+        for st in snap.statistics("lineno")[: max(0, self.top)]:
+            frame = st.traceback[0]
+            where = frame.filename[len(cwd):] if frame.filename.startswith(cwd) else frame.filename
+            top.append({"where": f"{where}:{frame.lineno}", "bytes": int(st.size), "count": int(st.count)})
+        self.report = {"traced_bytes": int(current), "peak_bytes": int(peak), "top": top}
+        return self.report
+
+
+def _mib(n) -> str:
+    return "?" if n is None else f"{n / MiB:.2f} MiB"
+
+
+def render_text(report: dict) -> str:
+    """Human-readable summary of an `app.footprint_report()` dict."""
+    lines = []
+    for name, c in report.get("corpora", {}).items():
+        p = c["passages"]
+        langs = ", ".join(f"{k} {v}" for k, v in p["by_lang"].items())
+        lines.append(f"corpus {name} v{c.get('version')}: {p['passages']} passages ({langs}) in {p['files']} files")
+        for lang, part in c["tfidf"].items():
+            for comp in ("X_char", "X_word"):
+                m = part[comp]
+                lines.append(
+                    f"  [{lang}] {comp}: {m['shape'][0]}x{m['vocab']} nnz {m['nnz']} -> {_mib(m['bytes'])}"
+                    f"{' (mapped)' if m['mapped'] else ''}, vocabulary {_mib(m['vocab_bytes'])}"
+                )
+        emb = c.get("embeddings")
+        if emb:
+            lines.append(f"  embeddings: {emb['shape'][0]}x{emb['shape'][1]} {emb['dtype']} -> {_mib(emb['bytes'])}"
+                         f"{' (mapped)' if emb['mapped'] else ''}")
+        lines.append(f"  passage store: {_mib(p['bytes'])} ({_mib(p['text_bytes'])} text)")
+        shards = c.get("shards")
+        if shards:
+            lines.append(f"  shard copies: {shards['n_shards']} processes -> {_mib(shards['bytes'])}")
+        lines.append(f"  total: {_mib(c['bytes'])} ({c['bytes_per_passage']:.0f} B/passage); caches: {c['caches']}")
+    model = report.get("model")
+    lines.append(f"model: {model['name']} {model['params']} params -> {_mib(model['bytes'])}" if model else "model: not loaded")
+    for name, cache in report.get("caches", {}).items():
+        lines.append(f"cache {name}: {cache}")
+    proc = report.get("process", {})
+    lines.append(f"process {proc.get('pid')}: rss {_mib(proc.get('rss_bytes'))}, peak {_mib(proc.get('peak_rss_bytes'))}")
+    trace = report.get("startup_trace")
+    if trace:
+        lines.append(f"startup allocations (traced {_mib(trace['traced_bytes'])}, peak {_mib(trace['peak_bytes'])}):")
+        lines.extend(f"  {_mib(t['bytes']):>12}  {t['count']:>7}  {t['where']}" for t in trace["top"])
+    return "\n".join(lines)
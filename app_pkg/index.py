@@ -0,0 +1,545 @@
+"""
+Per-corpus retrieval index + a registry of named corpora.
+
+- `CorpusIndex` bundles everything `answer()` needs for ONE corpus: the passage
+  store, the language-partitioned TF-IDF index and (once semantic retrieval is
+  used) the embedding matrix.
+- `CorpusRegistry` maps corpus names to doc roots, builds indexes on first use
+  and evicts the least recently used ones when their estimated footprint
+  exceeds a memory budget. Cold builds run outside the registry lock (one
+  build per name, concurrent callers join it), so other corpora stay served.
+- Indexes are immutable snapshots with a `version`: `CorpusRegistry.reload()`
+  builds a new one off to the side and swaps the reference in one step, so a
+  request that already holds the old snapshot finishes on it. `DocsWatcher`
+  polls doc roots and triggers reloads when files change.
+
+Kept free of imports from app.py (same rule as the other app_pkg modules).
+"""
+
+from __future__ import annotations
+
+import glob
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from app_pkg.faq import QuestionIndex
+from app_pkg.footprint import array_footprint, passage_footprint, tfidf_footprint
+from app_pkg.lang import AR_RE
+from app_pkg.metrics import REGISTRY
+from app_pkg.retrieval import file_segments, segment_reduce
+from app_pkg.singleflight import SingleFlight
+from tfidf import PartitionedTfidfRetriever
+
+_CACHE = REGISTRY.counter(
+    "index_cache_total", "Index-side cache lookups (corpus registry, filename masks, embedding file)", ("cache", "result")
+)
+_EMBEDDED = REGISTRY.counter("embeddings_passages_total", "Passage embeddings by origin", ("origin",))
+_BUILD_SECONDS = REGISTRY.histogram("corpus_build_seconds", "Time to build or attach a corpus index", ("corpus",))
+
+
+# ----------------- Data loading -----------------
+def doc_paths(root: str = "docs"):
+    """Indexable .txt files under `root` (sorted, archived files skipped)."""
+    return [
+        p for p in sorted(glob.glob(os.path.join(root, "**", "*.txt"), recursive=True))
+        if "/_archive/" not in p.replace("\\", "/")
+    ]
+
+
+def corpus_fingerprint(root: str = "docs") -> str:
+    """Cheap change detector for a doc root: hash of (path, size, mtime) of every doc file."""
+    h = hashlib.sha1()
+    for p in doc_paths(root):
+        try:
+            st = os.stat(p)
+        except OSError:
+            continue
+        h.update(f"{p}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def load_docs(root: str = "docs"):
+    docs = []
+    for p in doc_paths(root):
+        with open(p, "r", encoding="utf-8") as f:
+            content = f.read().strip()
+        fname = os.path.basename(p)
+        if "_ar" in fname or AR_RE.search(content):
+            lang = "ar"
+        elif "_de" in fname:
+            lang = "de"
+        elif "_en" in fname:
+            lang = "en"
+        else:
+            lang = "en"
+        for para in [x.strip() for x in content.split("\n\n") if x.strip()]:
+            docs.append({"path": p, "text": para, "lang": lang})
+    # Language-major layout (stable, so files stay sorted inside a language):
+    # every language partition is one contiguous id range.
+    docs.sort(key=lambda d: d["lang"])
+    return docs
+
+
+def file_ok(path, includes=None, excludes=None):
+    b = os.path.basename(path).lower()
+    if includes and not any(s in b for s in includes):
+        return False
+    if excludes and any(s in b for s in excludes):
+        return False
+    return True
+
+
+def _lang_slices(docs):
+    """Contiguous id range per language (relies on load_docs()' language-major order)."""
+    out = {}
+    for i, d in enumerate(docs):
+        sl = out.get(d["lang"])
+        out[d["lang"]] = slice(i if sl is None else sl.start, i + 1)
+    return out
+
+
+def _csr_nbytes(X) -> int:
+    return int(X.data.nbytes + X.indices.nbytes + X.indptr.nbytes)
+
+
+def cos_scores_np(q_vec: np.ndarray, D: np.ndarray) -> np.ndarray:
+    q = q_vec / (np.linalg.norm(q_vec) + 1e-12)
+    return D @ q
+
+
+def _write_atomic(path: str, write):
+    """Write `path` via a private temp file + os.replace (concurrent writers never interleave)."""
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+# Row layout of the embedding cache: passages language-major (one contiguous slice per language).
+EMB_LAYOUT = "lang-major"
+
+
+def emb_cache_key(model_name, docs):
+    # Content hash, not mtimes: an edit within the same second must still invalidate (hot reload).
+    # Hashed in row order, so a cache written for another passage order never matches.
+    h = hashlib.sha1()
+    for d in docs:
+        h.update(d["text"].encode("utf-8"))
+        h.update(b"\0")
+    return f"{model_name}|{EMB_LAYOUT}|{len(docs)}|{h.hexdigest()}"
+
+
+class CorpusIndex:
+    """Passage store + TF-IDF bundle + (lazy) embeddings for one corpus."""
+
+    def __init__(self, docs, name: str = "default", fingerprint: str = None, *, tfidf=None,
+                 lang_slices=None, file_starts=None, paths=None, text_nbytes=None):
+        """Index `docs` (fits TF-IDF). The keyword-only parts let a prebuilt index be
+        attached without refitting or touching every passage (see app_pkg.shared_index)."""
+        self.name = name
+        # Set by CorpusRegistry when the snapshot is published (1, 2, ... per corpus name).
+        self.version = 0
+        self.fingerprint = fingerprint
+        self.docs = docs
+        if isinstance(docs, list):
+            for i, d in enumerate(docs):
+                d["id"] = i
+        self.paths = paths if paths is not None else [d["path"] for d in docs]
+        self.lang_slices = lang_slices if lang_slices is not None else _lang_slices(docs)
+        # Files are contiguous too (sorted paths inside each language): segment starts for file-level ranking.
+        self.file_starts = file_starts if file_starts is not None else file_segments(self.paths)
+        # One TF-IDF sub-index (own vocabularies + IDF) per language.
+        self.tfidf = tfidf if tfidf is not None else PartitionedTfidfRetriever(docs)
+        self.embeddings = None
+        self.reembedded = 0  # passages actually encoded (vs. reused) by the last ensure_embeddings()
+        self._doc_index = None
+        self._questions = None
+        self._masks = {}
+        self._text_nbytes = (
+            text_nbytes if text_nbytes is not None else sum(len(d["text"].encode("utf-8")) for d in docs)
+        )
+
+    @property
+    def doc_index(self):
+        """(path, text) -> doc id, built on first use."""
+        if self._doc_index is None:
+            self._doc_index = {(d["path"], d["text"]): i for i, d in enumerate(self.docs)}
+        return self._doc_index
+
+    @property
+    def questions(self) -> QuestionIndex:
+        """Normalized FAQ question -> answer passage ids (FAQ fast path), built on first use."""
+        if self._questions is None:
+            self._questions = QuestionIndex(self.docs)
+        return self._questions
+
+    @classmethod
+    def from_dir(cls, root: str, name: str = "default") -> "CorpusIndex":
+        # Fingerprint first: an edit racing the load is picked up by the next poll.
+        fingerprint = corpus_fingerprint(root)
+        return cls(load_docs(root), name=name, fingerprint=fingerprint)
+
+    # ----------------- Embeddings -----------------
+    def ensure_embeddings(self, embedder, model_name: str, build_dir: str = "build", previous: "CorpusIndex" = None):
+        """Load (or compute + cache on disk) L2-normalized passage embeddings.
+
+        `embedder` is an `app_pkg.embedders.Embedder`; `model_name` (normally its
+        `name`) keys the on-disk cache, so switching backends re-embeds.
+
+        With `previous` (the snapshot being replaced on reload), rows of unchanged
+        passages are copied from it and only new/edited passages are encoded.
+        """
+        if self.embeddings is not None:
+            return self.embeddings
+        suffix = "" if self.name == "default" else f".{self.name}"
+        emb_npy = os.path.join(build_dir, f"doc_embeddings{suffix}.npy")
+        emb_meta = os.path.join(build_dir, f"doc_embeddings{suffix}.meta")
+        os.makedirs(build_dir, exist_ok=True)
+        key = emb_cache_key(model_name, self.docs)
+
+        try:
+            if os.path.exists(emb_npy) and os.path.exists(emb_meta):
+                with open(emb_meta, "r", encoding="utf-8") as f:
+                    if f.read().strip() == key:
+                        emb = np.load(emb_npy)
+                        _CACHE.inc(cache="embedding_file", result="hit")
+                    else:
+                        raise FileNotFoundError
+            else:
+                raise FileNotFoundError
+        except Exception:
+            _CACHE.inc(cache="embedding_file", result="miss")
+            emb = self._encode(embedder, previous)
+            # Matrix first, key last: a reader that sees the new key also sees its rows.
+            _write_atomic(emb_npy, lambda f: np.save(f, emb))
+            _write_atomic(emb_meta, lambda f: f.write(key.encode("utf-8")))
+
+        # L2-normalize once
+        self.embeddings = emb / (np.linalg.norm(emb, axis=-1, keepdims=True) + 1e-12)
+        return self.embeddings
+
+    def _encode(self, embedder, previous=None):
+        texts = [d["text"] for d in self.docs]
+        if previous is None or previous.embeddings is None:
+            self.reembedded = len(texts)
+            _EMBEDDED.inc(len(texts), origin="encoded")
+            return embedder.encode_batch(texts)
+        old_row = {(d["path"], d["text"]): i for i, d in enumerate(previous.docs)}
+        reuse = [old_row.get((d["path"], d["text"])) for d in self.docs]
+        todo = [i for i, r in enumerate(reuse) if r is None]
+        emb = np.empty((len(texts), previous.embeddings.shape[1]), dtype=previous.embeddings.dtype)
+        hit = [i for i, r in enumerate(reuse) if r is not None]
+        if hit:
+            emb[hit] = previous.embeddings[[reuse[i] for i in hit]]
+        if todo:
+            emb[todo] = embedder.encode_batch([texts[i] for i in todo])
+        self.reembedded = len(todo)
+        _EMBEDDED.inc(len(todo), origin="encoded")
+        _EMBEDDED.inc(len(hit), origin="reused")
+        return emb
+
+    # ----------------- Ranking -----------------
+    def file_mask(self, includes=None, excludes=None):
+        """Boolean mask over doc ids for filename include/exclude filters (None = no filter)."""
+        includes, excludes = tuple(includes or ()), tuple(excludes or ())
+        if not includes and not excludes:
+            return None
+        key = (includes, excludes)
+        mask = self._masks.get(key)
+        _CACHE.inc(cache="file_mask", result="miss" if mask is None else "hit")
+        if mask is None:
+            if len(self._masks) >= 64:
+                self._masks.clear()
+            mask = np.fromiter(
+                (file_ok(p, includes, excludes) for p in self.paths), dtype=bool, count=len(self.paths)
+            )
+            self._masks[key] = mask
+        return mask
+
+    def tfidf_rank(self, query, pool, q_lang=None, allow=None, fill=None):
+        """Ranked doc ids + score per id from the language-routed TF-IDF index."""
+        ids, scores = self.tfidf.search_ids(query, k=pool, lang=q_lang, allow=allow, fill=fill)
+        ids = ids.tolist()
+        return ids, dict(zip(ids, (float(x) for x in scores)))
+
+    def semantic_search(self, q_emb, q_lang=None, allow=None, fill=None):
+        """Rank doc ids by cosine similarity, scoring the query-language embedding slice first.
+
+        The other language slices are scored only when the routed slice yields fewer
+        than `fill` allowed passages (fill=None: always append them, routed slice first).
+        Returns (ranked ids, full-length score array where -1.0 means "not scored").
+        """
+        emb = self.embeddings
+        scores = np.full(len(self.docs), -1.0, dtype=emb.dtype)
+
+        def _rank(slices):
+            ids = []
+            for sl in slices:
+                scores[sl] = cos_scores_np(q_emb, emb[sl])
+                ids.append(np.arange(sl.start, sl.stop))
+            if not ids:
+                return []
+            ids = np.concatenate(ids)
+            if allow is not None:
+                ids = ids[allow[ids]]
+            return ids[np.argsort(scores[ids], kind="stable")[::-1]].tolist()
+
+        primary = self.lang_slices.get(q_lang)
+        if primary is None:
+            return _rank(list(self.lang_slices.values())), scores
+        order = _rank([primary])
+        if fill is None or len(order) < fill:
+            order += _rank([sl for L, sl in self.lang_slices.items() if L != q_lang])
+        return order, scores
+
+    def best_passage_per_file(self, order_idxs, score_of, how="max"):
+        """File-level ranking: reduce passage scores per file, keep each file's best passage.
+
+        `score_of` maps doc id -> score (dict or array) for the ids in `order_idxs`;
+        other passages count as unscored. Returns best passage ids, best file first.
+        """
+        if not order_idxs:
+            return []
+        s = np.full(len(self.docs), -np.inf)
+        s[order_idxs] = np.fromiter((score_of[i] for i in order_idxs), dtype=float, count=len(order_idxs))
+        file_scores, best = segment_reduce(s, self.file_starts, how=how)
+        ranked = np.argsort(-file_scores, kind="stable")
+        ranked = ranked[np.isfinite(file_scores[ranked])]
+        return best[ranked].tolist()
+
+    def prefer_lang(self, order_idxs, q_lang, k):
+        primary = [i for i in order_idxs if self.docs[i]["lang"] == q_lang]
+        secondary = [i for i in order_idxs if self.docs[i]["lang"] != q_lang]
+        chosen = []
+        for i in primary + secondary:
+            if i not in chosen:
+                chosen.append(i)
+            if len(chosen) == k:
+                break
+        return chosen
+
+    # ----------------- Footprint -----------------
+    def nbytes(self) -> int:
+        """Estimated resident bytes: TF-IDF matrices, embeddings and passage text."""
+        total = self._text_nbytes
+        for part in self.tfidf.partitions.values():
+            total += _csr_nbytes(part.X_char) + _csr_nbytes(part.X_word)
+        if self.embeddings is not None:
+            total += int(self.embeddings.nbytes)
+        return total
+
+    def footprint(self) -> dict:
+        """Detailed memory report: passages, per-language TF-IDF components, embeddings, caches."""
+        passages = passage_footprint(self.docs, self._text_nbytes)
+        tfidf = {}
+        for g, part in self.tfidf.partitions.items():
+            tfidf[str(g)] = {
+                "passages": int(len(self.tfidf.ids[g])),
+                "X_char": tfidf_footprint(part.vectorizer_char, part.X_char),
+                "X_word": tfidf_footprint(part.vectorizer_word, part.X_word),
+            }
+        emb = array_footprint(self.embeddings)
+        total = passages["bytes"] + (emb["bytes"] if emb else 0)
+        for part in tfidf.values():
+            for comp in (part["X_char"], part["X_word"]):
+                total += comp["bytes"] + comp["vocab_bytes"] + comp["idf_bytes"]
+        return {
+            "passages": passages,
+            "tfidf": tfidf,
+            "embeddings": emb,
+            "bytes": int(total),
+            "bytes_per_passage": round(total / max(1, passages["passages"]), 1),
+            "caches": {
+                "filter_masks": len(self._masks),
+                "faq_questions": len(self._questions) if self._questions is not None else None,
+                "doc_index": len(self._doc_index) if self._doc_index is not None else None,
+            },
+        }
+
+
+def parse_corpora(spec: str):
+    """Parse "name=root,name2=root2" (e.g. from the CORPORA env var) into a dict."""
+    out = {}
+    for item in (spec or "").split(","):
+        if "=" not in item:
+            continue
+        name, root = (x.strip() for x in item.split("=", 1))
+        if name and root:
+            out[name] = root
+    return out
+
+
+class CorpusRegistry:
+    """
+    Named corpora, each indexed on first use and kept in LRU order.
+
+    After every load, least recently used indexes are dropped until the summed
+    `nbytes()` fits `budget_bytes` (pinned names and the corpus just requested
+    are never evicted); `enforce_budget()` does the same after an index grew
+    (embeddings attached). Callers holding an evicted index can keep using it;
+    it is simply rebuilt on the next `get()`.
+
+    Builds run without the registry lock: a cold corpus does not block lookups
+    of loaded ones, and concurrent `get()`s of the same cold name share one build.
+    """
+
+    def __init__(self, roots, budget_bytes: int, pinned=(), loader=None):
+        self.roots = dict(roots)
+        self.budget_bytes = int(budget_bytes)
+        self.pinned = set(pinned)
+        self._loader = loader or (lambda name, root: CorpusIndex.from_dir(root, name=name))
+        self._loaded = OrderedDict()
+        self._versions = {}
+        self._lock = threading.RLock()
+        self._builds = SingleFlight()
+        self.evictions = 0
+
+    def names(self):
+        return list(self.roots)
+
+    def loaded(self):
+        with self._lock:
+            return list(self._loaded)
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(ix.nbytes() for ix in self._loaded.values())
+
+    def get(self, name: str) -> CorpusIndex:
+        if name not in self.roots:
+            raise KeyError(f"unknown corpus: {name!r} (known: {', '.join(self.roots)})")
+        with self._lock:
+            ix = self._loaded.get(name)
+            if ix is not None:
+                self._loaded.move_to_end(name)
+                _CACHE.inc(cache="corpus", result="hit")
+                return ix
+        _CACHE.inc(cache="corpus", result="miss")
+        return self._builds.do(name, lambda: self._build(name))[0]
+
+    def _build(self, name: str) -> CorpusIndex:
+        ix = self.peek(name)  # a build that finished just before this one started
+        if ix is not None:
+            return ix
+        t0 = time.perf_counter()
+        ix = self._loader(name, self.roots[name])
+        _BUILD_SECONDS.observe(time.perf_counter() - t0, corpus=name)
+        with self._lock:
+            self._publish(name, ix)
+            self._evict(keep=name)
+        return ix
+
+    def snapshots(self) -> dict:
+        """{name: published snapshot} of every loaded corpus, taken in one step."""
+        with self._lock:
+            return dict(self._loaded)
+
+    def peek(self, name: str):
+        """Currently published snapshot for `name` without loading or touching LRU order."""
+        with self._lock:
+            return self._loaded.get(name)
+
+    def reload(self, name: str, prepare=None) -> CorpusIndex:
+        """Rebuild `name` from disk and atomically publish the new snapshot.
+
+        The build runs without holding the registry lock, so lookups keep being
+        served from the old snapshot meanwhile. `prepare(new, old)` can warm the
+        new index first (e.g. reuse embeddings of unchanged passages).
+        """
+        if name not in self.roots:
+            raise KeyError(f"unknown corpus: {name!r} (known: {', '.join(self.roots)})")
+        old = self.peek(name)
+        new = self._loader(name, self.roots[name])
+        if prepare is not None:
+            prepare(new, old)
+        with self._lock:
+            self._publish(name, new)
+            self._evict(keep=name)
+        return new
+
+    def _publish(self, name, ix):
+        # Caller holds the lock. Versions keep counting across evictions and reloads.
+        self._versions[name] = self._versions.get(name, 0) + 1
+        ix.version = self._versions[name]
+        self._loaded[name] = ix
+        self._loaded.move_to_end(name)
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            if self._loaded.pop(name, None) is None:
+                return False
+            self.evictions += 1
+            return True
+
+    def enforce_budget(self, keep: str = None) -> None:
+        """Evict down to the budget after a loaded index grew (e.g. embeddings attached)."""
+        with self._lock:
+            self._evict(keep=keep)
+
+    def _evict(self, keep: str):
+        # Caller holds the lock. Sizes are summed once, then updated per eviction.
+        sizes = {name: ix.nbytes() for name, ix in self._loaded.items()}
+        total = sum(sizes.values())
+        for name in list(self._loaded):
+            if total <= self.budget_bytes:
+                return
+            if name == keep or name in self.pinned:
+                continue
+            self.evict(name)
+            total -= sizes[name]
+
+
+class DocsWatcher:
+    """
+    Polls the doc roots of loaded corpora and calls `on_change(name)` when a
+    corpus' fingerprint no longer matches its published snapshot.
+
+    Stdlib-only polling (no inotify dependency); `interval_s` trades reload
+    latency for stat() calls.
+    """
+
+    def __init__(self, registry: CorpusRegistry, on_change, interval_s: float = 5.0):
+        self.registry = registry
+        self.on_change = on_change
+        self.interval_s = float(interval_s)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def check(self):
+        """One poll; returns the corpus names reported as changed."""
+        changed = []
+        for name in self.registry.loaded():
+            ix = self.registry.peek(name)
+            if ix is None or ix.fingerprint is None:
+                continue
+            if corpus_fingerprint(self.registry.roots[name]) != ix.fingerprint:
+                changed.append(name)
+                self.on_change(name)
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            try:
+                self.check()
+            except Exception:
+                # Never let a bad poll kill the watcher; the next one retries.
+                pass
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="docs-watcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
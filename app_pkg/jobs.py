@@ -0,0 +1,190 @@
+"""
+Background jobs with progress, cancellation and memoized results.
+
+Long, read-only computations started from the UI (the in-app evaluation) run
+on a small dedicated thread pool instead of the request worker that clicked
+the button:
+
+- `JobRunner.submit(key, fn)` starts `fn(job)` on the runner's own pool and
+  returns the `Job`; while a job for `key` is queued or running, submitting
+  the same key joins it (one computation per key);
+- finished results are memoized per key (LRU, `memo` entries): submitting a
+  memoized key returns an already finished job without touching the pool;
+- `fn` reports progress through `job.total` / `job.advance(n)` and calls
+  `job.check()` at safe points; after `job.cancel()` the next check raises
+  `JobCancelled` and the job ends as "cancelled";
+- cancelled and failed jobs are not memoized, so the next submit recomputes.
+
+    runner = JobRunner(workers=1, memo=32)
+    job = runner.submit(("corpus-fp", "model", 3), lambda job: evaluate(job))
+    job.wait(0.5)  # True once finished; job.status() -> {"state", "done", "total", ...}
+
+Dependency-light (stdlib only; no imports from app.py).
+"""
+
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+QUEUED, RUNNING, DONE, CANCELLED, FAILED = "queued", "running", "done", "cancelled", "failed"
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """One submitted computation: state, progress, result or error."""
+
+    _ids = itertools.count(1)
+
+    def __init__(self, key):
+        self.id = next(self._ids)
+        self.key = key
+        self.state = QUEUED
+        self.total = 0
+        self.done = 0
+        self.result = None
+        self.error = None
+        self.memo_hit = False
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+
+    def advance(self, n: int = 1) -> None:
+        with self._lock:
+            self.done += n
+
+    def check(self) -> None:
+        """Raise JobCancelled if cancel() was called."""
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self) -> bool:
+        """Ask a queued/running job to stop; False if it already finished."""
+        if self._finished.is_set():
+            return False
+        self._cancel.set()
+        return True
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """True once the job has finished (done, cancelled or failed)."""
+        return self._finished.wait(timeout)
+
+    def _finish(self, state, result=None, error=None) -> None:
+        self.state, self.result, self.error = state, result, error
+        self.finished = time.time()
+        self._finished.set()
+
+    def _memo_copy(self) -> "Job":
+        """A finished job carrying this job's result, returned on memo hits."""
+        job = Job(self.key)
+        job.total, job.done, job.memo_hit = self.total, self.done, True
+        job.started = job.finished = time.time()
+        job._finish(DONE, self.result)
+        return job
+
+    def status(self) -> dict:
+        with self._lock:
+            done = self.done
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0.0
+        return {
+            "id": self.id,
+            "state": self.state,
+            "done": done,
+            "total": self.total,
+            "progress": round(done / self.total, 4) if self.total else (1.0 if self.state == DONE else 0.0),
+            "elapsed_s": round(elapsed, 3),
+            "memo_hit": self.memo_hit,
+            "error": self.error,
+        }
+
+
+class JobRunner:
+    """Keyed background jobs on a private pool, with per-key joining and an LRU result memo."""
+
+    def __init__(self, workers: int = 1, memo: int = 32, name: str = "job"):
+        self.workers = max(1, int(workers))
+        self.memo = max(0, int(memo))
+        self.name = name
+        self._pool = None
+        self._lock = threading.Lock()
+        self._active = {}  # key -> queued/running Job
+        self._results = OrderedDict()  # key -> finished Job
+        self._stats = {"submitted": 0, "memo_hits": 0, "joined": 0, "done": 0, "cancelled": 0, "failed": 0}
+
+    def _executor(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix=self.name)
+        return self._pool
+
+    def submit(self, key, fn) -> Job:
+        """Memoized job for `key`, the running one, or a new job running `fn(job)`."""
+        with self._lock:
+            hit = self._results.get(key)
+            if hit is not None:
+                self._results.move_to_end(key)
+                self._stats["memo_hits"] += 1
+                return hit._memo_copy()
+            job = self._active.get(key)
+            if job is not None and not job.cancelled:
+                self._stats["joined"] += 1
+                return job
+            job = Job(key)
+            self._active[key] = job
+            self._stats["submitted"] += 1
+            self._executor().submit(self._run, job, fn)
+            return job
+
+    def _run(self, job: Job, fn) -> None:
+        job.started = time.time()
+        job.state = RUNNING
+        try:
+            job.check()
+            result = fn(job)
+        except JobCancelled:
+            self._end(job, CANCELLED)
+        except Exception as e:
+            self._end(job, FAILED, error=f"{type(e).__name__}: {e}")
+        else:
+            self._end(job, DONE, result=result)
+
+    def _end(self, job: Job, state, result=None, error=None) -> None:
+        with self._lock:
+            if self._active.get(job.key) is job:
+                del self._active[job.key]
+            self._stats[state] += 1
+            job._finish(state, result, error)
+            if state == DONE and self.memo:
+                self._results[job.key] = job
+                while len(self._results) > self.memo:
+                    self._results.popitem(last=False)
+
+    def active(self, key):
+        """The queued/running job for `key`, if any."""
+        with self._lock:
+            return self._active.get(key)
+
+    def cancel(self, key) -> bool:
+        job = self.active(key)
+        return bool(job and job.cancel())
+
+    def clear(self) -> None:
+        """Forget memoized results (running jobs continue)."""
+        with self._lock:
+            self._results.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "running": len(self._active), "memoized": len(self._results)}
@@ -0,0 +1,180 @@
+"""
+Asynchronous, buffered row logger (query log).
+
+Request threads only `log(row)`: a non-blocking put on a bounded queue. When
+the queue is full the row is dropped and counted, so logging never blocks or
+slows an answer. One daemon thread drains the queue in batches (up to
+`batch_size` rows or `flush_s` seconds after the first queued row), appends
+them to the file in one write, and rotates the file by size and/or age.
+
+Formats:
+- "csv": header row at the top of every file segment (fixed `fieldnames`).
+- "jsonl": one JSON object per line.
+- "jsonl.gz": gzip-compressed JSONL; every batch is appended as its own gzip
+  member, so the live file is always readable with `gzip.open()`.
+
+Rotation mirrors `logging.handlers.RotatingFileHandler`: `path` -> `path.1`
+-> ... -> `path.<backups>` (oldest dropped).
+
+    w = AsyncLogWriter("logs/queries.csv", fmt="csv", fieldnames=[...])
+    w.log({...})      # True if queued, False if dropped
+    w.flush()         # wait until everything queued so far is on disk
+    w.stats()         # written / dropped / batches / rotations / errors / queued
+
+Dependency-light (stdlib only; no imports from app.py).
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import io
+import json
+import os
+import queue
+import threading
+import time
+
+FORMATS = ("csv", "jsonl", "jsonl.gz")
+
+
+class AsyncLogWriter:
+    """Bounded-queue background writer with batched appends and size/time rotation."""
+
+    def __init__(self, path: str, fmt: str = "csv", fieldnames=None, max_queue: int = 10000, batch_size: int = 512,
+                 flush_s: float = 1.0, max_bytes: int = 10 * 1024 * 1024, rotate_s: float = 0.0, backups: int = 5):
+        if fmt not in FORMATS:
+            raise ValueError(f"fmt must be one of {FORMATS}, not {fmt!r}")
+        if fmt == "csv" and not fieldnames:
+            raise ValueError("csv format needs fieldnames")
+        self.path = path
+        self.fmt = fmt
+        self.fieldnames = list(fieldnames or [])
+        self.batch_size = max(1, int(batch_size))
+        self.flush_s = max(0.0, float(flush_s))
+        self.max_bytes = int(max_bytes)  # 0 = no size rotation
+        self.rotate_s = float(rotate_s)  # 0 = no time rotation
+        self.backups = max(0, int(backups))
+        self._q = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._stats = {"written": 0, "dropped": 0, "batches": 0, "rotations": 0, "errors": 0}
+        self._segment_started = time.time()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="query-log", daemon=True)
+        self._thread.start()
+
+    # ----------------- Request side -----------------
+    def log(self, row: dict) -> bool:
+        """Queue `row` without blocking; False (and counted) if the queue is full or closed."""
+        if not self._closed:
+            try:
+                self._q.put_nowait(row)
+                return True
+            except queue.Full:
+                pass
+        with self._lock:
+            self._stats["dropped"] += 1
+        return False
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until rows queued before this call are written (True) or `timeout` passes."""
+        done = threading.Event()
+        try:
+            self._q.put(done, timeout=timeout)
+        except queue.Full:
+            return False
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 5.0) -> None:
+        if self._closed:
+            return
+        self.flush(timeout)
+        self._closed = True
+        try:
+            self._q.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            out = dict(self._stats)
+        out["queued"] = self._q.qsize()
+        return out
+
+    # ----------------- Writer thread -----------------
+    def _run(self):
+        while True:
+            item = self._q.get()
+            rows, events, stop = [], [], False
+            deadline = time.monotonic() + self.flush_s
+            while True:
+                if item is None:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    events.append(item)  # flush marker: write what we have now
+                else:
+                    rows.append(item)
+                if stop or events or len(rows) >= self.batch_size:
+                    break
+                try:
+                    item = self._q.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            if rows:
+                self._write(rows)
+            for ev in events:
+                ev.set()
+            if stop:
+                return
+
+    def _write(self, rows):
+        try:
+            self._maybe_rotate()
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            data = self._encode(rows, header=new_file)
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            if self.fmt == "jsonl.gz":
+                data = gzip.compress(data.encode("utf-8"))
+                with open(self.path, "ab") as f:
+                    f.write(data)
+            else:
+                with open(self.path, "a", encoding="utf-8", newline="") as f:
+                    f.write(data)
+        except Exception:
+            with self._lock:
+                self._stats["errors"] += 1
+                self._stats["dropped"] += len(rows)
+            return
+        with self._lock:
+            self._stats["written"] += len(rows)
+            self._stats["batches"] += 1
+
+    def _encode(self, rows, header: bool) -> str:
+        if self.fmt == "csv":
+            buf = io.StringIO()
+            w = csv.DictWriter(buf, fieldnames=self.fieldnames, extrasaction="ignore")
+            if header:
+                w.writeheader()
+            w.writerows(rows)
+            return buf.getvalue()
+        return "".join(json.dumps(r, ensure_ascii=False, default=str) + "\n" for r in rows)
+
+    def _maybe_rotate(self):
+        if not os.path.exists(self.path):
+            return
+        too_big = self.max_bytes > 0 and os.path.getsize(self.path) >= self.max_bytes
+        too_old = self.rotate_s > 0 and time.time() - self._segment_started >= self.rotate_s
+        if not (too_big or too_old):
+            return
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                src = f"{self.path}.{i}"
+                if os.path.exists(src):
+                    os.replace(src, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._segment_started = time.time()
+        with self._lock:
+            self._stats["rotations"] += 1
@@ -0,0 +1,201 @@
+"""
+In-process metrics: counters, gauges and histograms with Prometheus text output.
+
+Instrumented code grabs a metric once at import time and updates it per
+request (`inc()`, `set()`, `observe()`): a lock and a dict update, so the
+per-request cost is negligible. Values that already live elsewhere (batcher
+counters, registry sizes) are pulled in by collectors at scrape time.
+
+    REQS = REGISTRY.counter("answer_requests_total", "answer() calls", ("mode",))
+    REQS.inc(mode="Hybrid")
+    REGISTRY.render_prometheus()   # text exposition format 0.0.4
+    REGISTRY.snapshot()            # JSON-friendly dict
+
+Dependency-light (no imports from app.py).
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+import threading
+
+# Latency buckets in seconds: 0.5 ms .. 10 s.
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _fmt(v) -> str:
+    if v == math.inf:
+        return "+Inf"
+    if isinstance(v, int):
+        return str(v)
+    if isinstance(v, float) and v.is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(float(v))
+
+
+def _escape(v) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_str(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in pairs) + "}"
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels: dict):
+        if len(labels) != len(self.labelnames) or not all(n in labels for n in self.labelnames):
+            raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    """Monotonic count per label set."""
+
+    kind = "counter"
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        for key, v in sorted(self._values.items()):
+            yield self.name, _label_str(self.labelnames, key), v
+
+
+class Gauge(Counter):
+    """Current value per label set (can go down)."""
+
+    kind = "gauge"
+
+    def set(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram (Prometheus semantics) per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            st = self._values.get(key)
+            if st is None:
+                st = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            st[0][i] += 1
+            st[1] += value
+            st[2] += 1
+
+    def count(self, **labels) -> int:
+        st = self._values.get(self._key(labels))
+        return st[2] if st else 0
+
+    def _samples(self):
+        for key, (counts, total, n) in sorted(self._values.items()):
+            acc = 0
+            for b, c in zip(self.buckets + (math.inf,), counts):
+                acc += c
+                yield self.name + "_bucket", _label_str(self.labelnames, key, (("le", _fmt(b)),)), acc
+            yield self.name + "_sum", _label_str(self.labelnames, key), total
+            yield self.name + "_count", _label_str(self.labelnames, key), n
+
+
+class MetricsRegistry:
+    """Named metrics + scrape-time collectors."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics = {}
+        self._collectors = []
+
+    def _get(self, cls, name, help, labelnames, **kw):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, labelnames, **kw)
+            elif type(m) is not cls or m.labelnames != tuple(labelnames):
+                raise ValueError(f"metric {name} already registered as {m.kind}{m.labelnames}")
+            return m
+
+    def counter(self, name, help="", labelnames=()) -> Counter:
+        return self._get(Counter, name, help, labelnames)
+
+    def gauge(self, name, help="", labelnames=()) -> Gauge:
+        return self._get(Gauge, name, help, labelnames)
+
+    def histogram(self, name, help="", labelnames=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labelnames, buckets=buckets)
+
+    def add_collector(self, fn) -> None:
+        """`fn()` runs before every render/snapshot (e.g. to copy external stats into gauges)."""
+        self._collectors.append(fn)
+
+    def collect(self):
+        for fn in list(self._collectors):
+            try:
+                fn()
+            except Exception:
+                pass  # a broken collector must not take the scrape down
+        with self._lock:
+            return [self._metrics[n] for n in sorted(self._metrics)]
+
+    def render_prometheus(self) -> str:
+        lines = []
+        for m in self.collect():
+            with m._lock:
+                samples = list(m._samples())
+            lines.append(f"# HELP {m.name} {m.help}")
+            lines.append(f"# TYPE {m.name} {m.kind}")
+            lines.extend(f"{name}{labels} {_fmt(v)}" for name, labels, v in samples)
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """{name: {"type", "help", "samples": [{"labels": {...}, "value": ...}]}}."""
+        out = {}
+        for m in self.collect():
+            with m._lock:
+                items = [(k, (list(v[0]), v[1], v[2]) if isinstance(v, list) else v) for k, v in sorted(m._values.items())]
+            samples = []
+            for key, v in items:
+                labels = dict(zip(m.labelnames, key))
+                if m.kind == "histogram":
+                    counts, total, n = v
+                    cum, acc = {}, 0
+                    for b, c in zip(m.buckets + (math.inf,), counts):
+                        acc += c
+                        cum[_fmt(b)] = acc
+                    v = {"count": n, "sum": total, "buckets": cum}
+                samples.append({"labels": labels, "value": v})
+            out[m.name] = {"type": m.kind, "help": m.help, "samples": samples}
+        return out
+
+
+REGISTRY = MetricsRegistry()
@@ -6,6 +6,8 @@ Shared retrieval helpers.
 Why this file exists:
 - Keep small, stable utilities (path normalization, file keys, link building) in ONE place.
 - Avoid duplicating link logic across app.py / cli.py / tests.
+- Hybrid fusion (`rrf_fuse`) and its defaults live here so `answer()`, the in-app
+  eval, `cli.py eval` and the sweeps cannot drift apart.
 - Keep this module dependency-light (no imports from app.py) to avoid cycles.
 """
 
@@ -14,6 +16,37 @@ from __future__ import annotations
 from os.path import basename
 from urllib.parse import quote
 
+import numpy as np
+
+# Retrieval defaults shared by answer(), the in-app eval, cli.py eval and app_pkg.sweep.
+RRF_K0 = 90.0  # RRF rank offset
+RRF_TF_CAND = 1200  # lexical candidates that vote in the fusion
+RRF_SEM_CAND = 300  # semantic top-N that votes (guardrail against long-tail noise)
+# Abstain gate per score family: top score below MIN_TOP or top-2 gap below MIN_GAP.
+ABSTAIN_MIN_TOP = {"tfidf": 0.05, "semantic": 0.25}
+ABSTAIN_MIN_GAP = {"tfidf": 0.01, "semantic": 0.03}
+
+
+def tfidf_pool(k: int) -> int:
+    """TF-IDF candidate pool for top-`k`: queries are routed to one language partition,
+    so the pool only has to cover one language."""
+    return max(k * 10, 200)
+
+
+def rrf_fuse(tf_order, sem_order, tf_cand: int = RRF_TF_CAND, sem_cand: int = RRF_SEM_CAND, k0: float = RRF_K0):
+    """
+    Reciprocal Rank Fusion of a lexical and a semantic ranking (doc ids, best first).
+
+    Only the top `tf_cand` / `sem_cand` ids of each list vote, each with 1 / (k0 + rank).
+    Lexical votes go in first, so ties keep TF-IDF order. Returns (fused ids, {id: rrf score}).
+    """
+    rrf = {}
+    for r, i in enumerate(tf_order[:tf_cand]):
+        rrf[i] = rrf.get(i, 0.0) + 1.0 / (k0 + r + 1)
+    for r, i in enumerate(sem_order[:sem_cand]):
+        rrf[i] = rrf.get(i, 0.0) + 1.0 / (k0 + r + 1)
+    return [i for i, _ in sorted(rrf.items(), key=lambda x: x[1], reverse=True)], rrf
+
 
 def normalize_relpath(path: str) -> str:
     """
@@ -45,4 +78,45 @@ def source_url(path: str, *, link_mode: str, github_blob_base: str) -> str:
         # Browsers often block file:// from http pages; Gradio serves files via /file=
         return f"/file={quote(rel, safe='/')}"
     # default: github
-    return github_blob_base + quote(rel, safe="/")
\ No newline at end of file
+    return github_blob_base + quote(rel, safe="/")
+
+
+def file_segments(paths) -> np.ndarray:
+    """
+    Start offsets of runs of equal paths in a file-sorted passage layout.
+
+    Example: ["a", "a", "b", "c", "c"] -> array([0, 2, 3])
+    """
+    paths = list(paths)
+    if not paths:
+        return np.empty(0, dtype=np.int64)
+    return np.asarray([0] + [i for i in range(1, len(paths)) if paths[i] != paths[i - 1]], dtype=np.int64)
+
+
+def segment_reduce(scores: np.ndarray, starts: np.ndarray, how: str = "max"):
+    """
+    Reduce per-passage scores to per-file scores over a file-sorted layout.
+
+    how:
+      - "max":  best passage score of each file
+      - "top2": mean of the two best passage scores (single-passage files keep their max)
+
+    Unscored passages should be -inf. Returns (file_scores, best_passage_ids);
+    files with nothing scored get -inf.
+    """
+    scores = np.asarray(scores, dtype=float)
+    n = scores.shape[0]
+    sizes = np.diff(np.append(starts, n))
+    seg = np.repeat(np.arange(len(starts)), sizes)
+    # Segment-major, score-descending within each segment: the first slot of
+    # segment s (at starts[s]) is its best passage.
+    order = np.lexsort((-scores, seg))
+    best = order[starts]
+    file_scores = np.maximum.reduceat(scores, starts) if n else np.empty(0)
+    if how == "top2":
+        second = scores[order[np.minimum(starts + 1, starts + sizes - 1)]]
+        both = (sizes >= 2) & np.isfinite(second)
+        file_scores = np.where(both, (file_scores + second) / 2.0, file_scores)
+    elif how != "max":
+        raise ValueError(f"unknown file aggregation: {how!r}")
+    return file_scores, best
@@ -0,0 +1,164 @@
+"""
+Runtime thread tuning: one config for torch, BLAS/OpenMP and the request pool.
+
+Several workers per box, each with torch intra-op threads, an OpenBLAS/MKL pool
+and our own request pool, easily run cores x cores threads: latency collapses
+under load from oversubscription. `plan()` splits the available cores instead:
+
+    threads per request = max(1, cores // request workers)
+
+With a thread pool the request workers share one process, so each concurrent
+request gets that many torch/BLAS threads; with a process pool every worker
+process gets them. torch inter-op parallelism (we run no parallel graphs) is 1.
+
+    cfg = from_env(pool="thread", workers=4)   # RUNTIME_CORES, TORCH_THREADS, BLAS_THREADS, ...
+    apply(cfg)                                  # env for children + live limits
+    report()                                    # effective settings for /health
+
+`apply()` exports OMP/OPENBLAS/MKL thread variables (honoured by libraries not
+loaded yet and by spawned workers), limits already-loaded BLAS/OpenMP pools via
+`threadpoolctl` when installed, and sets torch threads if torch is imported
+(`apply_torch()` again once a model has loaded it).
+
+Dependency-light (no imports from app.py; threadpoolctl and torch optional).
+"""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass
+
+BLAS_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "VECLIB_MAXIMUM_THREADS", "NUMEXPR_NUM_THREADS")
+MAX_DEFAULT_WORKERS = 4
+
+_lock = threading.Lock()
+_current = None
+_applied = {}
+
+
+@dataclass(frozen=True)
+class RuntimeConfig:
+    cores: int
+    pool: str  # "thread" | "process"
+    workers: int  # request pool size
+    torch_threads: int
+    torch_interop_threads: int
+    blas_threads: int
+
+
+def available_cores() -> int:
+    """Cores this process may run on (CPU affinity / cgroup-pinned sets count, not the host total)."""
+    try:
+        return max(1, len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        return max(1, os.cpu_count() or 1)
+
+
+def default_workers(cores: int = None) -> int:
+    return max(1, min(MAX_DEFAULT_WORKERS, cores or available_cores()))
+
+
+def plan(cores: int = None, pool: str = "thread", workers: int = None, torch_threads: int = None,
+         torch_interop_threads: int = None, blas_threads: int = None) -> RuntimeConfig:
+    """Per-core defaults for everything not given explicitly."""
+    if pool not in ("thread", "process"):
+        raise ValueError(f"pool must be 'thread' or 'process', not {pool!r}")
+    cores = max(1, int(cores or available_cores()))
+    workers = max(1, int(workers or default_workers(cores)))
+    per_request = max(1, cores // workers)
+    return RuntimeConfig(
+        cores=cores,
+        pool=pool,
+        workers=workers,
+        torch_threads=max(1, int(torch_threads or per_request)),
+        torch_interop_threads=max(1, int(torch_interop_threads or 1)),
+        blas_threads=max(1, int(blas_threads or per_request)),
+    )
+
+
+def _env_int(environ, *names):
+    for name in names:
+        v = (environ.get(name) or "").strip()
+        if v:
+            return int(v)
+    return None
+
+
+def from_env(pool: str = None, workers: int = None, environ=None) -> RuntimeConfig:
+    """plan() from RUNTIME_CORES, SERVE_POOL/SERVE_WORKERS, TORCH_THREADS,
+    TORCH_INTEROP_THREADS and BLAS_THREADS (or an explicit OMP_NUM_THREADS)."""
+    env = os.environ if environ is None else environ
+    return plan(
+        cores=_env_int(env, "RUNTIME_CORES"),
+        pool=pool or env.get("SERVE_POOL") or "thread",
+        workers=workers or _env_int(env, "SERVE_WORKERS"),
+        torch_threads=_env_int(env, "TORCH_THREADS"),
+        torch_interop_threads=_env_int(env, "TORCH_INTEROP_THREADS"),
+        blas_threads=_env_int(env, "BLAS_THREADS", "OMP_NUM_THREADS"),
+    )
+
+
+def apply(cfg: RuntimeConfig) -> dict:
+    """Make `cfg` the process' runtime config; returns what was actually applied."""
+    global _current
+    with _lock:
+        _current = cfg
+        for var in BLAS_ENV_VARS:
+            os.environ[var] = str(cfg.blas_threads)
+        _applied["env"] = True
+        try:
+            from threadpoolctl import threadpool_limits
+        except ImportError:
+            _applied["threadpoolctl"] = False
+        else:
+            threadpool_limits(limits=cfg.blas_threads)  # not used as a context manager: stays in effect
+            _applied["threadpoolctl"] = True
+    apply_torch()
+    return dict(_applied)
+
+
+def apply_torch() -> bool:
+    """Set torch threads of the current config, if one is active and torch is imported."""
+    torch = sys.modules.get("torch")
+    with _lock:
+        if _current is None or torch is None:
+            return False
+        torch.set_num_threads(_current.torch_threads)
+        try:
+            torch.set_num_interop_threads(_current.torch_interop_threads)
+        except RuntimeError:
+            pass  # only settable before the first parallel op; intra-op threads still apply
+        _applied["torch"] = True
+        return True
+
+
+def current():
+    return _current
+
+
+def report() -> dict:
+    """Configured values plus what the libraries report now (for /health)."""
+    cfg = _current
+    out = {"configured": asdict(cfg) if cfg else None, "applied": dict(_applied)}
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        out["torch"] = {"threads": torch.get_num_threads(), "interop_threads": torch.get_num_interop_threads()}
+    try:
+        from threadpoolctl import threadpool_info
+    except ImportError:
+        pass
+    else:
+        out["threadpools"] = [
+            {"api": p.get("internal_api"), "threads": p.get("num_threads")} for p in threadpool_info()
+        ]
+    return out
+
+
+def reset() -> None:
+    """Forget the active config (tests); limits already applied stay."""
+    global _current
+    with _lock:
+        _current = None
+        _applied.clear()
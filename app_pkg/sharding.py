@@ -0,0 +1,412 @@
+"""
+Sharded retrieval: scatter a query to N shard processes, gather and merge top-k.
+
+The coordinator fits the language-partitioned TF-IDF index once (so every
+shard uses the same vocabularies and the same global IDF) and hands each shard
+process a contiguous row range of every partition: its CSR rows, the fitted
+vectorizers and, once semantic retrieval is used, its embedding rows. Shards
+are local `multiprocessing` processes talking over pipes, a stand-in for
+separate nodes.
+
+Merging is exact. TF-IDF needs two rounds because `PartitionedTfidfRetriever`
+scales the char and word scores by their maxima over the ranked partitions
+before fusing:
+
+  1. "max": every shard scores its rows and returns its raw char/word maxima;
+  2. "top": the coordinator sends the global maxima back, every shard fuses
+     with them and returns its top-k ids + scores; the coordinator merges.
+
+Cosine scores need no normalization, so semantic search is one round.
+
+Queries run concurrently: every message carries a request id, each shard pipe
+has a reader thread that resolves the matching future, and shards keep the
+round-1 state per request id (at most `_Shard.MAX_PENDING`; a round 2 whose
+state was evicted fails the query instead of dropping that shard's rows). Filename filters travel as each shard's slice
+of the allow mask (its own rows only), not the corpus-wide mask.
+`ShardedIndex` exposes the same ranking API as `CorpusIndex`, so `answer()`
+runs its RRF, filters and language preference on the merged lists unchanged.
+"""
+
+from __future__ import annotations
+
+import itertools
+import multiprocessing as mp
+import threading
+import weakref
+from concurrent.futures import Future
+
+import numpy as np
+
+from app_pkg.footprint import csr_footprint, mapping_nbytes
+
+
+def _unit_max(scores, m):
+    # Same arithmetic as TfidfRetriever._safe_unit_max, with the maxima over all shards.
+    return scores if m <= 0.0 else scores / (m + 1e-12)
+
+
+def _top(ids, scores, k, keep=None):
+    # keep: boolean mask aligned with `ids` (this shard's slice of the allow mask)
+    if keep is not None:
+        ids, scores = ids[keep], scores[keep]
+    order = scores.argsort()[::-1][:k]
+    return ids[order], scores[order]
+
+
+class _Shard:
+    """Rows of every language partition owned by one shard process."""
+
+    MAX_PENDING = 256  # round-1 states kept for requests whose round 2 never came
+
+    def __init__(self, parts, w_char, w_word):
+        # parts: {lang: (global ids, vectorizer_char, X_char rows, vectorizer_word, X_word rows)}
+        self.parts = parts
+        self.w_char = w_char
+        self.w_word = w_word
+        self.emb = {}
+        self._raw = {}  # request id -> {lang: (raw char scores, raw word scores)}
+
+    def maxima(self, rid, query, groups):
+        raw = self._raw[rid] = {}
+        while len(self._raw) > self.MAX_PENDING:
+            self._raw.pop(next(iter(self._raw)))
+        out = {}
+        for g in groups:
+            part = self.parts.get(g)
+            if part is None or len(part[0]) == 0:
+                continue
+            ids, vec_char, X_char, vec_word, X_word = part
+            sc = (X_char @ vec_char.transform([query]).T).toarray().ravel()
+            sw = (X_word @ vec_word.transform([query]).T).toarray().ravel()
+            raw[g] = (sc, sw)
+            out[g] = (float(sc.max()), float(sw.max()))
+        return out
+
+    def top(self, rid, maxima, k, keep):
+        raw = self._raw.pop(rid, None)
+        if raw is None:
+            # Evicted under MAX_PENDING: fail the query rather than drop this shard's rows.
+            raise LookupError(f"no round-1 scores for request {rid} (more than {self.MAX_PENDING} in flight)")
+        out = {}
+        for g, (sc, sw) in raw.items():
+            m_char, m_word = maxima[g]
+            fused = (self.w_char * _unit_max(sc, m_char)) + (self.w_word * _unit_max(sw, m_word))
+            out[g] = _top(self.parts[g][0], fused, k, None if keep is None else keep[g])
+        return out
+
+    def set_embeddings(self, emb):
+        self.emb = emb
+        return True
+
+    def semantic(self, q, groups, k, keep):
+        out = {}
+        for g in groups:
+            if g not in self.emb or len(self.parts[g][0]) == 0:
+                continue
+            out[g] = _top(self.parts[g][0], self.emb[g] @ q, k, None if keep is None else keep[g])
+        return out
+
+
+def _shard_main(conn, shard):
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg is None:
+            return
+        rid, op, args = msg
+        try:
+            conn.send((rid, "ok", getattr(shard, op)(*args)))
+        except Exception as e:  # report, keep serving
+            conn.send((rid, "err", f"{type(e).__name__}: {e}"))
+
+
+class _ShardConn:
+    """Coordinator end of one shard pipe: concurrent requests, replies matched by request id."""
+
+    def __init__(self, conn, name):
+        self._conn = conn
+        self._send_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._closed = False
+        threading.Thread(target=self._read, name=f"{name}-reader", daemon=True).start()
+
+    def call(self, rid, op, args) -> Future:
+        fut = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("shard is closed")
+            self._pending[rid] = fut
+        try:
+            with self._send_lock:
+                self._conn.send((rid, op, args))
+        except Exception:
+            with self._lock:
+                self._pending.pop(rid, None)
+            raise
+        return fut
+
+    def _read(self):
+        while True:
+            try:
+                rid, status, res = self._conn.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                fut = self._pending.pop(rid, None)
+            if fut is None:
+                continue
+            if status == "ok":
+                fut.set_result(res)
+            else:
+                fut.set_exception(RuntimeError(res))
+        with self._lock:  # shard gone: fail whatever is still waiting
+            self._closed = True
+            pending, self._pending = list(self._pending.values()), {}
+        for fut in pending:
+            fut.set_exception(RuntimeError("shard connection closed"))
+        self._conn.close()
+
+    def close(self):
+        """Ask the shard to exit; the reader closes the pipe once the shard has hung up."""
+        with self._lock:
+            self._closed = True
+        try:
+            with self._send_lock:
+                self._conn.send(None)
+        except Exception:
+            pass
+
+
+def _shutdown(procs, conns):
+    for c in conns:
+        c.close()
+    for p in procs:
+        p.join(timeout=2)
+        if p.is_alive():
+            p.terminate()
+
+
+def _row_ranges(n, n_shards):
+    bounds = [n * s // n_shards for s in range(n_shards + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+class _ShardedTfidf:
+    """`search_ids()` of PartitionedTfidfRetriever, answered by the shards."""
+
+    def __init__(self, owner, local):
+        self._owner = owner
+        self._local = local
+
+    def __getattr__(self, name):
+        # ids / partitions / key / passages come from the coordinator's copy.
+        return getattr(self._local, name)
+
+    def _scatter(self, query, groups, k, allow):
+        owner = self._owner
+        rid = next(owner._rids)
+        per_shard = owner._broadcast("maxima", [(rid, query, groups)] * owner.n_shards, rid)
+        # One max per component over all rows of all `groups` (PartitionedTfidfRetriever._rank).
+        m_char = max((mc for res in per_shard for mc, _ in res.values()), default=0.0)
+        m_word = max((mw for res in per_shard for _, mw in res.values()), default=0.0)
+        maxima = {g: (m_char, m_word) for res in per_shard for g in res}
+        keeps = owner._keep_slices(allow, groups)
+        per_shard = owner._broadcast("top", [(rid, maxima, k, keep) for keep in keeps], rid)
+        # Per partition: exact top-k from the shards' top-k lists.
+        parts = {}
+        for res in per_shard:
+            for g, part in res.items():
+                parts.setdefault(g, []).append(part)
+        return [_merge(parts[g], k) for g in groups if g in parts]
+
+    def search_ids(self, query, k=3, lang=None, allow=None, fill=None):
+        """Same contract as PartitionedTfidfRetriever.search_ids()."""
+        groups = list(self._local.partitions)
+        if lang not in self._local.partitions:
+            return _merge(self._scatter(query, groups, k, allow), k)
+
+        ids, scores = _merge(self._scatter(query, [lang], k, allow), k)
+        need = k if fill is None else min(int(fill), k)
+        if len(ids) >= need:
+            return ids, scores
+        rest = k - len(ids)
+        b_ids, b_scores = _merge(self._scatter(query, [g for g in groups if g != lang], rest, allow), rest)
+        return np.concatenate([ids, b_ids]), np.concatenate([scores, b_scores])
+
+
+def _merge(parts, k):
+    if not parts:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+    ids = np.concatenate([p[0] for p in parts])
+    scores = np.concatenate([p[1] for p in parts])
+    order = scores.argsort(kind="stable")[::-1][:k]
+    return ids[order], scores[order]
+
+
+class ShardedIndex:
+    """
+    A CorpusIndex whose scoring runs in `n_shards` worker processes.
+
+    Everything that is not scoring (passages, filters, file-level reduction,
+    language preference) is served from the wrapped coordinator-side index.
+    Semantic search merges each shard's top `sem_top` per language, so it is
+    exact for the first `sem_top` ranks. Shard processes stop when the index
+    is garbage-collected (e.g. after registry eviction and the last request).
+    """
+
+    def __init__(self, ix, n_shards: int, sem_top: int = 1000):
+        self._ix = ix
+        self.n_shards = int(n_shards)
+        self.sem_top = int(sem_top)
+        self._rids = itertools.count(1)
+        self._ranges = {
+            g: _row_ranges(len(ids), self.n_shards) for g, ids in ix.tfidf.ids.items()
+        }
+
+        ctx = mp.get_context("spawn")
+        self._conns, procs = [], []
+        self._shard_ids = []  # per shard: {lang: global ids of its rows}
+        self._shard_csr_nbytes = 0  # CSR row slices held by all shard processes
+        self._shard_vec_nbytes = 0  # the fitted vectorizers, one copy per shard
+        self._shard_emb_nbytes = 0  # embedding rows pushed to the shards
+        for s in range(self.n_shards):
+            parts = {}
+            for g, part in ix.tfidf.partitions.items():
+                a, b = self._ranges[g][s]
+                parts[g] = (
+                    np.asarray(ix.tfidf.ids[g][a:b]),
+                    part.vectorizer_char, part.X_char[a:b],
+                    part.vectorizer_word, part.X_word[a:b],
+                )
+            self._shard_ids.append({g: part[0] for g, part in parts.items()})
+            for ids, _vc, X_char, _vw, X_word in parts.values():
+                self._shard_csr_nbytes += int(ids.nbytes) + csr_footprint(X_char)["bytes"] + csr_footprint(X_word)["bytes"]
+            first = next(iter(ix.tfidf.partitions.values()), None)
+            w_char, w_word = (first.w_char, first.w_word) if first is not None else (0.6, 0.4)
+            parent, child = ctx.Pipe()
+            p = ctx.Process(
+                target=_shard_main, args=(child, _Shard(parts, w_char, w_word)),
+                name=f"shard-{ix.name}-{s}", daemon=True,
+            )
+            p.start()
+            child.close()
+            self._conns.append(_ShardConn(parent, f"shard-{ix.name}-{s}"))
+            procs.append(p)
+        self._shard_vec_nbytes = self.n_shards * sum(
+            mapping_nbytes(getattr(v, "vocabulary_", None)) + int(getattr(getattr(v, "idf_", None), "nbytes", 0))
+            for part in ix.tfidf.partitions.values() for v in (part.vectorizer_char, part.vectorizer_word)
+        )
+        self._finalizer = weakref.finalize(self, _shutdown, procs, list(self._conns))
+        self.tfidf = _ShardedTfidf(self, ix.tfidf)
+        if ix.embeddings is not None:
+            self._push_embeddings()
+
+    def __getattr__(self, name):
+        if name == "_ix":
+            raise AttributeError(name)
+        return getattr(self._ix, name)
+
+    def close(self):
+        self._finalizer()
+
+    # ----------------- Footprint -----------------
+    def nbytes(self) -> int:
+        """Coordinator index plus the CSR and embedding rows copied into the shard processes.
+
+        Same scope as CorpusIndex.nbytes() (matrices, embeddings, text), so
+        CORPUS_MEM_MB eviction sees what sharding really costs.
+        """
+        return self._ix.nbytes() + self._shard_csr_nbytes + self._shard_emb_nbytes
+
+    def footprint(self) -> dict:
+        """CorpusIndex.footprint() of the coordinator plus a "shards" entry for the process copies."""
+        out = self._ix.footprint()
+        shard_bytes = self._shard_csr_nbytes + self._shard_vec_nbytes + self._shard_emb_nbytes
+        out["shards"] = {
+            "n_shards": self.n_shards,
+            "csr_bytes": self._shard_csr_nbytes,
+            "vectorizer_bytes": self._shard_vec_nbytes,
+            "embedding_bytes": self._shard_emb_nbytes,
+            "bytes": shard_bytes,
+        }
+        out["bytes"] += shard_bytes
+        out["bytes_per_passage"] = round(out["bytes"] / max(1, out["passages"]["passages"]), 1)
+        return out
+
+    def _broadcast(self, op, args_per_shard, rid=None):
+        """Send one op to every shard, then collect all replies (shards work in parallel).
+
+        No lock: replies are matched by request id, so concurrent queries interleave.
+        """
+        rid = next(self._rids) if rid is None else rid
+        futs = [conn.call(rid, op, args) for conn, args in zip(self._conns, args_per_shard)]
+        out = []
+        for fut in futs:
+            try:
+                out.append(fut.result())
+            except RuntimeError as e:
+                raise RuntimeError(f"shard {op} failed: {e}") from None
+        return out
+
+    def _keep_slices(self, allow, groups):
+        """Per shard: {lang: allow mask over that shard's rows} for `groups` (None = no filter)."""
+        if allow is None:
+            return [None] * self.n_shards
+        return [{g: allow[ids[g]] for g in groups if g in ids} for ids in self._shard_ids]
+
+    # ----------------- Embeddings -----------------
+    def _push_embeddings(self):
+        emb = self._ix.embeddings
+        args = []
+        for s in range(self.n_shards):
+            rows = {}
+            for g, ids in self._ix.tfidf.ids.items():
+                a, b = self._ranges[g][s]
+                rows[g] = np.ascontiguousarray(emb[ids[a:b]])
+            args.append((rows,))
+        self._broadcast("set_embeddings", args)
+        self._shard_emb_nbytes = sum(int(r.nbytes) for (rows,) in args for r in rows.values())
+
+    def ensure_embeddings(self, embedder, model_name, build_dir="build", previous=None):
+        if self._ix.embeddings is None:
+            inner_prev = getattr(previous, "_ix", previous)
+            self._ix.ensure_embeddings(embedder, model_name, build_dir, previous=inner_prev)
+            self._push_embeddings()
+        return self._ix.embeddings
+
+    # ----------------- Ranking (scatter-gather) -----------------
+    def tfidf_rank(self, query, pool, q_lang=None, allow=None, fill=None):
+        ids, scores = self.tfidf.search_ids(query, k=pool, lang=q_lang, allow=allow, fill=fill)
+        ids = ids.tolist()
+        return ids, dict(zip(ids, (float(x) for x in scores)))
+
+    def _sem_scatter(self, q, groups, k, allow):
+        keeps = self._keep_slices(allow, groups)
+        per_shard = self._broadcast("semantic", [(q, groups, k, keep) for keep in keeps])
+        parts = {}
+        for res in per_shard:
+            for g, part in res.items():
+                parts.setdefault(g, []).append(part)
+        return [p for g in groups for p in parts.get(g, [])]
+
+    def semantic_search(self, q_emb, q_lang=None, allow=None, fill=None):
+        """Same contract as CorpusIndex.semantic_search(), over the shards' top `sem_top`."""
+        q = np.asarray(q_emb, dtype=np.float32).reshape(-1)
+        q = q / (np.linalg.norm(q) + 1e-12)
+        scores = np.full(len(self._ix.docs), -1.0, dtype=np.float32)
+        groups = list(self._ix.lang_slices)
+
+        def _rank(gs):
+            ids, s = _merge(self._sem_scatter(q, gs, self.sem_top, allow), self.sem_top * max(1, len(gs)))
+            scores[ids] = s
+            return ids.tolist()
+
+        if q_lang not in self._ix.lang_slices:
+            return _rank(groups), scores
+        order = _rank([q_lang])
+        if fill is None or len(order) < fill:
+            order += _rank([g for g in groups if g != q_lang])
+        return order, scores
@@ -0,0 +1,234 @@
+"""
+Memory-mapped, read-only corpus indexes for multi-worker serving.
+
+A parent process builds a `CorpusIndex` once and `export_index()`s it to a
+directory (point it at /dev/shm for RAM-backed shared memory). Worker
+processes `attach_index()` it: the TF-IDF CSR arrays, the embedding matrix and
+the passage text buffer are `np.load(..., mmap_mode="r")` views, so every
+worker shares the same physical pages and only pays for its interpreter, the
+embedding model and the (small) pickled vectorizer vocabularies.
+
+Layout of an export directory:
+
+    meta.json                      name, version, fingerprint, paths/langs tables, partitions
+    texts.bin + text_offsets.npy   UTF-8 passage texts, concatenated
+    doc_path.npy / doc_lang.npy    per passage: index into the paths / langs tables
+    file_starts.npy                file segment starts (file-level ranking)
+    part_<lang>/                   ids.npy, {char,word}_{data,indices,indptr}.npy, vectorizers.pkl
+    embeddings.npy                 optional, L2-normalized
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import scipy.sparse as sp
+
+from app_pkg.index import CorpusIndex
+from tfidf import PartitionedTfidfRetriever, TfidfRetriever
+
+FORMAT_VERSION = 1
+
+
+class PassageStore:
+    """Read-only sequence of passage dicts decoded on access from a shared text buffer."""
+
+    def __init__(self, buf, offsets, doc_path, doc_lang, paths, langs):
+        self._buf = buf
+        self._offsets = offsets
+        self._doc_path = doc_path
+        self._doc_lang = doc_lang
+        self._paths = paths
+        self._langs = langs
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def text(self, i: int) -> str:
+        return bytes(self._buf[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return {
+            "path": self._paths[self._doc_path[i]],
+            "text": self.text(i),
+            "lang": self._langs[self._doc_lang[i]],
+            "id": i,
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def subset(self, ids):
+        return _PassageView(self, ids)
+
+
+class _PassageView:
+    """Per-partition view (local position -> global passage) without copying dicts."""
+
+    def __init__(self, store, ids):
+        self._store = store
+        self._ids = ids
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __getitem__(self, j):
+        return self._store[self._ids[j]]
+
+
+def _save_csr(d, prefix, X):
+    X = X.tocsr()
+    np.save(os.path.join(d, f"{prefix}_data.npy"), X.data)
+    np.save(os.path.join(d, f"{prefix}_indices.npy"), X.indices)
+    np.save(os.path.join(d, f"{prefix}_indptr.npy"), X.indptr)
+    return list(X.shape)
+
+
+def _load_csr(d, prefix, shape):
+    def _ld(name):
+        return np.load(os.path.join(d, f"{prefix}_{name}.npy"), mmap_mode="r")
+
+    # copy=False keeps the memory-mapped buffers (no private copy per worker).
+    return sp.csr_matrix((_ld("data"), _ld("indices"), _ld("indptr")), shape=tuple(shape), copy=False)
+
+
+def export_index(ix: CorpusIndex, out_dir: str, with_embeddings: bool = True, embedding_model: str = None) -> str:
+    """Write `ix` as a memory-mappable directory; replaces `out_dir` atomically."""
+    parent = os.path.dirname(os.path.abspath(out_dir))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".export-", dir=parent)
+
+    paths = sorted(set(ix.paths))
+    langs = sorted(ix.lang_slices)
+    path_id = {p: i for i, p in enumerate(paths)}
+    lang_id = {L: i for i, L in enumerate(langs)}
+
+    blobs = [d["text"].encode("utf-8") for d in ix.docs]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(b) for b in blobs])
+    with open(os.path.join(tmp, "texts.bin"), "wb") as f:
+        for b in blobs:
+            f.write(b)
+    np.save(os.path.join(tmp, "text_offsets.npy"), offsets)
+    np.save(os.path.join(tmp, "doc_path.npy"), np.asarray([path_id[p] for p in ix.paths], dtype=np.int32))
+    np.save(os.path.join(tmp, "doc_lang.npy"), np.asarray([lang_id[d["lang"]] for d in ix.docs], dtype=np.int16))
+    np.save(os.path.join(tmp, "file_starts.npy"), np.asarray(ix.file_starts, dtype=np.int64))
+
+    parts = {}
+    for g, part in ix.tfidf.partitions.items():
+        pd = os.path.join(tmp, f"part_{g}")
+        os.makedirs(pd)
+        np.save(os.path.join(pd, "ids.npy"), ix.tfidf.ids[g])
+        with open(os.path.join(pd, "vectorizers.pkl"), "wb") as f:
+            pickle.dump((part.vectorizer_char, part.vectorizer_word), f, protocol=pickle.HIGHEST_PROTOCOL)
+        parts[g] = {
+            "char_shape": _save_csr(pd, "char", part.X_char),
+            "word_shape": _save_csr(pd, "word", part.X_word),
+            "w_char": part.w_char,
+            "w_word": part.w_word,
+        }
+
+    has_emb = with_embeddings and ix.embeddings is not None
+    if has_emb:
+        np.save(os.path.join(tmp, "embeddings.npy"), np.ascontiguousarray(ix.embeddings))
+
+    meta = {
+        "format": FORMAT_VERSION,
+        "name": ix.name,
+        "version": ix.version,
+        "fingerprint": ix.fingerprint,
+        "n_docs": len(blobs),
+        "paths": paths,
+        "langs": langs,
+        "lang_slices": {L: [sl.start, sl.stop] for L, sl in ix.lang_slices.items()},
+        "partition_key": ix.tfidf.key,
+        "partitions": parts,
+        "embeddings": has_emb,
+        "embedding_model": embedding_model if has_emb else None,
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    # Swap the finished directory in; readers never see a half-written export.
+    if os.path.isdir(out_dir):
+        old = tempfile.mkdtemp(prefix=".old-", dir=parent)
+        os.replace(out_dir, os.path.join(old, "x"))
+        os.replace(tmp, out_dir)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.replace(tmp, out_dir)
+    return out_dir
+
+
+def read_meta(index_dir: str):
+    """meta.json of an export, or None if `index_dir` holds no (compatible) export."""
+    try:
+        with open(os.path.join(index_dir, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("format") == FORMAT_VERSION else None
+
+
+def attach_index(index_dir: str, embedding_model: str = None) -> CorpusIndex:
+    """Zero-copy attach to an export written by `export_index()`.
+
+    Exported embeddings are only attached when they were built with
+    `embedding_model` (if given); otherwise the worker embeds on first use.
+    """
+    meta = read_meta(index_dir)
+    if meta is None:
+        raise FileNotFoundError(f"no shared index at {index_dir}")
+
+    def _ld(name):
+        return np.load(os.path.join(index_dir, name), mmap_mode="r")
+
+    n = int(meta["n_docs"])
+    offsets = _ld("text_offsets.npy")
+    buf = (
+        np.memmap(os.path.join(index_dir, "texts.bin"), dtype=np.uint8, mode="r")
+        if int(offsets[-1]) > 0 else np.empty(0, dtype=np.uint8)
+    )
+    doc_path = _ld("doc_path.npy")
+    store = PassageStore(buf, offsets, doc_path, _ld("doc_lang.npy"), meta["paths"], meta["langs"])
+
+    ids, partitions = {}, {}
+    for g, pm in meta["partitions"].items():
+        pd = os.path.join(index_dir, f"part_{g}")
+        ids[g] = np.load(os.path.join(pd, "ids.npy"), mmap_mode="r")
+        with open(os.path.join(pd, "vectorizers.pkl"), "rb") as f:
+            vec_char, vec_word = pickle.load(f)
+        partitions[g] = TfidfRetriever.from_fitted(
+            store.subset(ids[g]),
+            vec_char, _load_csr(pd, "char", pm["char_shape"]),
+            vec_word, _load_csr(pd, "word", pm["word_shape"]),
+            w_char=pm["w_char"], w_word=pm["w_word"],
+        )
+    tfidf = PartitionedTfidfRetriever.from_partitions(store, ids, partitions, key=meta["partition_key"])
+
+    ix = CorpusIndex(
+        store,
+        name=meta["name"],
+        fingerprint=meta["fingerprint"],
+        tfidf=tfidf,
+        lang_slices={L: slice(a, b) for L, (a, b) in meta["lang_slices"].items()},
+        file_starts=_ld("file_starts.npy"),
+        paths=[meta["paths"][j] for j in doc_path] if n else [],
+        text_nbytes=int(offsets[-1]),
+    )
+    if meta["embeddings"] and embedding_model in (None, meta.get("embedding_model")):
+        ix.embeddings = _ld("embeddings.npy")
+    return ix
@@ -0,0 +1,73 @@
+"""
+Single-flight coalescing of identical in-flight calls.
+
+When the same question arrives many times at once (a sample question, a
+clarify option during a spike), only the first caller (the leader) computes;
+concurrent callers with the same key wait for that result instead of running
+retrieval again. Nothing is cached: once the leader finishes, the next call
+with the key computes afresh.
+
+Dependency-light (no imports from app.py).
+"""
+
+from __future__ import annotations
+
+import copy
+import datetime as _dt
+import threading
+import uuid
+from concurrent.futures import Future
+
+
+class SingleFlight:
+    """`do(key, fn)` runs `fn()` once per key among concurrent callers."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Return (result, shared): shared=True when another caller's computation was reused.
+
+        Exceptions raised by the leader propagate to every waiter.
+        """
+        with self._lock:
+            self.calls += 1
+            fut = self._inflight.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return fut.result(), True
+        try:
+            res = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(res)
+            return res, False
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"calls": self.calls, "coalesced": self.coalesced, "inflight": len(self._inflight)}
+
+
+def restamp_trace(payload: dict) -> dict:
+    """Deep copy of an answer() trace payload with a fresh sniper trace_id and timestamp."""
+    out = copy.deepcopy(payload)
+    st = out.get("sniper_trace_v1")
+    if isinstance(st, dict):
+        st["trace_id"] = str(uuid.uuid4())
+        ts = _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds")
+        if str(st.get("timestamp", "")).endswith("Z"):
+            ts = ts.replace("+00:00", "Z")
+        st["timestamp"] = ts
+    return out
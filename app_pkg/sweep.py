@@ -0,0 +1,362 @@
+"""
+Retrieval parameter sweeps over cached score matrices.
+
+Scoring the eval set is the expensive part of an eval run; fusing and gating
+the scores is cheap. `score_matrices()` computes, once per (corpus, eval set,
+embedder), the per-query, per-passage inputs of every retrieval mode:
+
+- `char`, `word`: raw TF-IDF cosine per analyzer; the replay max-normalizes
+  them over the partitions it ranks together, exactly as
+  `PartitionedTfidfRetriever` does before weighting with `w_char`/`w_word`,
+- `sem`: embedding cosine (when an embedder is available),
+
+and `save_scores()`/`load_scores()` keep them in `build/sweep/` keyed by the
+corpus fingerprint, eval file and embedder. `Sweep` then replays `answer()`'s
+retrieval for any parameter setting from those matrices:
+
+- TF-IDF: `w_char * char + w_word * word`, top `pool` of the query's language
+  partition, other partitions appended only below `k` passages (`fill`);
+- Semantic: cosine within the routed embedding slice, same backfill rule;
+- Hybrid: RRF of the TF-IDF pool (`pool`, `tf_cand`) and the semantic top
+  `sem_cand` with offset `k0`, ties broken in insertion order like the dict;
+- abstain gate: `s1 < min_top` or `s1 - s2 < min_gap` on the top-k scores.
+
+Rankings depend only on the fusion parameters, so each fusion setting is
+ranked once and every (min_top, min_gap) pair is gated in one vectorized
+step. Only the score gate is replayed; `answer()`'s lexical-overlap and
+broad-query checks run on passage text and are not part of the sweep.
+
+    sw = Sweep(scores, gt, k=3)
+    rows = sw.run("hybrid", grid({"k0": [30, 60, 90], "min_top": [0.2, 0.25]}))
+    front = pareto_front(rows, "answered_ndcg")
+
+Dependency-light (NumPy; no imports from app.py).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import itertools
+import json
+import os
+import random
+
+import numpy as np
+
+from app_pkg.evaluation import per_query_metrics
+from app_pkg.index import cos_scores_np
+from app_pkg.retrieval import ABSTAIN_MIN_GAP, ABSTAIN_MIN_TOP, RRF_K0, RRF_SEM_CAND, RRF_TF_CAND, tfidf_pool
+
+MODES = ("tfidf", "semantic", "hybrid")
+# Bumped when the meaning of the cached matrices changes (2: raw, not per-partition normalized, TF-IDF).
+SCORES_VERSION = 2
+
+# answer()'s current settings (app_pkg.retrieval; TfidfRetriever weights), per mode family for the abstain gate.
+# "pool" is tfidf_pool(k) for the k <= 20 the sweeps use.
+DEFAULTS = {
+    "tfidf": {
+        "w_char": 0.6, "w_word": 0.4, "pool": tfidf_pool(1),
+        "min_top": ABSTAIN_MIN_TOP["tfidf"], "min_gap": ABSTAIN_MIN_GAP["tfidf"],
+    },
+    "semantic": {"min_top": ABSTAIN_MIN_TOP["semantic"], "min_gap": ABSTAIN_MIN_GAP["semantic"]},
+    "hybrid": {
+        "w_char": 0.6, "w_word": 0.4, "pool": tfidf_pool(1),
+        "tf_cand": RRF_TF_CAND, "sem_cand": RRF_SEM_CAND, "k0": RRF_K0,
+        "min_top": ABSTAIN_MIN_TOP["semantic"], "min_gap": ABSTAIN_MIN_GAP["semantic"],
+    },
+}
+
+# Default search space (grid or random samples from it).
+SPACE = {
+    "w_char": [0.2, 0.4, 0.6, 0.8, 1.0],
+    "w_word": [0.2, 0.4, 0.6, 0.8],
+    "pool": [50, 200, 500],
+    "tf_cand": [100, 300, 1200],
+    "sem_cand": [50, 100, 300, 1000],
+    "k0": [10.0, 30.0, 60.0, 90.0],
+    "min_top": {"tfidf": [0.0, 0.05, 0.1, 0.2, 0.3], "semantic": [0.0, 0.15, 0.25, 0.35, 0.45]},
+    "min_gap": {"tfidf": [0.0, 0.01, 0.02, 0.05], "semantic": [0.0, 0.01, 0.03, 0.05]},
+}
+
+FUSION_PARAMS = ("w_char", "w_word", "pool", "tf_cand", "sem_cand", "k0")
+GATE_PARAMS = ("min_top", "min_gap")
+OBJECTIVES = ("p_at_k", "r_at_k", "mrr", "ndcg", "answered_p_at_k", "answered_ndcg")
+
+
+def _family(mode: str) -> str:
+    return "tfidf" if mode == "tfidf" else "semantic"
+
+
+def space_for(mode: str, space=None) -> dict:
+    """Search space restricted to the parameters `mode` uses."""
+    space = SPACE if space is None else space
+    out = {}
+    for name in DEFAULTS[mode]:
+        vals = space.get(name, [DEFAULTS[mode][name]])
+        out[name] = list(vals[_family(mode)] if isinstance(vals, dict) else vals)
+    return out
+
+
+def grid(space: dict) -> list:
+    """Every combination of `space` ({param: [values]})."""
+    names = list(space)
+    return [dict(zip(names, vals)) for vals in itertools.product(*(space[n] for n in names))]
+
+
+def sample(space: dict, n: int, seed: int = 0) -> list:
+    """`n` distinct random combinations of `space` (all of them if the grid is smaller)."""
+    full = grid(space)
+    if n >= len(full):
+        return full
+    return random.Random(seed).sample(full, n)
+
+
+def parse_space(spec: str) -> dict:
+    """'k0=30,60;min_top=0.2,0.3' -> {"k0": [30.0, 60.0], "min_top": [0.2, 0.3]}."""
+    out = {}
+    for part in (spec or "").split(";"):
+        if not part.strip():
+            continue
+        name, _, vals = part.partition("=")
+        name = name.strip()
+        if name not in FUSION_PARAMS + GATE_PARAMS:
+            raise ValueError(f"unknown sweep parameter {name!r} (known: {', '.join(FUSION_PARAMS + GATE_PARAMS)})")
+        cast = int if name in ("pool", "tf_cand", "sem_cand") else float
+        out[name] = [cast(v) for v in vals.split(",") if v.strip()]
+    return out
+
+
+# ----------------- Score matrices -----------------
+def score_matrices(ix, queries, q_langs, encode=None) -> dict:
+    """Raw per-query score matrices for corpus `ix` (see module docstring).
+
+    `encode(query) -> vector` enables `sem` (needs `ix.embeddings`); without it
+    only the TF-IDF modes can be swept.
+    """
+    parts = getattr(ix.tfidf, "partitions", None)
+    if parts is None:
+        raise ValueError("sweeps need the in-process language-partitioned TF-IDF index")
+    nq, n = len(queries), len(ix.docs)
+    char = np.zeros((nq, n))
+    word = np.zeros((nq, n))
+    for q, query in enumerate(queries):
+        for g, part in parts.items():
+            c, w = part.raw_component_scores(query)
+            ids = ix.tfidf.ids[g]
+            char[q, ids], word[q, ids] = c, w
+    out = {"char": char, "word": word, "langs": np.array([d["lang"] for d in ix.docs]), "q_langs": np.array(q_langs)}
+    if encode is not None and getattr(ix, "embeddings", None) is not None:
+        emb = ix.embeddings
+        out["sem"] = np.stack([cos_scores_np(np.asarray(encode(query)), emb) for query in queries]) if nq else np.zeros((0, n))
+    return out
+
+
+def cache_key(fingerprint: str, queries, q_langs, embedder: str = "") -> str:
+    h = hashlib.sha1()
+    h.update(json.dumps([SCORES_VERSION, fingerprint, list(queries), list(q_langs), embedder or ""],
+                        ensure_ascii=False).encode("utf-8"))
+    return h.hexdigest()[:16]
+
+
+def save_scores(path: str, scores: dict) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **scores)
+    os.replace(tmp, path)
+    return path
+
+
+def load_scores(path: str):
+    """Cached matrices or None if `path` does not exist."""
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as z:
+        return {name: z[name] for name in z.files}
+
+
+# ----------------- Replay -----------------
+def _unit_max(scores, m):
+    # Same arithmetic as TfidfRetriever._safe_unit_max.
+    return scores if m <= 0.0 else scores / (m + 1e-12)
+
+
+class Sweep:
+    """Replays retrieval + abstain gate from cached score matrices for many parameter settings."""
+
+    def __init__(self, scores: dict, ground_truth, k: int = 3, allow=None):
+        self.k = int(k)
+        self.char, self.word = scores["char"], scores["word"]
+        self.sem = scores.get("sem")
+        langs, q_langs = scores["langs"], scores["q_langs"]
+        n = self.char.shape[1]
+        allow = np.ones(n, dtype=bool) if allow is None else np.asarray(allow, dtype=bool)
+        # Language partitions in index order (all ids for normalization, allowed ids for ranking),
+        # and each query's routed partition.
+        self.parts, self.part_ids = {}, {}
+        for lang in dict.fromkeys(langs.tolist()):
+            ids = np.flatnonzero(langs == lang)
+            self.part_ids[lang] = ids
+            self.parts[lang] = ids[allow[ids]]
+        self.route = [ql if ql in self.parts else None for ql in q_langs.tolist()]
+        self.nq = len(q_langs)
+        self.gt = np.zeros((self.nq, n), dtype=bool)
+        for q, ids in enumerate(ground_truth):
+            self.gt[q, list(ids)] = True
+        self.n_gt = self.gt.sum(axis=1)
+        self._tf_cache = {}
+
+    @property
+    def modes(self):
+        return MODES if self.sem is not None else ("tfidf",)
+
+    # -- rankings (same ordering rules as CorpusIndex.tfidf_rank / semantic_search) --
+    def _tfidf_order(self, q, w_char, w_word, pool):
+        key = (q, w_char, w_word, pool)
+        hit = self._tf_cache.get(key)
+        if hit is None:
+            char, word = self.char[q], self.word[q]
+            fused = np.zeros(char.shape[0])
+
+            def fuse(groups):
+                # Max-normalize over the union of `groups` (PartitionedTfidfRetriever._rank).
+                ids = np.concatenate([self.part_ids[g] for g in groups]) if groups else np.empty(0, dtype=np.int64)
+                m_char = float(char[ids].max()) if ids.size else 0.0
+                m_word = float(word[ids].max()) if ids.size else 0.0
+                fused[ids] = (w_char * _unit_max(char[ids], m_char)) + (w_word * _unit_max(word[ids], m_word))
+
+            def top(ids, n):
+                return ids[fused[ids].argsort()[::-1][:n]]
+
+            def merge(lists, n):
+                ids = np.concatenate(lists) if lists else np.empty(0, dtype=np.int64)
+                return ids[fused[ids].argsort(kind="stable")[::-1][:n]]
+
+            lang = self.route[q]
+            if lang is None:
+                fuse(list(self.parts))
+                order = merge([top(ids, pool) for ids in self.parts.values()], pool)
+            else:
+                fuse([lang])
+                order = top(self.parts[lang], pool)
+                if len(order) < min(self.k, pool):  # fill=k: backfill from the other partitions
+                    rest = pool - len(order)
+                    fuse([g for g in self.parts if g != lang])
+                    others = [top(ids, rest) for g, ids in self.parts.items() if g != lang]
+                    order = np.concatenate([order, merge(others, rest)])
+            hit = self._tf_cache[key] = (order, fused)
+        return hit
+
+    def _sem_order(self, q):
+        s = self.sem[q]
+
+        def ranked(lists):
+            ids = np.concatenate(lists) if lists else np.empty(0, dtype=np.int64)
+            return ids[np.argsort(s[ids], kind="stable")[::-1]]
+
+        lang = self.route[q]
+        if lang is None:
+            return ranked(list(self.parts.values()))
+        order = ranked([self.parts[lang]])
+        if len(order) < self.k:
+            order = np.concatenate([order, ranked([ids for g, ids in self.parts.items() if g != lang])])
+        return order
+
+    def rank(self, mode: str, params: dict, q: int):
+        """(top-k ids, their gate scores) for query `q`."""
+        k = self.k
+        if mode == "tfidf":
+            order, fused = self._tfidf_order(q, params["w_char"], params["w_word"], int(params["pool"]))
+            top = order[:k]
+            return top, fused[top]
+        sem_order = self._sem_order(q)
+        if mode == "semantic":
+            top = sem_order[:k]
+            return top, self.sem[q][top]
+        tf_order, _ = self._tfidf_order(q, params["w_char"], params["w_word"], int(params["pool"]))
+        k0 = float(params["k0"])
+        tf_top = tf_order[: int(params["tf_cand"])]
+        sem_top = sem_order[: int(params["sem_cand"])]
+        rrf = np.zeros(self.char.shape[1])
+        pos = np.full(self.char.shape[1], np.inf)
+        rrf[tf_top] += 1.0 / (k0 + np.arange(len(tf_top)) + 1)
+        pos[tf_top] = np.arange(len(tf_top))
+        rrf[sem_top] += 1.0 / (k0 + np.arange(len(sem_top)) + 1)
+        new = sem_top[np.isinf(pos[sem_top])]
+        pos[new] = len(tf_top) + np.arange(len(new))  # dict insertion order breaks RRF ties
+        cand = np.union1d(tf_top, sem_top)
+        top = cand[np.lexsort((pos[cand], -rrf[cand]))][:k]
+        return top, self.sem[q][top]
+
+    # -- evaluation --
+    def evaluate(self, mode: str, fusion: dict, gates) -> list:
+        """One row per gate setting for one fusion setting (rankings computed once)."""
+        k = self.k
+        preds = np.full((self.nq, k), -1, dtype=np.int64)
+        s1 = np.full(self.nq, -np.inf)
+        s2 = np.full(self.nq, np.nan)
+        for q in range(self.nq):
+            top, sc = self.rank(mode, fusion, q)
+            preds[q, : len(top)] = top
+            if len(sc):
+                s1[q] = sc[0]
+            if len(sc) > 1:
+                s2[q] = sc[1]
+        valid = preds >= 0
+        rel = self.gt[np.arange(self.nq)[:, None], np.maximum(preds, 0)] & valid
+        per_q = per_query_metrics(rel, valid.sum(axis=1), self.n_gt, k)
+        quality = {m: float(v.mean()) if self.nq else 0.0 for m, v in per_q.items()}
+
+        min_top = np.array([g["min_top"] for g in gates], dtype=float)[:, None]
+        min_gap = np.array([g["min_gap"] for g in gates], dtype=float)[:, None]
+        gap = np.where(np.isnan(s2), np.inf, s1 - s2)
+        abstain = (s1[None, :] < min_top) | (gap[None, :] < min_gap)  # (gates, queries)
+        answered = ~abstain
+        n_ans = answered.sum(axis=1)
+        ans_p = (answered * per_q["p_at_k"]).sum(axis=1) / np.maximum(1, n_ans)
+        ans_ndcg = (answered * per_q["ndcg"]).sum(axis=1) / np.maximum(1, n_ans)
+
+        rows = []
+        for i, g in enumerate(gates):
+            rows.append({
+                "mode": mode,
+                "params": {**fusion, **g},
+                **quality,
+                "abstain_rate": float(abstain[i].mean()) if self.nq else 0.0,
+                "answered_p_at_k": float(ans_p[i]),
+                "answered_ndcg": float(ans_ndcg[i]),
+            })
+        return rows
+
+    def run(self, mode: str, configs) -> list:
+        """Rows for every config ({param: value}, missing params = current defaults)."""
+        if mode not in self.modes:
+            raise ValueError(f"mode {mode!r} needs semantic scores (available: {', '.join(self.modes)})")
+        groups = {}
+        for cfg in configs:
+            full = {**DEFAULTS[mode], **{p: v for p, v in cfg.items() if p in DEFAULTS[mode]}}
+            fusion = tuple((p, full[p]) for p in FUSION_PARAMS if p in full)
+            gate = {p: full[p] for p in GATE_PARAMS}
+            groups.setdefault(fusion, []).append(gate)
+        rows = []
+        for fusion, gates in groups.items():
+            rows += self.evaluate(mode, dict(fusion), gates)
+        return rows
+
+
+def pareto_front(rows, objective: str = "answered_ndcg") -> list:
+    """Rows not dominated on (higher `objective`, lower abstain rate), by ascending abstain rate."""
+    if objective not in OBJECTIVES:
+        raise ValueError(f"objective must be one of {OBJECTIVES}")
+    ordered = sorted(rows, key=lambda r: (r["abstain_rate"], -r[objective]))
+    front, best = [], -np.inf
+    for r in ordered:
+        if r[objective] > best:
+            front.append(r)
+            best = r[objective]
+    return front
+
+
+def best_row(rows, objective: str = "answered_ndcg", max_abstain: float = 1.0):
+    """Highest `objective` with abstain rate <= `max_abstain` (lower abstain rate breaks ties)."""
+    ok = [r for r in rows if r["abstain_rate"] <= max_abstain]
+    return max(ok, key=lambda r: (r[objective], -r["abstain_rate"])) if ok else None
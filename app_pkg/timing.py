@@ -0,0 +1,80 @@
+"""
+Per-stage request timing.
+
+`StageTimer` splits one request into named stages with `time.perf_counter()`
+marks (a float subtraction and a dict update per stage, so it stays on in
+production). `LatencyStats` keeps a bounded window of recent samples per
+(mode, stage) and reports p50/p95/p99 on demand.
+
+Dependency-light (no imports from app.py); numpy is only used for reports.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+
+
+class StageTimer:
+    """Monotonic stage timer: `mark(stage)` charges the time since the previous mark to `stage`."""
+
+    __slots__ = ("_t0", "_last", "stages", "label")
+
+    def __init__(self):
+        self._t0 = self._last = time.perf_counter()
+        self.stages = {}
+        self.label = None  # e.g. the retrieval mode actually used
+
+    def mark(self, stage: str) -> None:
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last) * 1000.0
+        self._last = now
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self._t0) * 1000.0
+
+    def as_dict(self, ndigits: int = 3) -> dict:
+        """Stage breakdown in ms (insertion order) plus "total" so far."""
+        out = {k: round(v, ndigits) for k, v in self.stages.items()}
+        out["total"] = round(self.total_ms(), ndigits)
+        return out
+
+
+class LatencyStats:
+    """Windowed latency samples per (mode, stage); percentiles over the last `window` requests."""
+
+    def __init__(self, window: int = 2048, quantiles=(50, 95, 99)):
+        self.window = int(window)
+        self.quantiles = tuple(quantiles)
+        self._lock = threading.Lock()
+        self._samples = {}
+        self.count = 0
+
+    def record(self, mode: str, timings_ms: dict) -> None:
+        with self._lock:
+            self.count += 1
+            for stage, ms in timings_ms.items():
+                buf = self._samples.get((mode, stage))
+                if buf is None:
+                    buf = self._samples[(mode, stage)] = deque(maxlen=self.window)
+                buf.append(ms)
+
+    def summary(self) -> dict:
+        """{mode: {stage: {"n": .., "p50": .., "p95": .., "p99": ..}}} in ms."""
+        import numpy as np
+
+        with self._lock:
+            snap = {key: list(buf) for key, buf in self._samples.items()}
+        out = {}
+        for (mode, stage), xs in sorted(snap.items()):
+            pct = np.percentile(np.asarray(xs, dtype=float), self.quantiles)
+            row = {"n": len(xs)}
+            row.update({f"p{q}": round(float(v), 3) for q, v in zip(self.quantiles, pct)})
+            out.setdefault(mode, {})[stage] = row
+        return out
+
+    def reset(self) -> None:
+        with self._lock:
+            self._samples.clear()
+            self.count = 0
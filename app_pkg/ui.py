@@ -0,0 +1,162 @@
+"""
+Gradio request path: queued, batched Search and a process pool for retrieval.
+
+Retrieval is CPU-bound Python/NumPy. Run on Gradio's worker threads it holds
+the UI process' GIL, so concurrent users serialize and even light events
+(sample pick, reset) wait behind it. Instead:
+
+- the demo is queued (`demo.queue(default_concurrency_limit=..., max_size=...)`)
+  and Search is a `batch=True` handler: Gradio hands it up to `max_batch`
+  waiting requests at once, at most `concurrency` batches in flight;
+- the handler passes the batch to `AnswerOffload.run()`, which splits it into
+  one contiguous chunk per pool worker and returns the results in request
+  order. With `pool="process"` the workers are spawned processes that build
+  the corpus index once in the pool initializer; the embedding model loads on
+  a worker's first Semantic/Hybrid request (`UI_EAGER_MODEL=1`: in the
+  initializer). `"thread"` keeps the work in-process (memory-tight hosts) and
+  `"inline"` answers on the calling thread (tests, debugging).
+
+    cfg = from_env()   # UI_POOL, UI_WORKERS, UI_CONCURRENCY, UI_MAX_BATCH, UI_QUEUE_SIZE, UI_EAGER_MODEL
+    off = AnswerOffload(answer_batch, cfg.pool, cfg.workers, initializer=init)
+    off.run([{"query": ...}, ...])  # -> [answer_batch result per request]
+
+`bench.py ui` measures latency, throughput and UI-process responsiveness under
+N concurrent users for the direct and the batched/offloaded path.
+
+Dependency-light (stdlib only; no imports from app.py): the batch function and
+pool initializer are passed in and must be picklable (module-level) for
+`pool="process"`.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import multiprocessing as mp
+import os
+import threading
+from dataclasses import asdict, dataclass
+
+POOLS = ("process", "thread", "inline")
+
+
+@dataclass(frozen=True)
+class UiConfig:
+    pool: str  # "process" | "thread" | "inline"
+    workers: int  # offload pool size
+    concurrency: int  # batches (events) Gradio runs at once
+    max_batch: int  # requests per batch=True call
+    queue_size: int  # waiting events before Gradio rejects (0 = unbounded)
+    eager_model: bool = False  # load the embedding model in each worker at start (default: on first use)
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def from_env(environ=None, default_workers: int = 2) -> UiConfig:
+    env = os.environ if environ is None else environ
+    pool = env.get("UI_POOL", "process")
+    if pool not in POOLS:
+        raise ValueError(f"UI_POOL must be one of {', '.join(POOLS)}, not {pool!r}")
+    return UiConfig(
+        pool=pool,
+        workers=max(1, int(env.get("UI_WORKERS") or default_workers)),
+        concurrency=max(1, int(env.get("UI_CONCURRENCY") or 2)),
+        max_batch=max(1, int(env.get("UI_MAX_BATCH") or 8)),
+        queue_size=max(0, int(env.get("UI_QUEUE_SIZE") or 64)),
+        eager_model=env.get("UI_EAGER_MODEL", "0") == "1",
+    )
+
+
+def split(items, parts: int):
+    """`items` cut into at most `parts` contiguous, near-equal chunks (order kept)."""
+    n = len(items)
+    parts = max(1, min(parts, n))
+    size, extra = divmod(n, parts)
+    out, start = [], 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        out.append(items[start:end])
+        start = end
+    return [c for c in out if c]
+
+
+class AnswerOffload:
+    """Runs `fn(list of requests) -> list of results` on a pool, one chunk per worker."""
+
+    def __init__(self, fn, pool: str = "process", workers: int = 2, initializer=None, initargs=()):
+        if pool not in POOLS:
+            raise ValueError(f"pool must be one of {', '.join(POOLS)}, not {pool!r}")
+        self.fn = fn
+        self.pool_kind = pool
+        self.workers = max(1, int(workers))
+        self._initializer = initializer
+        self._initargs = tuple(initargs)
+        self._pool = None
+        self._lock = threading.Lock()
+        self._stats = {"batches": 0, "requests": 0, "chunks": 0, "max_batch_seen": 0, "restarts": 0}
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                if self.pool_kind == "process":
+                    self._pool = concurrent.futures.ProcessPoolExecutor(
+                        self.workers, mp_context=mp.get_context("spawn"),
+                        initializer=self._initializer, initargs=self._initargs,
+                    )
+                else:
+                    if self._initializer is not None:
+                        self._initializer(*self._initargs)
+                    self._pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="ui-answer")
+            return self._pool
+
+    def start(self) -> "AnswerOffload":
+        """Create the pool now and have every worker run the initializer (index build, model load)."""
+        if self.pool_kind == "inline":
+            if self._initializer is not None:
+                self._initializer(*self._initargs)
+            return self
+        pool = self._executor()
+        for f in [pool.submit(self.fn, []) for _ in range(self.workers)]:
+            f.result()
+        return self
+
+    def run(self, requests) -> list:
+        requests = list(requests)
+        if not requests:
+            return []
+        chunks = [requests] if self.pool_kind == "inline" else split(requests, self.workers)
+        with self._lock:
+            s = self._stats
+            s["batches"] += 1
+            s["requests"] += len(requests)
+            s["chunks"] += len(chunks)
+            s["max_batch_seen"] = max(s["max_batch_seen"], len(requests))
+        if self.pool_kind == "inline":
+            return list(self.fn(requests))
+        try:
+            futs = [self._executor().submit(self.fn, c) for c in chunks]
+            return [r for f in futs for r in f.result()]
+        except concurrent.futures.BrokenExecutor:
+            self.restart()  # a worker died (OOM, kill): next batch gets a fresh pool
+            raise
+
+    def restart(self) -> None:
+        """Drop the pool; the next batch starts fresh workers."""
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._stats["restarts"] += 1
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        s["mean_batch"] = round(s["requests"] / s["batches"], 2) if s["batches"] else 0.0
+        s["workers"] = self.workers
+        return s
+
+    def close(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
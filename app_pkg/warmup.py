@@ -0,0 +1,163 @@
+"""
+Cache warm-up: replay the most common questions after a start or deploy.
+
+The first requests after a restart pay for building the corpus index, loading
+the embedding model, computing doc embeddings and filling the per-query
+caches (query embeddings, language detection, filename masks, FAQ index).
+`CacheWarmer` runs a fixed query set through `answer()` ahead of users:
+
+- query set: the UI sample questions, the clarify replies "1".."4" (expanded
+  inside `answer()`), then the top-N most frequent queries of the query log
+  (`top_logged_queries()`; CSV, JSONL or gzip JSONL as written by
+  `app_pkg.logging_utils`), de-duplicated in that order;
+- each query is run once per combination of mode/filters (`combos`);
+- before every call the warmer checks `busy()` (live traffic) and waits
+  while it is true; after `max_defer_s` of waiting the rest is skipped, so a
+  warm-up never competes with real users for long.
+
+`run()` returns a report (planned/executed/skipped/errors, coverage, time,
+deferrals); `start()` runs it on a daemon thread once or every `interval_s`.
+
+    w = CacheWarmer(lambda q, **kw: answer(q, **kw), queries, [{"mode": "Hybrid"}], busy=live_traffic)
+    w.start()
+
+Dependency-light (stdlib only; no imports from app.py).
+"""
+
+from __future__ import annotations
+
+import csv
+import gzip
+import json
+import os
+import threading
+import time
+from collections import Counter
+
+
+def top_logged_queries(path: str, n: int, field: str = "query") -> list:
+    """The `n` most frequent queries in a query log (empty if the file is missing or unreadable)."""
+    if n <= 0 or not path or not os.path.exists(path):
+        return []
+    counts = Counter()
+    try:
+        if path.endswith(".gz"):
+            f = gzip.open(path, "rt", encoding="utf-8")
+        else:
+            f = open(path, "r", encoding="utf-8", newline="")
+        with f:
+            if path.endswith(".csv"):
+                rows = csv.DictReader(f)
+            else:
+                rows = (json.loads(line) for line in f if line.strip())
+            for row in rows:
+                q = (row.get(field) or "").strip()
+                if q:
+                    counts[q] += 1
+    except (OSError, ValueError, EOFError):
+        pass  # best effort: a half-written or rotated log must not break start-up
+    return [q for q, _ in counts.most_common(n)]
+
+
+def query_set(*sources) -> list:
+    """[(query, source)] from (source name, queries) pairs, first occurrence of a query wins."""
+    seen, out = set(), []
+    for name, queries in sources:
+        for q in queries:
+            key = q.strip()
+            if key and key not in seen:
+                seen.add(key)
+                out.append((key, name))
+    return out
+
+
+class CacheWarmer:
+    """Runs `run(query, **combo)` for every query x combo, yielding to live traffic."""
+
+    def __init__(self, run, queries, combos=({},), busy=None, poll_s: float = 0.25, max_defer_s: float = 60.0,
+                 sleep=time.sleep):
+        self._run = run
+        self.queries = list(queries)  # [(query, source)] or plain strings
+        self.combos = [dict(c) for c in combos] or [{}]
+        self._busy = busy or (lambda: False)
+        self.poll_s = float(poll_s)
+        self.max_defer_s = float(max_defer_s)
+        self._sleep = sleep
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._report = None
+
+    def _wait_idle(self, state) -> bool:
+        """False if live traffic outlasted the deferral budget (or stop() was called)."""
+        while self._busy():
+            if self._stop.is_set() or state["deferred_s"] >= self.max_defer_s:
+                return False
+            state["deferrals"] += 1
+            self._sleep(self.poll_s)
+            state["deferred_s"] += self.poll_s
+        return not self._stop.is_set()
+
+    def run(self) -> dict:
+        items = [q if isinstance(q, tuple) else (q, "custom") for q in self.queries]
+        planned = len(items) * len(self.combos)
+        state = {"deferrals": 0, "deferred_s": 0.0}
+        executed = errors = 0
+        warmed, by_source = set(), Counter()
+        t0 = time.perf_counter()
+        stopped = False
+        for query, source in items:
+            done = 0
+            for combo in self.combos:
+                if not self._wait_idle(state):
+                    stopped = True
+                    break
+                try:
+                    self._run(query, **combo)
+                    executed += 1
+                    done += 1
+                except Exception:
+                    errors += 1
+            if done == len(self.combos):
+                warmed.add(query)
+                by_source[source] += 1
+            if stopped:
+                break
+        elapsed = time.perf_counter() - t0
+        report = {
+            "planned": planned,
+            "executed": executed,
+            "errors": errors,
+            "skipped": planned - executed - errors,
+            "coverage": round(executed / planned, 4) if planned else 1.0,
+            "queries_warmed": len(warmed),
+            "by_source": dict(by_source),
+            "elapsed_s": round(elapsed, 3),
+            "deferrals": state["deferrals"],
+            "deferred_s": round(state["deferred_s"], 3),
+            "finished_at": time.time(),
+        }
+        with self._lock:
+            self._report = report
+        return report
+
+    def report(self):
+        with self._lock:
+            return dict(self._report) if self._report is not None else None
+
+    def start(self, interval_s: float = 0.0) -> threading.Thread:
+        """Warm on a daemon thread: once, or every `interval_s` seconds until stop()."""
+        def loop():
+            while not self._stop.is_set():
+                self.run()
+                if interval_s <= 0 or self._stop.wait(interval_s):
+                    return
+
+        self._thread = threading.Thread(target=loop, name="cache-warmer", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
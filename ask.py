@@ -1,24 +1,86 @@
 import argparse
-import app  # uses your existing answer() + filters
+import json
+import os
+import urllib.request
+
+from app_pkg import batch
+
+
+def ask_server(url: str, body: dict, timeout: float = 60.0) -> dict:
+    """POST `body` to a running `server.py` /answer endpoint; returns its JSON response."""
+    req = urllib.request.Request(
+        url.rstrip("/") + "/answer",
+        data=json.dumps(body).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        return json.loads(resp.read().decode("utf-8"))
+
+
+def ask_batch(args) -> dict:
+    """Answer a JSONL batch in-process or against `--server`, with the same row format as `cli.py ask --batch`."""
+    defaults = {"k": args.k, "mode": args.mode, "include": args.include, "exclude": args.exclude,
+                "lang": args.lang or None}
+
+    if args.server:
+        def fn(item):
+            res = ask_server(args.server, {"query": item["query"], **batch.item_options(item, defaults)})
+            return batch.answer_row(res["answer"], res["sources"], res.get("trace") or {})
+    else:
+        import app
+
+        def fn(item):
+            ans, src, tr = app.answer(item["query"], trace=True, **batch.item_options(item, defaults))
+            return batch.answer_row(ans, src, json.loads(tr))
+
+    return batch.run_ask_batch(args.batch, args.out, fn, workers=args.workers, resume=not args.no_resume)
+
 
 def main():
     p = argparse.ArgumentParser(description="Ask a question against the Wohngeld RAG.")
-    p.add_argument("question", help="Your question text")
+    p.add_argument("question", nargs="?", default="", help="Your question text (omit with --batch)")
     p.add_argument("-m", "--mode", choices=["TF-IDF", "Semantic", "Hybrid"], default="TF-IDF")
     p.add_argument("-k", "--k", type=int, default=3)
     p.add_argument("-i", "--include", default="wohngeld", help="Comma-separated filename keywords to include")
     p.add_argument("-x", "--exclude", default="", help="Comma-separated filename keywords to exclude")
     p.add_argument("-l", "--lang", default="", help="Force language (de/en/ar). Empty = auto-detect.")
+    p.add_argument(
+        "-s", "--server", default=os.getenv("ANSWER_URL", ""),
+        help="URL of a running `python server.py` (e.g. http://127.0.0.1:8765); skips the cold start.",
+    )
+    p.add_argument("--batch", default="", help="JSONL of questions ('-' = stdin); answers go to --out as JSONL, in order")
+    p.add_argument("--out", default="-", help="Batch output JSONL (default: stdout); reruns resume where it stopped")
+    p.add_argument("--workers", type=int, default=4, help="Concurrent batch requests")
+    p.add_argument("--no-resume", action="store_true", help="Overwrite --out instead of resuming")
     args = p.parse_args()
 
-    ans, src = app.answer(
-        args.question,
-        k=args.k,
-        mode=args.mode,
-        include=args.include,
-        exclude=args.exclude,
-        lang=args.lang or None,
-    )
+    if args.batch:
+        return ask_batch(args)
+    if not args.question:
+        p.error("a question or --batch is required")
+
+    if args.server:
+        res = ask_server(args.server, {
+            "query": args.question,
+            "k": args.k,
+            "mode": args.mode,
+            "include": args.include,
+            "exclude": args.exclude,
+            "lang": args.lang or None,
+        })
+        ans, src = res["answer"], res["sources"]
+    else:
+        import app  # uses your existing answer() + filters
+
+        ans, src = app.answer(
+            args.question,
+            k=args.k,
+            mode=args.mode,
+            include=args.include,
+            exclude=args.exclude,
+            lang=args.lang or None,
+        )
     print("\n=== ANSWER ===\n" + ans.strip())
     print("\n=== SOURCES ===\n" + src.strip())
 
@@ -0,0 +1,594 @@
+"""
+Scaling benchmark for the retrieval modes over synthetic corpora.
+
+`cli.py eval` only tells us whether ~30 questions still find the right file; it
+says nothing about how build time, memory and latency grow with the corpus.
+This harness generates seeded multilingual corpora from the passages of
+`docs/wohngeld` (real passages as templates, a share of their words swapped
+for words from the same language's vocabulary) and runs them through the real
+`answer()` path as a registered corpus:
+
+    python bench.py run --sizes 10k,100k,1m [--modes TF-IDF,Semantic,Hybrid] [--queries 200] [--out FILE]
+    python bench.py compare reports/bench/baseline.json reports/bench/<run>.json [--tolerance 0.15]
+    python bench.py sweep --size 10k --mode Hybrid --workers 1,2,4 --threads 1,2,4
+    python bench.py ui --users 1,4,8 --mode TF-IDF
+
+Per size it records index build time, embedding time, estimated index bytes,
+RSS growth, and per mode QPS plus p50/p99 latency (sequential `answer()` calls,
+cycling through the eval questions and synthetic keyword queries).
+
+Semantic/Hybrid use `app_pkg.embedders.HashingEmbedder`, the deterministic stand-in,
+so the numbers cover the retrieval code (matrix products, fusion, rendering)
+without a model download; they are not a measure of embedding quality.
+
+`compare` exits 1 when a metric got worse than the baseline by more than the
+tolerance (times/memory up, QPS down). Store a baseline with
+`python bench.py run --out reports/bench/baseline.json` on the machine you compare on.
+
+`sweep` runs concurrent queries under every request-pool size x torch/BLAS
+thread count (`app_pkg/runtime.py`) and reports the layout with the best QPS.
+
+`ui` simulates N concurrent users on the Gradio Search path (`app_pkg/ui.py`),
+once with answer() on the event threads and once queued into `batch=True`
+calls offloaded to the worker pool, and reports QPS, p50/p95 latency and the UI
+process' scheduling lag (how long a light event waits behind retrieval):
+
+    python bench.py ui --users 1,4,8 --mode Hybrid --max-batch 8 --workers 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import contextlib
+import datetime as _dt
+import json
+import os
+import platform
+import queue
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from app_pkg.embedders import HashingEmbedder
+from app_pkg.index import load_docs
+
+SEED_ROOT = "docs/wohngeld"
+EVAL_PATH = "data/wohngeld_eval.jsonl"
+OUT_DIR = os.path.join("reports", "bench")
+MODES = ("TF-IDF", "Semantic", "Hybrid")
+DEFAULT_LANG_MIX = {"de": 0.6, "en": 0.2, "ar": 0.2}
+PER_FILE = 20  # passages per synthetic file
+SWAP_RATE = 0.3  # share of template words replaced from the vocabulary
+
+_WORD_RE = re.compile(r"\w{3,}", re.UNICODE)
+
+# metric -> +1 if higher is better, -1 if lower is better (compare direction)
+_SIZE_METRICS = {"build_s": -1, "embed_s": -1, "index_mb": -1, "rss_mb": -1}
+_MODE_METRICS = {"qps": +1, "p50_ms": -1, "p99_ms": -1}
+
+
+def parse_size(s: str) -> int:
+    """"10k" -> 10000, "1m" -> 1000000, "2500" -> 2500."""
+    s = s.strip().lower()
+    mult = {"k": 1_000, "m": 1_000_000}.get(s[-1:], 1)
+    return int(float(s[:-1] if mult > 1 else s) * mult)
+
+
+def size_label(n: int) -> str:
+    if n >= 1_000_000 and n % 1_000_000 == 0:
+        return f"{n // 1_000_000}m"
+    if n >= 1_000 and n % 1_000 == 0:
+        return f"{n // 1_000}k"
+    return str(n)
+
+
+# ----------------- Synthetic corpus -----------------
+def load_seeds(root: str = SEED_ROOT):
+    """{lang: (templates, vocabulary)} from the seed passages."""
+    out = {}
+    for d in load_docs(root):
+        tpl, vocab = out.setdefault(d["lang"], ([], set()))
+        tpl.append(" ".join(d["text"].split()))  # one line: blank lines would split passages
+        vocab.update(w.lower() for w in _WORD_RE.findall(d["text"]))
+    return {lang: (tpl, np.array(sorted(vocab))) for lang, (tpl, vocab) in out.items()}
+
+
+def synth_corpus(root: str, n: int, seed: int = 0, lang_mix=None, seeds=None) -> dict:
+    """Write `n` synthetic passages under `root` (same layout `load_docs()` reads).
+
+    Files are `<lang>/wohngeld_synth_<nnnnn>_<lang>.txt` with PER_FILE blank-line
+    separated passages each. Deterministic for a given (n, seed, lang_mix).
+    """
+    seeds = seeds or load_seeds()
+    mix = {lang: w for lang, w in (lang_mix or DEFAULT_LANG_MIX).items() if lang in seeds and w > 0}
+    langs = sorted(mix)
+    weights = np.array([mix[lang] for lang in langs], dtype=float)
+    counts = np.floor(weights / weights.sum() * n).astype(int)
+    counts[0] += n - counts.sum()
+    rng = np.random.default_rng(seed)
+    files = 0
+    for lang, count in zip(langs, counts.tolist()):
+        templates, vocab = seeds[lang]
+        tokens = [t.split(" ") for t in templates]
+        os.makedirs(os.path.join(root, lang), exist_ok=True)
+        for start in range(0, count, PER_FILE):
+            paras = []
+            for _ in range(min(PER_FILE, count - start)):
+                words = list(tokens[rng.integers(len(tokens))])
+                swap = np.flatnonzero(rng.random(len(words)) < SWAP_RATE)
+                for i, w in zip(swap.tolist(), vocab[rng.integers(len(vocab), size=len(swap))].tolist()):
+                    words[i] = w
+                paras.append(" ".join(words))
+            path = os.path.join(root, lang, f"wohngeld_synth_{files:05d}_{lang}.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("\n\n".join(paras) + "\n")
+            files += 1
+    return {"passages": int(n), "files": files, "langs": dict(zip(langs, counts.tolist()))}
+
+
+def synth_queries(n: int, seed: int = 0, seeds=None, eval_path: str = EVAL_PATH):
+    """Eval questions first, then 3-6 word keyword queries drawn from each language's vocabulary."""
+    qs = []
+    if eval_path and os.path.exists(eval_path):
+        with open(eval_path, "r", encoding="utf-8") as f:
+            qs = [json.loads(line)["q"] for line in f if line.strip()]
+    seeds = seeds or load_seeds()
+    rng = np.random.default_rng(seed + 1)
+    langs = sorted(seeds)
+    while len(qs) < n:
+        vocab = seeds[langs[len(qs) % len(langs)]][1]
+        qs.append(" ".join(vocab[rng.integers(len(vocab), size=int(rng.integers(3, 7)))].tolist()))
+    return qs[:n]
+
+
+# ----------------- Measurement -----------------
+def rss_bytes() -> int:
+    """Current resident set size (Linux /proc; peak RSS elsewhere)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def latency_summary(lat_s, wall_s: float) -> dict:
+    ms = np.asarray(lat_s, dtype=float) * 1000.0
+    p50, p99 = np.percentile(ms, [50, 99]) if len(ms) else (0.0, 0.0)
+    return {
+        "n": int(len(ms)),
+        "qps": round(len(ms) / wall_s, 2) if wall_s > 0 else 0.0,
+        "mean_ms": round(float(ms.mean()), 3) if len(ms) else 0.0,
+        "p50_ms": round(float(p50), 3),
+        "p99_ms": round(float(p99), 3),
+    }
+
+
+@contextlib.contextmanager
+def bench_corpus(app, n: int, seed: int = 0, workdir: str = None, seeds=None, embed: bool = True):
+    """Generate and register a corpus of `n` passages; yields (name, index, info).
+
+    With `embed`, Semantic/Hybrid run on the hashing stand-in for the duration.
+    On exit the corpus is unregistered, the app's embedder state restored and the files removed.
+    """
+    name = f"bench_{size_label(n)}"
+    base = tempfile.mkdtemp(prefix=f"{name}_", dir=workdir)
+    root = os.path.join(base, "docs")
+    info = {"size": n, "label": size_label(n)}
+    saved = (app.embedder, app._semantic_ready, app.BUILD_DIR)
+    try:
+        t0 = time.perf_counter()
+        info.update(synth_corpus(root, n, seed=seed, seeds=seeds))
+        info["gen_s"] = round(time.perf_counter() - t0, 3)
+
+        app.CORPORA[name] = app.corpora.roots[name] = root
+        rss0 = rss_bytes()
+        t0 = time.perf_counter()
+        ix = app.get_corpus(name)
+        info["build_s"] = round(time.perf_counter() - t0, 3)
+        if embed:
+            embedder = HashingEmbedder()
+            app.embedder, app._semantic_ready, app.BUILD_DIR = embedder, True, os.path.join(base, "build")
+            t0 = time.perf_counter()
+            ix.ensure_embeddings(embedder, embedder.name, app.BUILD_DIR)
+            info["embed_s"] = round(time.perf_counter() - t0, 3)
+        info["index_mb"] = round(ix.nbytes() / 1e6, 2)
+        info["rss_mb"] = round(max(0, rss_bytes() - rss0) / 1e6, 2)
+        yield name, ix, info
+    finally:
+        app.embedder, app._semantic_ready, app.BUILD_DIR = saved
+        app.corpora.evict(name)
+        app.corpora.roots.pop(name, None)
+        app.CORPORA.pop(name, None)
+        shutil.rmtree(base, ignore_errors=True)
+
+
+def bench_size(app, n: int, modes, queries, k: int = 3, seed: int = 0, workdir: str = None, seeds=None) -> dict:
+    """Generate, index and query one corpus of `n` passages (sequential `answer()` calls per mode)."""
+    embed = any(m != "TF-IDF" for m in modes)
+    with bench_corpus(app, n, seed=seed, workdir=workdir, seeds=seeds, embed=embed) as (name, _ix, row):
+        row["modes"] = {}
+        for mode in modes:
+            for q in queries[:3]:  # warm-up: caches, lazy imports
+                app.answer(q, k=k, mode=mode, corpus=name)
+            lat = []
+            t_wall = time.perf_counter()
+            for q in queries:
+                t0 = time.perf_counter()
+                app.answer(q, k=k, mode=mode, corpus=name)
+                lat.append(time.perf_counter() - t0)
+            row["modes"][mode] = latency_summary(lat, time.perf_counter() - t_wall)
+    return row
+
+
+def run(sizes, modes=MODES, n_queries: int = 200, k: int = 3, seed: int = 0, workdir: str = None, log=print) -> dict:
+    import app  # imported here: `compare` needs no index code
+    from sklearn.feature_extraction.text import TfidfVectorizer  # noqa: F401  (keep its import out of rss_mb)
+
+    seeds = load_seeds()
+    queries = synth_queries(n_queries, seed=seed, seeds=seeds)
+    report = {
+        "meta": {
+            "timestamp": _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": seed,
+            "queries": len(queries),
+            "k": k,
+            "modes": list(modes),
+            "shards": app.SHARDS,
+            "embedder": HashingEmbedder().name,
+        },
+        "results": [],
+    }
+    for n in sizes:
+        log(f"[bench] {size_label(n)} passages ...")
+        row = bench_size(app, n, modes, queries, k=k, seed=seed, workdir=workdir, seeds=seeds)
+        report["results"].append(row)
+        log(
+            f"[bench] {row['label']}: build {row['build_s']}s, index {row['index_mb']} MB, "
+            + ", ".join(f"{m} {r['qps']} qps p50 {r['p50_ms']}ms p99 {r['p99_ms']}ms" for m, r in row["modes"].items())
+        )
+    return report
+
+
+# ----------------- Thread sweep -----------------
+def sweep(n: int, mode: str = "Hybrid", workers=(1, 2, 4), threads=(1, 2, 4), n_queries: int = 200, k: int = 3,
+          seed: int = 0, workdir: str = None, log=print) -> dict:
+    """Throughput of one corpus under every (request workers x torch/BLAS threads) combination.
+
+    Queries go through a thread pool of `workers` (as in `server.py --pool thread`)
+    with `app_pkg.runtime` applied for each combination; coalescing is off so
+    every request is computed. Process-pool layouts are not swept (same formula,
+    one worker process per request slot). BLAS limits of the last combination
+    stay in effect: run it in its own process.
+    """
+    import app
+    from app_pkg import runtime
+
+    seeds = load_seeds()
+    queries = synth_queries(n_queries, seed=seed, seeds=seeds)
+    prev_cfg, prev_env = runtime.current(), {v: os.environ.get(v) for v in runtime.BLAS_ENV_VARS}
+    prev_coalesce, app.COALESCE_REQUESTS = app.COALESCE_REQUESTS, False
+
+    def one(q):
+        t0 = time.perf_counter()
+        app.answer(q, k=k, mode=mode, corpus=name)
+        return time.perf_counter() - t0
+
+    report = {
+        "meta": {
+            "timestamp": _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "cores": runtime.available_cores(),
+            "size": n,
+            "mode": mode,
+            "queries": len(queries),
+            "k": k,
+        },
+        "results": [],
+    }
+    try:
+        with bench_corpus(app, n, seed=seed, workdir=workdir, seeds=seeds, embed=mode != "TF-IDF") as (name, _ix, info):
+            report["meta"]["corpus"] = info
+            for w in workers:
+                for t in threads:
+                    runtime.apply(runtime.plan(pool="thread", workers=w, torch_threads=t, blas_threads=t))
+                    with concurrent.futures.ThreadPoolExecutor(w) as pool:
+                        list(pool.map(one, queries[: 2 * w]))  # warm-up
+                        t_wall = time.perf_counter()
+                        lat = list(pool.map(one, queries))
+                        wall = time.perf_counter() - t_wall
+                    row = {"workers": w, "threads": t, **latency_summary(lat, wall)}
+                    report["results"].append(row)
+                    log(f"[sweep] workers={w} threads={t}: {row['qps']} qps p50 {row['p50_ms']}ms p99 {row['p99_ms']}ms")
+    finally:
+        app.COALESCE_REQUESTS = prev_coalesce
+        for var, v in prev_env.items():
+            if v is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = v
+        if prev_cfg is not None:
+            runtime.apply(prev_cfg)
+        else:
+            runtime.reset()
+    if report["results"]:
+        report["best"] = max(report["results"], key=lambda r: r["qps"])
+    return report
+
+
+# ----------------- UI request path -----------------
+class EventQueue:
+    """Gradio-style event queue: `concurrency` handlers, each taking up to `max_batch` waiting requests per call."""
+
+    def __init__(self, handler, concurrency: int = 1, max_batch: int = 1):
+        self.handler = handler
+        self.max_batch = max(1, int(max_batch))
+        self._q = queue.Queue()
+        self._threads = [threading.Thread(target=self._loop, daemon=True) for _ in range(max(1, int(concurrency)))]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, req) -> concurrent.futures.Future:
+        fut = concurrent.futures.Future()
+        self._q.put((req, fut))
+        return fut
+
+    def _loop(self):
+        while True:
+            first = self._q.get()
+            if first is None:
+                return
+            batch = [first]
+            while len(batch) < self.max_batch:
+                try:
+                    nxt = self._q.get_nowait()
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._q.put(None)
+                    break
+                batch.append(nxt)
+            try:
+                for (_req, fut), res in zip(batch, self.handler([r for r, _f in batch])):
+                    fut.set_result(res)
+            except Exception as e:
+                for _req, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+
+    def close(self):
+        for _ in self._threads:
+            self._q.put(None)
+        for t in self._threads:
+            t.join()
+
+
+def _lag_probe(stop, lags, tick_s: float = 0.005):
+    """Oversleep of a `tick_s` sleep in the UI process: how long a light event would wait for the GIL."""
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        time.sleep(tick_s)
+        lags.append(time.perf_counter() - t0 - tick_s)
+
+
+def ui(users=(1, 4, 8), mode: str = "TF-IDF", requests_per_user: int = 20, k: int = 3, max_batch: int = 8,
+       concurrency: int = 2, workers: int = 2, pool: str = "process", seed: int = 0, log=print) -> dict:
+    """Concurrent users against the UI Search path: direct (answer() on the event threads, one request per
+    call) vs batched (`batch=True` handler -> `app.answer_batch` on the `app_pkg.ui` offload pool).
+
+    Each simulated user sends `requests_per_user` questions back to back; per user count and path
+    it reports QPS, latency percentiles and the UI process' scheduling lag (a 5 ms sleep loop
+    measuring how long light events wait behind retrieval). Coalescing is off so every request is
+    computed, in this process and in spawned workers.
+    """
+    import app
+    from app_pkg import runtime
+    from app_pkg.ui import AnswerOffload
+
+    queries = synth_queries(max(users) * requests_per_user, seed=seed)
+    prev_env, os.environ["COALESCE_REQUESTS"] = os.environ.get("COALESCE_REQUESTS"), "0"
+    prev_coalesce, app.COALESCE_REQUESTS = app.COALESCE_REQUESTS, False
+    cfg = runtime.from_env("process", workers) if pool == "process" else None
+    offload = AnswerOffload(app.answer_batch, pool, workers, initializer=app._offload_init, initargs=(cfg,))
+    paths = {
+        "direct": (lambda reqs: [app.answer(r["query"], k=k, mode=mode) for r in reqs], concurrency, 1),
+        "batched": (offload.run, concurrency, max_batch),
+    }
+    report = {
+        "meta": {
+            "timestamp": _dt.datetime.now(_dt.timezone.utc).isoformat(timespec="seconds"),
+            "platform": platform.platform(),
+            "cores": runtime.available_cores(),
+            "mode": mode,
+            "requests_per_user": requests_per_user,
+            "k": k,
+            "ui": {"pool": pool, "workers": workers, "concurrency": concurrency, "max_batch": max_batch},
+        },
+        "results": [],
+    }
+    try:
+        app.get_corpus()
+        offload.start()
+        for path, (handler, conc, batch) in paths.items():
+            events = EventQueue(handler, conc, batch)
+            events.submit({"query": queries[0], "k": k, "mode": mode}).result()  # warm-up
+            for u in users:
+                lat, lags, stop = [], [], threading.Event()
+
+                def user(i):
+                    for q in queries[i * requests_per_user:(i + 1) * requests_per_user]:
+                        t0 = time.perf_counter()
+                        events.submit({"query": q, "k": k, "mode": mode}).result()
+                        lat.append(time.perf_counter() - t0)
+
+                probe = threading.Thread(target=_lag_probe, args=(stop, lags), daemon=True)
+                probe.start()
+                t_wall = time.perf_counter()
+                with concurrent.futures.ThreadPoolExecutor(u) as clients:
+                    list(clients.map(user, range(u)))
+                wall = time.perf_counter() - t_wall
+                stop.set()
+                probe.join()
+                lag_ms = np.asarray(lags or [0.0]) * 1000.0
+                row = {"path": path, "users": u, **latency_summary(lat, wall),
+                       "p95_ms": round(float(np.percentile(np.asarray(lat) * 1000.0, 95)), 3),
+                       "ui_lag_p95_ms": round(float(np.percentile(lag_ms, 95)), 3),
+                       "ui_lag_max_ms": round(float(lag_ms.max()), 3)}
+                report["results"].append(row)
+                log(f"[ui] {path:<7} users={u}: {row['qps']} qps p50 {row['p50_ms']}ms p95 {row['p95_ms']}ms "
+                    f"ui lag p95 {row['ui_lag_p95_ms']}ms")
+            events.close()
+        report["offload"] = offload.stats()
+    finally:
+        offload.close()
+        app.COALESCE_REQUESTS = prev_coalesce
+        if prev_env is None:
+            os.environ.pop("COALESCE_REQUESTS", None)
+        else:
+            os.environ["COALESCE_REQUESTS"] = prev_env
+    return report
+
+
+# ----------------- Compare -----------------
+def compare(baseline: dict, current: dict, tolerance: float = 0.15):
+    """Rows (size, metric, base, cur, change, regressed) for every metric present in both reports."""
+    base_by_size = {r["size"]: r for r in baseline.get("results", [])}
+    rows = []
+
+    def check(label, metric, direction, b, c):
+        if b is None or c is None:
+            return
+        change = (c - b) / b if b else 0.0
+        rows.append((label, metric, b, c, change, direction * change < -tolerance))
+
+    for cur in current.get("results", []):
+        base = base_by_size.get(cur["size"])
+        if base is None:
+            continue
+        for metric, direction in _SIZE_METRICS.items():
+            check(cur["label"], metric, direction, base.get(metric), cur.get(metric))
+        for mode, cm in cur.get("modes", {}).items():
+            bm = base.get("modes", {}).get(mode)
+            if bm is None:
+                continue
+            for metric, direction in _MODE_METRICS.items():
+                check(cur["label"], f"{mode}.{metric}", direction, bm.get(metric), cm.get(metric))
+    return rows
+
+
+def _read_json(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _write_report(report: dict, out: str):
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"[bench] wrote {out}")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Retrieval scaling benchmark over synthetic corpora")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p_run = sub.add_parser("run", help="Generate corpora, build indexes, time queries; write JSON")
+    p_run.add_argument("--sizes", default="10k,100k", help="comma-separated passage counts, e.g. 10k,100k,1m")
+    p_run.add_argument("--modes", default=",".join(MODES))
+    p_run.add_argument("--queries", type=int, default=200, help="timed queries per mode and size")
+    p_run.add_argument("-k", type=int, default=3)
+    p_run.add_argument("--seed", type=int, default=0)
+    p_run.add_argument("--workdir", default=None, help="where synthetic corpora are written (default: system temp)")
+    p_run.add_argument("--out", default=None, help=f"result JSON (default: {OUT_DIR}/bench-<timestamp>.json)")
+
+    p_sw = sub.add_parser("sweep", help="Find the request-pool x torch/BLAS thread layout with the best throughput")
+    p_sw.add_argument("--size", default="10k")
+    p_sw.add_argument("--mode", default="Hybrid", choices=MODES)
+    p_sw.add_argument("--workers", default="1,2,4", help="request pool sizes to try")
+    p_sw.add_argument("--threads", default="1,2,4", help="torch/BLAS threads per worker to try")
+    p_sw.add_argument("--queries", type=int, default=200)
+    p_sw.add_argument("-k", type=int, default=3)
+    p_sw.add_argument("--seed", type=int, default=0)
+    p_sw.add_argument("--workdir", default=None)
+    p_sw.add_argument("--out", default=None, help=f"result JSON (default: {OUT_DIR}/sweep-<timestamp>.json)")
+
+    p_ui = sub.add_parser("ui", help="Concurrent users against the UI Search path: direct vs batched + offloaded")
+    p_ui.add_argument("--users", default="1,4,8", help="concurrent user counts to try")
+    p_ui.add_argument("--mode", default="TF-IDF", choices=MODES)
+    p_ui.add_argument("--requests", type=int, default=20, help="questions per user")
+    p_ui.add_argument("-k", type=int, default=3)
+    p_ui.add_argument("--max-batch", type=int, default=None, help="batch=True max_batch_size (default: UI_MAX_BATCH)")
+    p_ui.add_argument("--concurrency", type=int, default=None, help="event concurrency limit (default: UI_CONCURRENCY)")
+    p_ui.add_argument("--workers", type=int, default=None, help="offload pool size (default: UI_WORKERS)")
+    p_ui.add_argument("--pool", choices=["process", "thread", "inline"], default=None, help="offload pool (default: UI_POOL)")
+    p_ui.add_argument("--seed", type=int, default=0)
+    p_ui.add_argument("--out", default=None, help=f"result JSON (default: {OUT_DIR}/ui-<timestamp>.json)")
+
+    p_cmp = sub.add_parser("compare", help="Flag regressions of a run against a baseline run")
+    p_cmp.add_argument("baseline")
+    p_cmp.add_argument("current")
+    p_cmp.add_argument("--tolerance", type=float, default=0.15, help="allowed relative change (0.15 = 15%%)")
+
+    args = ap.parse_args(argv)
+
+    if args.cmd == "sweep":
+        ints = lambda v: [int(x) for x in v.split(",") if x.strip()]  # noqa: E731
+        report = sweep(
+            parse_size(args.size), args.mode, ints(args.workers), ints(args.threads),
+            n_queries=args.queries, k=args.k, seed=args.seed, workdir=args.workdir,
+        )
+        best = report.get("best") or {}
+        w, t = best.get("workers"), best.get("threads")
+        print(f"[sweep] best: workers={w} threads={t} ({best.get('qps')} qps)")
+        print(f"[sweep] serve with: SERVE_WORKERS={w} TORCH_THREADS={t} BLAS_THREADS={t}")
+        _write_report(report, args.out or os.path.join(OUT_DIR, f"sweep-{_dt.datetime.now():%Y%m%d-%H%M%S}.json"))
+        return 0
+
+    if args.cmd == "ui":
+        from app_pkg.runtime import default_workers
+        from app_pkg.ui import from_env as ui_config
+
+        cfg = ui_config(default_workers=default_workers())
+        report = ui(
+            [int(x) for x in args.users.split(",") if x.strip()], args.mode, args.requests, k=args.k,
+            max_batch=args.max_batch or cfg.max_batch, concurrency=args.concurrency or cfg.concurrency,
+            workers=args.workers or cfg.workers, pool=args.pool or cfg.pool, seed=args.seed,
+        )
+        _write_report(report, args.out or os.path.join(OUT_DIR, f"ui-{_dt.datetime.now():%Y%m%d-%H%M%S}.json"))
+        return 0
+
+    if args.cmd == "run":
+        modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+        unknown = [m for m in modes if m not in MODES]
+        if unknown:
+            ap.error(f"unknown mode(s): {', '.join(unknown)} (choose from {', '.join(MODES)})")
+        sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+        report = run(sizes, modes, n_queries=args.queries, k=args.k, seed=args.seed, workdir=args.workdir)
+        _write_report(report, args.out or os.path.join(OUT_DIR, f"bench-{_dt.datetime.now():%Y%m%d-%H%M%S}.json"))
+        return 0
+
+    rows = compare(_read_json(args.baseline), _read_json(args.current), args.tolerance)
+    if not rows:
+        print("[bench] no overlapping sizes/metrics to compare")
+        return 0
+    for label, metric, b, c, change, bad in rows:
+        flag = "REGRESSION" if bad else "ok"
+        print(f"{label:>6}  {metric:<18} {b:>12.3f} -> {c:>12.3f}  {change:+7.1%}  {flag}")
+    bad = [r for r in rows if r[5]]
+    print(f"[bench] {len(bad)} regression(s) beyond {args.tolerance:.0%}")
+    return 1 if bad else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,50 +1,33 @@
 import argparse
 import json
+import os
+import time
+import urllib.request
 from os.path import basename
 
 import numpy as np
 
-try:
-    from sentence_transformers import SentenceTransformer
-except Exception:  # pragma: no cover
-    SentenceTransformer = None
-
 import app
+from app_pkg.evaluation import KeywordIndex, rank_metrics, run_eval
+from app_pkg.lang import TrigramLangModel, detect_langs
+from app_pkg import batch, footprint
+from app_pkg import sweep as sweeps
 
-try:
-    # Most repos here have eval.py at repo root
-    from eval import evaluate_run
-except Exception:  # pragma: no cover
-    # Fallback if eval lives under app_pkg/
-    from app_pkg.eval import evaluate_run  # type: ignore
 
+_KW_INDEX = (None, None)  # (corpus index, KeywordIndex over its passages)
 
-_SEM_MODEL = None
-_SEM_X = None
+# Corpus evaluated by this process (None = app's default corpus); set by `--corpus`.
+_CORPUS = None
 
 
-def _ensure_semantic():
-    global _SEM_MODEL, _SEM_X
-    if _SEM_MODEL is not None and _SEM_X is not None:
-        return
-    if SentenceTransformer is None:
-        return
-    try:
-        _SEM_MODEL = SentenceTransformer(getattr(app, "MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2"))
-        emb = _SEM_MODEL.encode(
-            [d["text"] for d in app.docs],
-            normalize_embeddings=True,
-            show_progress_bar=False,
-        )
-        _SEM_X = np.asarray(emb, dtype=np.float32)
-    except Exception:
-        _SEM_MODEL = None
-        _SEM_X = None
+def _ix():
+    return app.get_corpus(_CORPUS)
 
 
 def semantic_available() -> bool:
-    _ensure_semantic()
-    return _SEM_MODEL is not None and _SEM_X is not None
+    """Load the app's embedding backend and this corpus' (cached) embeddings; False if unavailable."""
+    app._init_embeddings(_ix())
+    return app.semantic_ready()
 
 
 def load_eval(path: str = "data/wohngeld_eval.jsonl"):
@@ -66,23 +49,23 @@ def file_ok(path: str, includes=None, excludes=None) -> bool:
     return True
 
 
+def _keyword_index() -> KeywordIndex:
+    global _KW_INDEX
+    ix = _ix()
+    if _KW_INDEX[0] is not ix:
+        _KW_INDEX = (ix, KeywordIndex(ix.docs))
+    return _KW_INDEX[1]
+
+
 def ground_truth_ids(item, includes=None, excludes=None):
+    """Passages in the item's language containing any of its keywords (all of them if none)."""
     kw = [k.lower() for k in item.get("keywords", [])]
-    lang = item.get("lang", "en")
-    ids = []
-    for i, d in enumerate(app.docs):
-        if d.get("lang") != lang:
-            continue
-        if not file_ok(d.get("path", ""), includes, excludes):
-            continue
-        text = d.get("text", "").lower()
-        if any(k in text for k in kw) or not kw:
-            ids.append(i)
-    return ids
+    keep = (lambda p: file_ok(p, includes, excludes)) if includes or excludes else None
+    return _keyword_index().ground_truth(kw, item.get("lang", "en"), keep=keep)
 
 
 def _file_key(doc_id: int) -> str:
-    return basename(app.docs[doc_id]["path"]).lower()
+    return basename(_ix().docs[doc_id]["path"]).lower()
 
 
 def _unique_preserve_order(items):
@@ -116,72 +99,21 @@ def ground_truth_file_ids(item, file_id_map, includes=None, excludes=None):
     return to_file_ids(ids, file_id_map)
 
 
-def predict_ids(query, mode, k, includes=None, excludes=None, q_lang_override=None):
-    m = mode.lower()
-
-    if m == "tfidf":
-        passages, scores = app.tfidf.search(query, k=max(k * 10, 200))
-        order = np.argsort(scores)[::-1]
-        idx_map = [app.DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-        ranked = [idx for j in order for idx in [idx_map[j]] if idx is not None]
-
-    elif m == "hybrid":
-        if not semantic_available():
-            passages, scores = app.tfidf.search(query, k=max(k * 10, 200))
-            order = np.argsort(scores)[::-1]
-            idx_map = [app.DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-            ranked = [idx for j in order for idx in [idx_map[j]] if idx is not None]
-        else:
-            # semantic ranking
-            q_emb = _SEM_MODEL.encode([query], normalize_embeddings=True, show_progress_bar=False)
-            q_emb = np.asarray(q_emb, dtype=np.float32).reshape(-1)
-            sem_scores = _SEM_X @ q_emb
-            sem_order = sem_scores.argsort()[::-1].tolist()
-
-            # tf-idf (wider pool)
-            passages, scores = app.tfidf.search(query, k=max(k * 10, 200))
-            order = np.argsort(scores)[::-1]
-            idx_map = [app.DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-            tf_order = [idx for j in order for idx in [idx_map[j]] if idx is not None]
-
-            # RRF guardrails (match app.py)
-            SEM_CAND = 300
-            TF_CAND = min(len(tf_order), 1200)
-            k0 = 90.0
-            rrf = {}
-            for r, i in enumerate(tf_order[:TF_CAND]):
-                rrf[i] = rrf.get(i, 0.0) + 1.0 / (k0 + r + 1)
-            for r, i in enumerate(sem_order[:SEM_CAND]):
-                rrf[i] = rrf.get(i, 0.0) + 1.0 / (k0 + r + 1)
-            ranked = [i for i, _ in sorted(rrf.items(), key=lambda x: x[1], reverse=True)]
-
-    else:  # semantic
-        if not semantic_available():
-            passages, scores = app.tfidf.search(query, k=max(k * 10, 200))
-            order = np.argsort(scores)[::-1]
-            idx_map = [app.DOC_INDEX.get((p["path"], p["text"])) for p in passages]
-            ranked = [idx for j in order for idx in [idx_map[j]] if idx is not None]
-        else:
-            q_emb = _SEM_MODEL.encode([query], normalize_embeddings=True, show_progress_bar=False)
-            q_emb = np.asarray(q_emb, dtype=np.float32).reshape(-1)
-            scores = _SEM_X @ q_emb
-            ranked = scores.argsort()[::-1].tolist()
+def predict_ids(query, mode, k, includes=None, excludes=None, q_lang_override=None, level="passage", file_agg="max"):
+    # language preference (use eval item's declared lang when provided); also routes retrieval
+    q_lang = q_lang_override or app.detect_lang(query)
+    ix = _ix()
+    # Same candidates as answer() and the in-app eval.
+    ranked, score_by_id = app.eval_ranking(ix, query, mode, q_lang, k)
 
     # filename filter
-    ranked = [i for i in ranked if file_ok(app.docs[i]["path"], includes, excludes)]
+    ranked = [i for i in ranked if file_ok(ix.docs[i]["path"], includes, excludes)]
 
-    # language preference (use eval item's declared lang when provided)
-    q_lang = q_lang_override or app.detect_lang(query)
-    primary = [i for i in ranked if app.docs[i]["lang"] == q_lang]
-    secondary = [i for i in ranked if app.docs[i]["lang"] != q_lang]
+    # file-level ranking: one (best) passage per file, files ranked by reduced score
+    if level == "file":
+        ranked = ix.best_passage_per_file(ranked, score_by_id, how=file_agg)
 
-    out = []
-    for i in primary + secondary:
-        if i not in out:
-            out.append(i)
-        if len(out) == k:
-            break
-    return out
+    return ix.prefer_lang(ranked, q_lang, k)
 
 
 def main():
@@ -192,14 +124,21 @@ def main():
     p_eval = sub.add_parser("eval", help="Run retrieval eval on JSONL queries")
     p_eval.add_argument("--mode", choices=["tfidf", "semantic", "hybrid"], default="semantic")
     p_eval.add_argument("-k", type=int, default=3)
+    p_eval.add_argument("--ks", default="", help="Extra cut-offs scored from the same rankings, e.g. 1,5,10")
+    p_eval.add_argument("--serial", action="store_true", help="Evaluate modes one after another (default: in parallel)")
     p_eval.add_argument("--file", default="data/wohngeld_eval.jsonl")
     p_eval.add_argument("--both", action="store_true")
     p_eval.add_argument("--include", action="append")
     p_eval.add_argument("--exclude", action="append")
+    p_eval.add_argument("--corpus", choices=list(app.CORPORA), default=None, help="Named corpus (default: all docs)")
+    p_eval.add_argument("--level", choices=["passage", "file"], default="passage",
+                        help="file: rank files (one best passage each) instead of passages")
+    p_eval.add_argument("--file-agg", choices=["max", "top2"], default="max",
+                        help="Per-file score reduction for --level file")
 
     # ---- ask ----
     p_ask = sub.add_parser("ask", help="Ask a question via the CLI")
-    p_ask.add_argument("q", help="User question")
+    p_ask.add_argument("q", nargs="?", default="", help="User question (omit with --batch)")
     p_ask.add_argument("--mode", choices=["TF-IDF", "Semantic", "Hybrid"], default="Semantic")
     p_ask.add_argument("-k", type=int, default=3)
     p_ask.add_argument("--include", default="", help="Substring filter for filenames (single string)")
@@ -207,10 +146,108 @@ def main():
     p_ask.add_argument("--lang", choices=["auto", "de", "en", "ar"], default="auto")
     p_ask.add_argument("--link-mode", choices=["github", "plain"], default="github")
     p_ask.add_argument("--trace", action="store_true", help="Print retrieval trace JSON")
+    p_ask.add_argument("--level", choices=["passage", "file"], default="passage")
+    p_ask.add_argument("--corpus", choices=list(app.CORPORA), default=None, help="Named corpus (default: all docs)")
+    p_ask.add_argument("--batch", default="", help="Answer every question in this JSONL file ('-' = stdin) instead of q")
+    p_ask.add_argument("--out", default="-", help="Batch output JSONL (default: stdout); reruns resume where it stopped")
+    p_ask.add_argument("--workers", type=int, default=4, help="Batch worker threads")
+    p_ask.add_argument("--no-resume", action="store_true", help="Overwrite --out instead of resuming")
+
+    # ---- export-index ----
+    p_exp = sub.add_parser("export-index", help="Build corpora once and write memory-mappable indexes for workers")
+    p_exp.add_argument("--out", default=None, help="Output dir (default: $SHARED_INDEX_DIR or build/shared)")
+    p_exp.add_argument("--corpus", action="append", choices=list(app.CORPORA), help="Corpus to export (repeatable)")
+    p_exp.add_argument("--embeddings", action="store_true", help="Also compute and export passage embeddings")
+
+    # ---- build-lang-model ----
+    p_lm = sub.add_parser("build-lang-model", help="Rebuild the shipped DE/EN/AR language model from the docs")
+    p_lm.add_argument("--root", default="docs")
+    p_lm.add_argument("--out", default=None, help="Output JSON (default: app_pkg/lang_model.json)")
+
+    # ---- sweep ----
+    p_sw = sub.add_parser("sweep", help="Tune fusion weights/pools and abstain thresholds from cached score matrices")
+    p_sw.add_argument("--mode", action="append", choices=list(sweeps.MODES), help="Mode to sweep (repeatable; default: all available)")
+    p_sw.add_argument("-k", type=int, default=3)
+    p_sw.add_argument("--file", default="data/wohngeld_eval.jsonl")
+    p_sw.add_argument("--corpus", choices=list(app.CORPORA), default=None, help="Named corpus (default: all docs)")
+    p_sw.add_argument("--include", action="append")
+    p_sw.add_argument("--exclude", action="append")
+    p_sw.add_argument("--space", default="", help="Override search values, e.g. 'k0=30,60,90;min_top=0.2,0.25'")
+    p_sw.add_argument("--samples", type=int, default=0, help="Random configs per mode (0 = full grid)")
+    p_sw.add_argument("--seed", type=int, default=0)
+    p_sw.add_argument("--objective", choices=list(sweeps.OBJECTIVES), default="answered_ndcg")
+    p_sw.add_argument("--max-abstain", type=float, default=0.25, help="Abstain-rate budget for the reported best config")
+    p_sw.add_argument("--out", default=None, help="Write every evaluated config to this JSON file")
+    p_sw.add_argument("--no-cache", action="store_true", help="Recompute score matrices even if cached")
+
+    # ---- warmup ----
+    p_wu = sub.add_parser("warmup", help="Pre-run sample, clarify and top logged questions to warm caches; print the report")
+    p_wu.add_argument("--top-n", type=int, default=None, help="Most frequent logged queries to include (default: WARMUP_TOP_N)")
+    p_wu.add_argument("--modes", default=None, help="Comma-separated modes (default: WARMUP_MODES)")
+    p_wu.add_argument("--includes", default=None, help="Comma-separated include filters, empty item = none (default: WARMUP_INCLUDES)")
+    p_wu.add_argument("-k", type=int, default=None)
+    p_wu.add_argument("--corpus", choices=list(app.CORPORA), default=None)
+
+    # ---- stats ----
+    p_stats = sub.add_parser("stats", help="Dump metrics (Prometheus text or JSON) or the index/memory footprint report")
+    p_stats.add_argument("what", nargs="?", choices=["metrics", "index"], default="metrics",
+                         help="metrics (default) or index: passages, TF-IDF vocab/nnz/bytes, embeddings, model, caches, RSS")
+    p_stats.add_argument("--url", default=os.getenv("ANSWER_URL", ""),
+                         help="Running server.py to scrape (default: $ANSWER_URL; empty = this process)")
+    p_stats.add_argument("--json", action="store_true", help="JSON instead of Prometheus text / the text report")
+    p_stats.add_argument("--corpus", action="append", choices=list(app.CORPORA), default=None,
+                         help="index: corpus to build and report (repeatable; default: the default corpus)")
+    p_stats.add_argument("--semantic", action="store_true", help="index: also load the embedding model and doc embeddings")
+    p_stats.add_argument("--trace-top", type=int, default=10, help="index: tracemalloc top allocators during startup (0 = off)")
+    p_stats.add_argument("--out", default=None, help="index: also write the JSON report to this file")
 
     args = ap.parse_args()
 
+    if args.cmd == "stats" and args.what == "index":
+        stats_index(args)
+        return
+
+    if args.cmd == "stats":
+        if args.url:
+            url = args.url.rstrip("/") + "/metrics" + ("?format=json" if args.json else "")
+            with urllib.request.urlopen(url, timeout=30) as resp:
+                print(resp.read().decode("utf-8"), end="")
+        else:
+            print(json.dumps(app.METRICS.snapshot(), indent=2) if args.json else app.METRICS.render_prometheus(), end="")
+        return
+
+    if args.cmd == "warmup":
+        report = app.warm_caches(
+            queries=app.warmup_queries(args.top_n),
+            modes=args.modes.split(",") if args.modes else None,
+            includes=args.includes.split(",") if args.includes is not None else None,
+            k=args.k,
+            corpus=args.corpus,
+        )
+        print(json.dumps(report, ensure_ascii=False))
+        return
+
+    if args.cmd == "sweep":
+        run_sweep(args)
+        return
+
+    if args.cmd == "build-lang-model":
+        kw = {"path": args.out} if args.out else {}
+        print(TrigramLangModel.from_docs(args.root).save(**kw))
+        return
+
+    if args.cmd == "export-index":
+        for d in app.export_shared_index(args.out, names=args.corpus, with_embeddings=args.embeddings):
+            print(d)
+        return
+
+    if args.cmd == "ask" and args.batch:
+        run_batch_ask(args)
+        return
+
     if args.cmd == "ask":
+        if not args.q:
+            ap.error("ask: a question or --batch is required")
         if args.trace:
             ans, src, tr = app.answer(
                 args.q,
@@ -221,6 +258,8 @@ def main():
                 exclude=args.exclude,
                 link_mode=args.link_mode,
                 trace=True,
+                level=args.level,
+                corpus=args.corpus,
             )
             print(ans)
             print()
@@ -237,6 +276,8 @@ def main():
                 lang=args.lang,
                 exclude=args.exclude,
                 link_mode=args.link_mode,
+                level=args.level,
+                corpus=args.corpus,
             )
             print(ans)
             print()
@@ -244,54 +285,172 @@ def main():
         return
 
     # ---- eval ----
+    global _CORPUS
+    _CORPUS = args.corpus
     items = load_eval(args.file)
     gt = [ground_truth_ids(it, args.include, args.exclude) for it in items]
 
-    all_files = sorted({basename(d["path"]).lower() for d in app.docs})
+    all_files = sorted({basename(d["path"]).lower() for d in _ix().docs})
     file_id_map = {f: i for i, f in enumerate(all_files)}
     gt_files = [ground_truth_file_ids(it, file_id_map, args.include, args.exclude) for it in items]
 
+    # Declared item language wins; the rest is detected once for all modes.
+    detected = iter(detect_langs([it["q"] for it in items if not it.get("lang")]))
+    q_langs = [it.get("lang") or next(detected) for it in items]
+
+    ks = sorted({args.k, *(int(x) for x in args.ks.split(",") if x.strip())})
     modes = ["tfidf", "semantic", "hybrid"] if args.both else [args.mode]
-    for m in modes:
-        preds = [predict_ids(it["q"], m, args.k, args.include, args.exclude, q_lang_override=it.get("lang")) for it in items]
-        res = evaluate_run(gt, preds, k=args.k)
+    if any(m != "tfidf" for m in modes):
+        semantic_available()  # load the model once, before the mode threads start
 
-        preds_files = [to_file_ids(p, file_id_map) for p in preds]
-        res_files = evaluate_run(gt_files, preds_files, k=args.k)
+    def rank(query, mode, q_lang, k):
+        return predict_ids(
+            query, mode, k, args.include, args.exclude, q_lang_override=q_lang, level=args.level, file_agg=args.file_agg
+        )
+
+    # Each query is ranked once per mode at max(ks); every cut-off is scored from that ranking.
+    runs = run_eval([it["q"] for it in items], q_langs, rank, modes, ks, parallel=not args.serial)
+    item_langs = [it.get("lang", "en") for it in items]
+    for m in modes:
+        preds = runs[m]["predictions"]
+        at_k = _score(gt, gt_files, preds, file_id_map, ks)
 
         # Per-language breakdown
         by_lang = {}
-        for L in sorted({it.get("lang", "en") for it in items}):
-            idxs = [i for i, it in enumerate(items) if it.get("lang", "en") == L]
-            if not idxs:
-                continue
-            gt_L = [gt[i] for i in idxs]
-            pr_L = [preds[i] for i in idxs]
-            gtF_L = [gt_files[i] for i in idxs]
-            prF_L = [preds_files[i] for i in idxs]
-            rL = evaluate_run(gt_L, pr_L, k=args.k)
-            rFL = evaluate_run(gtF_L, prF_L, k=args.k)
+        for L in sorted(set(item_langs)):
+            idxs = [i for i, x in enumerate(item_langs) if x == L]
+            rL = _score([gt[i] for i in idxs], [gt_files[i] for i in idxs], [preds[i] for i in idxs], file_id_map, [args.k])[args.k]
             by_lang[L] = {
                 "p_at_k": rL["p_at_k"],
                 "r_at_k": rL["r_at_k"],
-                "file_p_at_k": rFL["p_at_k"],
-                "file_r_at_k": rFL["r_at_k"],
+                "file_p_at_k": rL["file_p_at_k"],
+                "file_r_at_k": rL["file_r_at_k"],
                 "queries": len(idxs),
             }
 
+        res = at_k[args.k]
         print(
             json.dumps(
                 {
                     "mode": m,
-                    **res,
-                    "file_p_at_k": res_files["p_at_k"],
-                    "file_r_at_k": res_files["r_at_k"],
+                    "level": args.level,
+                    "queries": len(items),
+                    "p_at_k": res["p_at_k"],
+                    "r_at_k": res["r_at_k"],
+                    "k": args.k,
+                    "file_p_at_k": res["file_p_at_k"],
+                    "file_r_at_k": res["file_r_at_k"],
+                    "mrr": res["mrr"],
+                    "ndcg": res["ndcg"],
                     "by_lang": by_lang,
+                    "at_k": {str(k): v for k, v in at_k.items()},
+                    "latency_ms": runs[m]["latency"],
+                },
+                ensure_ascii=False,
+            )
+        )
+
+
+def batch_answer(item, args) -> dict:
+    """One batch row: `answer()` with the item's overrides over the command-line options."""
+    defaults = {"k": args.k, "mode": args.mode, "include": args.include, "exclude": args.exclude,
+                "lang": args.lang, "level": args.level, "corpus": args.corpus}
+    ans, src, tr = app.answer(item["query"], link_mode=args.link_mode, trace=True, **batch.item_options(item, defaults))
+    return batch.answer_row(ans, src, json.loads(tr), with_trace=args.trace)
+
+
+def run_batch_ask(args):
+    """`ask --batch`: stream questions through a worker pool, ordered JSONL out, progress on stderr."""
+    return batch.run_ask_batch(args.batch, args.out, lambda item: batch_answer(item, args),
+                               workers=args.workers, resume=not args.no_resume)
+
+
+def sweep_scores(items, q_langs, use_cache: bool = True):
+    """Score matrices for the eval items on the current corpus (cached in build/sweep/)."""
+    ix = _ix()
+    app._init_embeddings(ix)
+    encode = app._encode_query if app.semantic_ready() else None
+    queries = [it["q"] for it in items]
+    emb_name = app.embedder.name if encode is not None else ""
+    path = os.path.join(app.BUILD_DIR, "sweep", sweeps.cache_key(ix.fingerprint, queries, q_langs, emb_name) + ".npz")
+    scores = sweeps.load_scores(path) if use_cache else None
+    if scores is None:
+        scores = sweeps.score_matrices(ix, queries, q_langs, encode=encode)
+        sweeps.save_scores(path, scores)
+    return scores
+
+
+def run_sweep(args):
+    global _CORPUS
+    _CORPUS = args.corpus
+    items = load_eval(args.file)
+    gt = [ground_truth_ids(it, args.include, args.exclude) for it in items]
+    detected = iter(detect_langs([it["q"] for it in items if not it.get("lang")]))
+    q_langs = [it.get("lang") or next(detected) for it in items]
+
+    t0 = time.perf_counter()
+    scores = sweep_scores(items, q_langs, use_cache=not args.no_cache)
+    score_s = time.perf_counter() - t0
+    allow = np.fromiter((file_ok(d["path"], args.include, args.exclude) for d in _ix().docs), dtype=bool, count=len(_ix().docs))
+    sw = sweeps.Sweep(scores, gt, k=args.k, allow=allow)
+    override = sweeps.parse_space(args.space)
+
+    all_rows = []
+    for mode in args.mode or sw.modes:
+        space = sweeps.space_for(mode, {**sweeps.SPACE, **override})
+        configs = sweeps.sample(space, args.samples, args.seed) if args.samples else sweeps.grid(space)
+        t1 = time.perf_counter()
+        rows = sw.run(mode, configs)
+        current = sw.run(mode, [sweeps.DEFAULTS[mode]])[0]
+        all_rows += rows
+        print(
+            json.dumps(
+                {
+                    "mode": mode,
+                    "queries": len(items),
+                    "k": args.k,
+                    "configs": len(rows),
+                    "score_s": round(score_s, 3),
+                    "sweep_s": round(time.perf_counter() - t1, 3),
+                    "objective": args.objective,
+                    "current": current,
+                    "best": sweeps.best_row(rows, args.objective, args.max_abstain),
+                    "pareto": sweeps.pareto_front(rows, args.objective),
                 },
                 ensure_ascii=False,
             )
         )
+    if args.out:
+        os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(all_rows, f, ensure_ascii=False, indent=2)
+
+
+def _score(gt, gt_files, preds, file_id_map, ks):
+    """Passage metrics for all `ks` from one ranking; file metrics on the files of the top-k passages."""
+    out = rank_metrics(gt, preds, ks)
+    for k in ks:
+        files = rank_metrics(gt_files, [to_file_ids(p[:k], file_id_map) for p in preds], [k])[k]
+        out[k]["file_p_at_k"], out[k]["file_r_at_k"] = files["p_at_k"], files["r_at_k"]
+    return out
+
+
+def stats_index(args) -> dict:
+    """`stats index`: footprint report of this process after a traced startup, or of a running server."""
+    if args.url:
+        with urllib.request.urlopen(args.url.rstrip("/") + "/stats", timeout=60) as resp:
+            report = json.loads(resp.read().decode("utf-8"))
+    else:
+        names = [n for n in (args.corpus or []) if n != app.DEFAULT_CORPUS]
+        app.startup(names, semantic=args.semantic, trace_top=args.trace_top)
+        report = app.footprint_report([app.DEFAULT_CORPUS, *names])
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    print(json.dumps(report, indent=2, ensure_ascii=False) if args.json else footprint.render_text(report))
+    return report
 
 
 if __name__ == "__main__":
     main()
+
@@ -0,0 +1,311 @@
+"""
+Local HTTP JSON service around `app.answer()`.
+
+One long-running process keeps the indexes (and the embedding model) warm, so
+clients do not pay the import + TF-IDF fit + model load of every `ask.py` run.
+
+    python server.py [--host 127.0.0.1] [--port 8765] [--workers 4] [--pool thread|process]
+
+Endpoints (HTTP/1.1, keep-alive):
+
+    GET  /health   status, loaded corpora + index versions, pool config, embed batcher counters
+    GET  /metrics  Prometheus text (counters, gauges, histograms; ?format=json for a JSON snapshot)
+                   /health and /metrics are answered on the request thread, never queued behind
+                   retrieval; with --pool process they describe the server process only (the
+                   answer()/index state lives in the workers)
+    GET  /stats    memory footprint JSON: passages per language/file, TF-IDF vocab/nnz/bytes, embeddings,
+                   model, caches, RSS, startup allocations (`cli.py stats index` for the same report)
+    POST /answer   {"query", "k", "mode", "include", "exclude", "lang", "level", "file_agg", "corpus", "strict"}
+                   -> {"answer", "sources", "trace"}   (trace = answer(..., trace=True) payload)
+    POST /search   same body -> {"query", "corpus", "index_version", "q_lang", "mode", "k", "results"}
+                   (the ranked sources of the trace: rank, id, lang, file, path, text, score)
+
+Bad request bodies get 400; "strict": true without a semantic backend gets 503.
+
+Retrieval is CPU-bound, so request threads only parse/serialize and hand the
+work to a pool: threads (default; shares the process' indexes) or processes
+(`--pool process`; each worker imports `app` once, pair with SHARED_INDEX_DIR).
+Pool size and torch/BLAS threads come from one plan (`app_pkg/runtime.py`) so
+workers x threads does not oversubscribe the cores; `/health` reports it.
+"""
+
+from __future__ import annotations
+
+import argparse
+import concurrent.futures
+import json
+import multiprocessing as mp
+import os
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from app_pkg import runtime
+from app_pkg.embedders import SemanticUnavailableError
+from app_pkg.metrics import REGISTRY as METRICS
+from app_pkg.singleflight import SingleFlight, restamp_trace
+
+SERVE_HOST = os.getenv("SERVE_HOST", "127.0.0.1")
+SERVE_PORT = int(os.getenv("SERVE_PORT", "8765"))
+SERVE_POOL = os.getenv("SERVE_POOL", "thread")
+SERVE_WORKERS = runtime.from_env(SERVE_POOL).workers  # SERVE_WORKERS, else min(4, cores)
+
+_HTTP_REQUESTS = METRICS.counter("http_requests_total", "HTTP requests by path and status", ("path", "status"))
+_HTTP_SECONDS = METRICS.histogram("http_request_seconds", "HTTP request handling time by path", ("path",))
+
+# answer() keyword arguments a request may set (everything else is ignored).
+ANSWER_ARGS = ("k", "mode", "include", "exclude", "lang", "level", "file_agg", "corpus", "strict", "link_mode")
+
+
+def _answer_kwargs(body: dict) -> dict:
+    if not isinstance(body, dict) or not isinstance(body.get("query"), str):
+        raise ValueError('body must be a JSON object with a string "query"')
+    kw = {a: body[a] for a in ANSWER_ARGS if a in body}
+    if "k" in kw:
+        try:
+            kw["k"] = int(kw["k"])
+        except (TypeError, ValueError):
+            raise ValueError(f'"k" must be an integer, not {kw["k"]!r}') from None
+    kw.setdefault("mode", "TF-IDF")
+    return kw
+
+
+# ----------------- Work functions (run inside the pool) -----------------
+def _worker_init(runtime_cfg=None):
+    if runtime_cfg is not None:
+        runtime.apply(runtime_cfg)  # before the index build: BLAS/torch limits for this worker
+    import app
+
+    app.startup()  # build/attach the default index once per worker (traced with TRACEMALLOC_TOP)
+    if app.WARMUP_ON_START:
+        app.start_warmer()  # per process: caches are process-local
+
+
+def run_answer(body: dict) -> dict:
+    import app
+
+    ans, src, tr = app.answer(body["query"], trace=True, **_answer_kwargs(body))
+    return {"answer": ans, "sources": src, "trace": json.loads(tr)}
+
+
+def run_search(body: dict) -> dict:
+    res = run_answer(body)
+    tr = res["trace"]
+    sources = (tr.get("sniper_trace_v1") or {}).get("sources") or []
+    results = []
+    for d, s in zip(tr.get("top_docs") or [], sources):
+        results.append({**d, "text": s["chunk_text"], "score": s["retrieval_score"]})
+    return {
+        "query": body["query"],
+        "corpus": tr.get("corpus"),
+        "index_version": tr.get("index_version"),
+        "q_lang": tr.get("final_q_lang", tr.get("q_lang")),
+        "mode": tr.get("final_mode", tr.get("mode")),
+        "k": tr.get("k"),
+        "results": results,
+    }
+
+
+class PlainText(str):
+    """Route result sent as text/plain instead of JSON."""
+
+    content_type = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_metrics(fmt: str = "prometheus"):
+    return METRICS.snapshot() if fmt == "json" else PlainText(METRICS.render_prometheus())
+
+
+def run_metrics(fmt: str = "prometheus"):
+    import app  # noqa: F401  (registers the answer()/index metrics in this process)
+
+    return render_metrics(fmt)
+
+
+def run_stats() -> dict:
+    import app
+
+    return app.footprint_report()
+
+
+def run_health() -> dict:
+    import app
+
+    return {
+        "status": "ok",
+        "corpora": {n: ix.version for n, ix in app.corpora.snapshots().items()},
+        "semantic_ready": app.semantic_ready(),
+        "embed_batching": app.query_batcher.stats(),
+        "runtime": runtime.report(),
+        "warmup": app.warmup_report(),
+    }
+
+
+# ----------------- HTTP -----------------
+class AnswerService:
+    """Pool + route table shared by all request handler threads."""
+
+    def __init__(self, workers: int = SERVE_WORKERS, pool: str = SERVE_POOL, runtime_cfg=None):
+        if pool not in ("thread", "process"):
+            raise ValueError(f"pool must be 'thread' or 'process', not {pool!r}")
+        self.workers = max(1, int(workers))
+        self.pool_kind = pool
+        if pool == "process":
+            self.pool = concurrent.futures.ProcessPoolExecutor(
+                self.workers, mp_context=mp.get_context("spawn"), initializer=_worker_init, initargs=(runtime_cfg,)
+            )
+        else:
+            self.pool = concurrent.futures.ThreadPoolExecutor(self.workers, thread_name_prefix="answer")
+        self.started = time.time()
+        self.coalesce = os.getenv("COALESCE_REQUESTS", "1") != "0"
+        self.inflight = SingleFlight()
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/metrics"): self.metrics,
+            ("GET", "/stats"): self.stats,
+            ("POST", "/answer"): lambda body: self.submit(run_answer, body),
+            ("POST", "/search"): lambda body: self.submit(run_search, body),
+        }
+
+    def submit(self, fn, body):
+        kw = _answer_kwargs(body)  # reject bad input before it takes a pool slot
+        if not self.coalesce:
+            return self.pool.submit(fn, body).result()
+        # Identical concurrent requests share one pool task (also across process workers).
+        key = (fn.__name__, body["query"], json.dumps(kw, sort_keys=True, default=str))
+        res, shared = self.inflight.do(key, lambda: self.pool.submit(fn, body).result())
+        if not shared:
+            return res
+        res = dict(res)
+        if "trace" in res:
+            res["trace"] = restamp_trace(res["trace"])
+        return res
+
+    def health(self, _body=None):
+        # On the request thread: a liveness probe must not wait behind retrieval work.
+        # A process pool's workers hold the indexes; this process only knows the plan.
+        local = run_health() if self.pool_kind == "thread" else {"status": "ok", "runtime": runtime.report()}
+        return {
+            **local,
+            "pool": self.pool_kind,
+            "workers": self.workers,
+            "uptime_s": round(time.time() - self.started, 1),
+            "coalescing": self.inflight.stats(),
+        }
+
+    def metrics(self, body=None):
+        # On the request thread, like /health. With a process pool this is the server process'
+        # registry (HTTP metrics); per-worker answer()/index metrics would need aggregation.
+        fmt = "json" if (body or {}).get("format") == "json" else "prometheus"
+        return run_metrics(fmt) if self.pool_kind == "thread" else render_metrics(fmt)
+
+    def stats(self, _body=None):
+        if self.pool_kind == "thread":
+            return run_stats()
+        # The indexes live in the workers: the footprint of whichever worker runs the task.
+        return self.pool.submit(run_stats).result()
+
+    def close(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive; every response carries Content-Length
+    server_version = "faq-rag"
+    service: AnswerService = None
+
+    def log_message(self, fmt, *args):  # quiet by default
+        if os.getenv("SERVE_ACCESS_LOG") == "1":
+            super().log_message(fmt, *args)
+
+    def _send(self, status: int, payload):
+        self._status = status
+        if isinstance(payload, PlainText):
+            data, ctype = payload.encode("utf-8"), payload.content_type
+        else:
+            data, ctype = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json; charset=utf-8"
+        self.send_response(status)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _dispatch(self, method):
+        t0 = time.perf_counter()
+        self._status = 500
+        path = self.path.split("?", 1)[0]
+        try:
+            self._route(method, path)
+        finally:
+            label = path if any(p == path for _m, p in self.service.routes) else "other"
+            _HTTP_REQUESTS.inc(path=label, status=self._status)
+            _HTTP_SECONDS.observe(time.perf_counter() - t0, path=label)
+
+    def _route(self, method, path):
+        n = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(n) if n else b""
+        route = self.service.routes.get((method, path))
+        if route is None:
+            known = {p for _m, p in self.service.routes}
+            return self._send(405 if path in known else 404, {"error": f"{method} {path} not supported"})
+        try:
+            body = json.loads(raw.decode("utf-8")) if raw else {}
+            if method == "GET":
+                body = dict(urllib.parse.parse_qsl(urllib.parse.urlsplit(self.path).query))
+        except ValueError as e:
+            return self._send(400, {"error": f"invalid JSON: {e}"})
+        try:
+            return self._send(200, route(body))
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        except SemanticUnavailableError as e:
+            return self._send(503, {"error": str(e)})
+        except Exception as e:
+            return self._send(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+
+def make_server(host: str = SERVE_HOST, port: int = SERVE_PORT, service: AnswerService = None):
+    """ThreadingHTTPServer bound to (host, port); port 0 picks a free one."""
+    service = service or AnswerService()
+    handler = type("Handler", (_Handler,), {"service": service})
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    httpd.service = service
+    return httpd
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Serve answer()/search over local HTTP (JSON).")
+    p.add_argument("--host", default=SERVE_HOST)
+    p.add_argument("--port", type=int, default=SERVE_PORT)
+    p.add_argument("--workers", type=int, default=None, help="request pool size (default: SERVE_WORKERS or min(4, cores))")
+    p.add_argument("--pool", choices=["thread", "process"], default=SERVE_POOL)
+    args = p.parse_args(argv)
+
+    cfg = runtime.from_env(args.pool, args.workers)
+    runtime.apply(cfg)
+    httpd = make_server(args.host, args.port, AnswerService(cfg.workers, cfg.pool, runtime_cfg=cfg))
+    if cfg.pool == "thread":
+        _worker_init()
+    print(
+        f"Serving on http://{args.host}:{httpd.server_address[1]} ({cfg.pool} pool x{cfg.workers}, "
+        f"torch {cfg.torch_threads}/{cfg.torch_interop_threads}, BLAS {cfg.blas_threads} threads)",
+        flush=True,
+    )
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        httpd.service.close()
+
+
+if __name__ == "__main__":
+    main()
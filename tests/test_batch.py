@@ -0,0 +1,85 @@
+import io
+import json
+import sys
+import threading
+import time
+
+import app
+import ask
+import cli
+from app_pkg.batch import completed, item_options, parse_item, read_items, run_batch
+
+
+def test_parse_item_accepts_objects_strings_and_text():
+    assert parse_item('{"id": 7, "question": " Wohngeld? ", "k": 5}') == {"id": 7, "k": 5, "query": "Wohngeld?"}
+    assert parse_item('"Bearbeitungszeit?"') == {"query": "Bearbeitungszeit?"}
+    assert parse_item("Wie lange dauert Wohngeld?") == {"query": "Wie lange dauert Wohngeld?"}
+    assert parse_item("  ") is None and parse_item("# comment") is None
+    assert parse_item("{broken")["error"] == "invalid JSON"
+    assert parse_item('{"id": 1}')["error"] == "missing query"
+
+
+def test_item_options_override_defaults_with_every_answer_option():
+    defaults = {"k": 3, "mode": "TF-IDF", "lang": None}
+    item = {"query": "q", "id": 4, "k": "5", "level": "file", "corpus": "faq", "strict": True, "extra": 1}
+    assert item_options(item, defaults) == {"k": 5, "mode": "TF-IDF", "lang": None, "level": "file", "corpus": "faq", "strict": True}
+
+
+def test_rows_keep_input_order_and_duplicates_run_once():
+    calls, lock = [], threading.Lock()
+
+    def fn(item):
+        with lock:
+            calls.append(item["query"])
+        time.sleep(0.02 if item["query"] == "slow" else 0)  # finishes after the later items
+        return {"answer": item["query"].upper()}
+
+    items = [(0, {"query": "slow"}), (1, {"query": "b"}), (2, {"query": "c", "error": "bad"}), (3, {"query": "b", "id": "x"}),
+             (4, {"query": "boom"})]
+    out = io.StringIO()
+    stats = run_batch(items, lambda it: fn(it) if it["query"] != "boom" else 1 / 0, out, workers=3)
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["n"] for r in rows] == [0, 1, 2, 3, 4] and rows[3]["id"] == "x" and rows[3]["answer"] == "B"
+    assert rows[2]["error"] == "bad" and rows[4]["error"].startswith("ZeroDivisionError")
+    assert sorted(calls) == ["b", "slow"]
+    assert stats["done"] == 5 and stats["errors"] == 2 and stats["duplicates"] == 1
+
+
+def test_resume_skips_answered_lines_and_cuts_torn_row(tmp_path):
+    src = tmp_path / "q.jsonl"
+    src.write_text("a\n\nb\nc\n", encoding="utf-8")
+    out = tmp_path / "a.jsonl"
+    out.write_text('{"n": 0, "id": 0, "query": "a"}\n{"n": 2, "id"', encoding="utf-8")
+    done = completed(str(out))
+    assert done == {0} and out.read_text(encoding="utf-8").count("\n") == 1
+    assert [n for n, _ in read_items(str(src), skip=done)] == [2, 3]
+
+
+def test_cli_batch_answers_like_single_asks(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)
+    qs = ["Bearbeitungszeit Wohngeld?", "Welche Unterlagen brauche ich für den Wohngeldantrag?"]
+    src = tmp_path / "q.jsonl"
+    src.write_text("".join(json.dumps({"id": i, "query": q}, ensure_ascii=False) + "\n" for i, q in enumerate(qs)), encoding="utf-8")
+    out = tmp_path / "a.jsonl"
+    argv = ["cli.py", "ask", "--batch", str(src), "--out", str(out), "--mode", "TF-IDF", "--workers", "2"]
+    monkeypatch.setattr(sys, "argv", argv)
+    cli.main()
+    rows = [json.loads(line) for line in out.read_text(encoding="utf-8").splitlines()]
+    for q, row in zip(qs, rows):
+        _, _, tr = app.answer(q, mode="TF-IDF", trace=True)
+        assert row["query"] == q and row["doc_ids"] == [d["id"] for d in json.loads(tr)["top_docs"]]
+    cli.main()  # rerun: everything already answered
+    assert len(out.read_text(encoding="utf-8").splitlines()) == 2
+
+
+def test_ask_py_batch_resumes_and_overwrites_like_cli(tmp_path, monkeypatch, capsys):
+    src = tmp_path / "q.jsonl"
+    src.write_text('{"query": "Bearbeitungszeit Wohngeld?", "level": "file"}\nWohngeld Unterlagen\n', encoding="utf-8")
+    out = tmp_path / "a.jsonl"
+    base = ["ask.py", "--batch", str(src), "--out", str(out), "--workers", "2"]
+    for extra, resumed in (([], 0), ([], 2), (["--no-resume"], 0)):
+        monkeypatch.setattr(sys, "argv", base + extra)
+        stats = ask.main()
+        assert stats["resumed"] == resumed and len(out.read_text(encoding="utf-8").splitlines()) == 2
+    err = capsys.readouterr().err
+    assert "[batch] 2/2 answered, 0 errors, 0 duplicates" in err
@@ -0,0 +1,89 @@
+import threading
+
+import numpy as np
+import pytest
+
+from app_pkg.batching import MicroBatcher
+
+
+def _fake_encoder(calls):
+    def encode(texts):
+        calls.append(list(texts))
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+
+    return encode
+
+
+def test_concurrent_queries_share_one_encode_call():
+    calls = []
+    mb = MicroBatcher(_fake_encoder(calls), max_batch=8, max_wait_ms=200)
+    texts = [f"q{'x' * i}" for i in range(6)]
+    out = [None] * len(texts)
+    start = threading.Barrier(len(texts))
+
+    def worker(i):
+        start.wait()
+        out[i] = mb.encode(texts[i])
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(len(texts))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert sum(len(c) for c in calls) == 6 and len(calls) < 6
+    for t, row in zip(texts, out):
+        assert row[0] == len(t)  # every caller got its own row back
+    s = mb.stats()
+    assert s["requests"] == 6 and s["batches"] == len(calls) and s["mean_batch"] > 1
+
+
+def test_batches_are_capped_at_max_batch():
+    calls = []
+    mb = MicroBatcher(_fake_encoder(calls), max_batch=2, max_wait_ms=100)
+    threads = [threading.Thread(target=mb.encode, args=(f"q{i}",)) for i in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert max(len(c) for c in calls) <= 2 and mb.stats()["max_batch_seen"] <= 2
+
+
+def test_disabled_batcher_encodes_inline_and_propagates_errors():
+    calls = []
+    mb = MicroBatcher(_fake_encoder(calls), max_wait_ms=0)
+    assert not mb.enabled
+    assert mb.encode("abc")[0] == 3 and calls == [["abc"]]
+
+    def boom(texts):
+        raise RuntimeError("model down")
+
+    for wait in (0, 5):
+        bad = MicroBatcher(boom, max_wait_ms=wait)
+        with pytest.raises(RuntimeError, match="model down"):
+            bad.encode("q", timeout=5)
+        assert bad.stats()["errors"] == 1
+
+
+def test_short_encoder_output_fails_every_waiting_caller():
+    def short(texts):
+        return np.zeros((len(texts) - 1, 2), dtype=np.float32)
+
+    mb = MicroBatcher(short, max_batch=4, max_wait_ms=200)
+    errors = []
+    start = threading.Barrier(3)
+
+    def worker(i):
+        start.wait()
+        try:
+            mb.encode(f"q{i}", timeout=5)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(errors) == 3 and all(isinstance(e, ValueError) for e in errors)
+    assert mb.stats()["errors"] >= 1
@@ -0,0 +1,39 @@
+import app
+import bench
+from app_pkg.embedders import HashingEmbedder
+from app_pkg.index import load_docs
+
+
+def test_synth_corpus_is_seeded_multilingual_and_loadable(tmp_path):
+    a = bench.synth_corpus(str(tmp_path / "a"), 250, seed=7)
+    bench.synth_corpus(str(tmp_path / "b"), 250, seed=7)
+    docs_a, docs_b = load_docs(str(tmp_path / "a")), load_docs(str(tmp_path / "b"))
+    assert a["passages"] == len(docs_a) == 250
+    assert sum(a["langs"].values()) == 250 and set(a["langs"]) == {"ar", "de", "en"}
+    assert {d["lang"] for d in docs_a} == {"ar", "de", "en"}
+    assert [d["text"] for d in docs_a] == [d["text"] for d in docs_b]
+
+
+def test_bench_size_runs_every_mode_and_unregisters_the_corpus(tmp_path):
+    fallbacks = app._FALLBACKS.value(requested="Semantic")
+    row = bench.bench_size(app, 300, bench.MODES, bench.synth_queries(8), workdir=str(tmp_path))
+    assert row["passages"] == 300 and row["build_s"] > 0 and row["index_mb"] > 0
+    assert set(row["modes"]) == set(bench.MODES)
+    for r in row["modes"].values():
+        assert r["n"] == 8 and r["qps"] > 0 and r["p99_ms"] >= r["p50_ms"] > 0
+    # The stand-in embedder really served Semantic (no TF-IDF fallback) and was restored afterwards.
+    assert app._FALLBACKS.value(requested="Semantic") == fallbacks
+    assert "bench_300" not in app.corpora.roots and "bench_300" not in app.corpora.loaded()
+    assert not isinstance(app.embedder, HashingEmbedder)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_compare_flags_regressions_beyond_tolerance():
+    def report(build_s, qps, p50, p99):
+        modes = {"TF-IDF": {"qps": qps, "p50_ms": p50, "p99_ms": p99}}
+        return {"results": [{"size": 10000, "label": "10k", "build_s": build_s, "modes": modes}]}
+
+    base, cur = report(2.0, 100.0, 10.0, 20.0), report(2.1, 70.0, 9.0, 30.0)
+    bad = {metric for _label, metric, _b, _c, _chg, regressed in bench.compare(base, cur, 0.15) if regressed}
+    assert bad == {"TF-IDF.qps", "TF-IDF.p99_ms"}
+    assert not any(r[5] for r in bench.compare(base, base, 0.0))
@@ -0,0 +1,74 @@
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import app
+from app_pkg.index import CorpusIndex, CorpusRegistry, parse_corpora
+
+
+def _fake_index(name, root):
+    return CorpusIndex([{"path": f"{root}/{name}_de.txt", "text": f"Wohngeld Antrag {name} " * 40, "lang": "de"}], name=name)
+
+
+def test_parse_corpora_spec():
+    assert parse_corpora("a=docs/a, b = docs/b,broken,=x") == {"a": "docs/a", "b": "docs/b"}
+
+
+def test_registry_loads_lazily_and_evicts_lru():
+    one = _fake_index("x", "r").nbytes()
+    reg = CorpusRegistry({"a": "ra", "b": "rb", "c": "rc"}, budget_bytes=2 * one, loader=_fake_index)
+    assert reg.loaded() == []
+
+    a = reg.get("a")
+    reg.get("b")
+    assert reg.get("a") is a  # hit, and "a" becomes most recently used
+    reg.get("c")  # over budget: least recently used ("b") goes
+    assert reg.loaded() == ["a", "c"]
+    assert reg.evictions == 1
+    assert reg.nbytes() <= reg.budget_bytes
+
+
+def test_registry_never_evicts_pinned_corpus():
+    reg = CorpusRegistry({"a": "ra", "b": "rb"}, budget_bytes=0, pinned=("a",), loader=_fake_index)
+    reg.get("a")
+    reg.get("b")
+    assert reg.loaded() == ["a", "b"]
+    with pytest.raises(KeyError):
+        reg.get("nope")
+
+
+def test_cold_build_runs_outside_the_registry_lock():
+    started, release, builds = threading.Event(), threading.Event(), []
+
+    def loader(name, root):
+        builds.append(name)
+        if name == "slow":
+            started.set()
+            release.wait(10)
+        return _fake_index(name, root)
+
+    reg = CorpusRegistry({"fast": "rf", "slow": "rs"}, budget_bytes=1 << 30, loader=loader)
+    fast = reg.get("fast")
+    with ThreadPoolExecutor(4) as pool:
+        slow = [pool.submit(reg.get, "slow") for _ in range(3)]
+        assert started.wait(5)
+        # While "slow" builds, the loaded corpus and the registry views stay available.
+        assert reg.get("fast") is fast and reg.peek("slow") is None and reg.loaded() == ["fast"]
+        release.set()
+        got = {id(f.result(5)) for f in slow}
+    assert len(got) == 1 and builds.count("slow") == 1 and reg.peek("slow").version == 1
+
+
+def test_answer_selects_corpus_by_name():
+    _ans, _src, tr = app.answer("ما هي المستندات المطلوبة؟", k=3, mode="TF-IDF", corpus="faq_ar", trace=True)
+    payload = json.loads(tr)
+    assert payload["corpus"] == "faq_ar"
+    assert payload["top_docs"] and all(d["path"].startswith("docs/faq/ar/") for d in payload["top_docs"])
+    assert len(app.get_corpus("faq_ar").docs) < len(app.docs)
+
+
+def test_answer_rejects_unknown_corpus():
+    with pytest.raises(ValueError):
+        app.answer("Wohngeld Unterlagen", mode="TF-IDF", corpus="does-not-exist")
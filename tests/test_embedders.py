@@ -0,0 +1,109 @@
+import json
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import app
+import cli
+from app_pkg.embedders import HashingEmbedder, embedder_name, get_embedder, parse_spec
+
+Q = "Welche Unterlagen brauche ich für den Wohngeldantrag?"
+
+
+def test_hashing_embedder_is_deterministic():
+    emb = get_embedder("hashing:64")
+    assert isinstance(emb, HashingEmbedder) and emb.dim == 64 and emb.name == "hashing-64"
+    m = emb.encode_batch(["Wohngeld Antrag", "Mietzuschuss", ""])
+    assert m.shape == (3, 64) and m.dtype == np.float32
+    assert (HashingEmbedder(64).encode_batch(["Wohngeld Antrag"])[0] == m[0]).all()
+    assert not m[2].any()  # no tokens -> zero row (normalized by the index)
+    assert float(m[0] @ m[0]) > 0
+
+
+def test_spec_parsing_and_names_without_loading():
+    assert parse_spec("sentence-transformers", "m") == ("sentence-transformers", "m")
+    assert parse_spec("st:other/model") == ("sentence-transformers", "other/model")
+    assert embedder_name("hashing") == "hashing-256"
+    assert embedder_name("sentence-transformers", "m") == "m"
+    with pytest.raises(ValueError):
+        get_embedder("word2vec")
+
+
+@pytest.fixture
+def hashing_backend(tmp_path, monkeypatch):
+    """Semantic retrieval on the offline stand-in; embeddings cached under tmp_path."""
+    monkeypatch.setattr(app, "SEMANTIC_DISABLED", False)
+    monkeypatch.setattr(app, "EMBEDDER", "hashing")
+    monkeypatch.setattr(app, "EMBEDDING_MODEL", "hashing-256")
+    monkeypatch.setattr(app, "BUILD_DIR", str(tmp_path))
+    monkeypatch.setattr(app, "embedder", None)
+    monkeypatch.setattr(app, "_semantic_ready", False)
+    monkeypatch.setattr(app, "doc_embeddings", None)
+    monkeypatch.setattr(app.default_index(), "embeddings", None)
+    return tmp_path
+
+
+def test_semantic_and_hybrid_run_on_hashing_backend(hashing_backend):
+    fallbacks = app._FALLBACKS.value(requested="Semantic")
+    assert app.ensure_semantic_ready()
+    assert app.embedder.name == "hashing-256"
+    assert app.default_index().embeddings.shape == (len(app.docs), 256)
+    assert (hashing_backend / "doc_embeddings.meta").exists()
+
+    for mode in ("Semantic", "Hybrid"):
+        _a, src, tr = app.answer(Q, k=3, mode=mode, trace=True)
+        assert src and json.loads(tr)["sniper_trace_v1"]["model_version"] == "hashing-256"
+    assert app._FALLBACKS.value(requested="Semantic") == fallbacks
+
+
+def test_concurrent_first_semantic_requests_load_and_encode_once(hashing_backend, monkeypatch):
+    loads, encodes = [], []
+
+    def counting_get_embedder(*a, **kw):
+        emb = get_embedder(*a, **kw)
+        loads.append(emb)
+        time.sleep(0.05)  # a real model load is slow: the other first requests arrive meanwhile
+        encode_batch = emb.encode_batch
+        emb.encode_batch = lambda texts: (encodes.append(len(texts)), encode_batch(texts))[1]
+        return emb
+
+    monkeypatch.setattr(app, "get_embedder", counting_get_embedder)
+    start = threading.Barrier(6)
+
+    def first_request():
+        start.wait()
+        app._init_embeddings(app.get_corpus())
+
+    threads = [threading.Thread(target=first_request) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(loads) == 1 and encodes == [len(app.docs)]
+    assert sorted(p.name for p in hashing_backend.iterdir()) == ["doc_embeddings.meta", "doc_embeddings.npy"]
+
+
+def test_cli_uses_the_app_embeddings_and_rankings(hashing_backend):
+    assert cli.semantic_available()
+    ix = app.get_corpus()
+    assert app.embedder.name == "hashing-256" and ix.embeddings.shape == (len(app.docs), 256)
+    for mode in ("tfidf", "semantic", "hybrid"):
+        ranked, _ = app.eval_ranking(ix, Q, mode, "de", 3)
+        # cli eval and the in-app eval rank from the same candidates
+        assert cli.predict_ids(Q, mode, 3, q_lang_override="de") == ix.prefer_lang(ranked, "de", 3)
+
+
+def test_hybrid_gate_uses_tfidf_score_for_passages_semantic_did_not_score(hashing_backend, monkeypatch):
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)
+    assert app.ensure_semantic_ready()
+    ix = app.get_corpus()
+    tf = json.loads(app.answer(Q, k=3, mode="TF-IDF", trace=True)[2])
+    assert not tf["abstained"]
+    # Semantic scores nothing (e.g. the winners are outside its routed slice / top-N): -1.0 everywhere.
+    unscored = np.full(len(ix.docs), -1.0, dtype=np.float32)
+    monkeypatch.setattr(ix, "semantic_search", lambda q_emb, q_lang=None, allow=None, fill=None: ([], unscored))
+    hy = json.loads(app.answer(Q, k=3, mode="Hybrid", trace=True)[2])
+    assert [d["id"] for d in hy["top_docs"]] == [d["id"] for d in tf["top_docs"]]
+    assert not hy["abstained"], hy.get("abstain_reason")
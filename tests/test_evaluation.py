@@ -0,0 +1,66 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+import cli
+from app_pkg.evaluation import KeywordIndex, rank_metrics, run_eval
+from eval import evaluate_run
+
+DOCS = [
+    {"text": "Wohngeld Antrag und Unterlagen", "lang": "de", "path": "docs/a_de.txt"},
+    {"text": "Mietvertrag als Nachweis", "lang": "de", "path": "docs/b_de.txt"},
+    {"text": "Housing benefit: Wohngeld documents", "lang": "en", "path": "docs/c_en.txt"},
+    {"text": "WOHNGELD Bescheid", "lang": "de", "path": "docs/archive/d_de.txt"},
+    {"text": "", "lang": "de", "path": "docs/e_de.txt"},
+]
+
+
+def test_keyword_ground_truth_matches_brute_force():
+    ix = KeywordIndex(DOCS)
+    for kws, lang in [(["wohngeld"], "de"), (["nachweis", "bescheid"], "de"), (["wohngeld"], "en"), ([], "de"), (["xyz"], "de")]:
+        expected = [i for i, d in enumerate(DOCS) if d["lang"] == lang and (not kws or any(k in d["text"].lower() for k in kws))]
+        assert ix.ground_truth(kws, lang) == expected
+    assert ix.ground_truth(["wohngeld"], "de", keep=lambda p: "archive" not in p) == [0]
+
+
+def test_rank_metrics_match_evaluate_run_at_every_k():
+    gt = [[0, 3], [1], [], [2, 5, 6]]
+    preds = [[3, 9, 0, 4], [7, 8], [1, 2, 3], [9, 8, 7, 2]]
+    out = rank_metrics(gt, preds, [1, 2, 3, 4])
+    for k in (1, 2, 3, 4):
+        ref = evaluate_run(gt, [p[:k] for p in preds], k=k)
+        assert out[k]["p_at_k"] == pytest.approx(ref["p_at_k"])
+        assert out[k]["r_at_k"] == pytest.approx(ref["r_at_k"])
+    assert out[1]["mrr"] == pytest.approx((1 + 0 + 0 + 0) / 4)
+    assert out[4]["mrr"] == pytest.approx((1 + 0 + 0 + 1 / 4) / 4)
+    assert out[2]["ndcg"] == pytest.approx((1 / (1 + 1 / 1.584962500721156) + 0 + 1 + 0) / 4)
+
+
+def test_run_eval_ranks_once_per_mode_at_max_k():
+    calls = []
+
+    def rank(q, mode, q_lang, k):
+        calls.append((q, mode, k))
+        return list(range(k))
+
+    runs = run_eval(["a", "b"], ["de", "en"], rank, ["tfidf", "hybrid"], [1, 5, 3])
+    assert sorted(calls) == sorted((q, m, 5) for q in "ab" for m in ("tfidf", "hybrid"))
+    assert runs["tfidf"]["predictions"] == [[0, 1, 2, 3, 4]] * 2
+    assert runs["hybrid"]["latency"]["n"] == 2
+
+
+def test_cli_eval_reports_every_k_from_one_run():
+    out = subprocess.run(
+        [sys.executable, "cli.py", "eval", "--mode", "tfidf", "-k", "3", "--ks", "1,5"],
+        capture_output=True, text=True, check=True, env={**os.environ, "DISABLE_SEMANTIC": "1"},
+    )
+    res = json.loads(out.stdout.strip().splitlines()[-1])
+    assert res["mode"] == "tfidf" and res["k"] == 3 and set(res["at_k"]) == {"1", "3", "5"}
+    assert res["p_at_k"] == res["at_k"]["3"]["p_at_k"] and res["mrr"] == res["at_k"]["3"]["mrr"]
+    assert res["at_k"]["5"]["r_at_k"] >= res["at_k"]["1"]["r_at_k"]
+    assert res["latency_ms"]["n"] == res["queries"] and res["latency_ms"]["p99_ms"] >= res["latency_ms"]["p50_ms"]
+    assert set(res["by_lang"]) and all("file_p_at_k" in v for v in res["by_lang"].values())
+    assert cli.ground_truth_ids({"keywords": [], "lang": "de"}) != []
@@ -0,0 +1,67 @@
+import json
+
+import pytest
+
+import app
+from app_pkg.faq import QuestionIndex, normalize_question
+
+DOCS = [
+    {"path": "docs/x/a_de.txt", "lang": "de", "text": "[Meta] Kurzreferenz: Unterlagen"},
+    {"path": "docs/x/a_de.txt", "lang": "de", "text": "Erforderliche Unterlagen:\n- Mietvertrag"},
+    {"path": "docs/x/a_de.txt", "lang": "de",
+     "text": "Aliasfragen (TF-IDF-Boost):\n- Welche Unterlagen brauche ich?\n- Was muss ich einreichen?"},
+    {"path": "docs/x/a_de.txt", "lang": "de", "text": "Stichwörter\nunterlagen, mietvertrag"},
+    {"path": "docs/x/b_de.txt", "lang": "de", "text": "Wie lange dauert es?\n- 4–8 Wochen."},
+    {"path": "docs/faq/ar/q.txt", "lang": "ar", "text": "ID: x\nQ: ما هي الشروط؟\nA: الدخل والإيجار."},
+]
+
+
+def test_normalization_folds_case_umlauts_punctuation_and_diacritics():
+    assert normalize_question("  Welche Unterlagen brauche ich FÜR Wohngeld?! ") == "welche unterlagen brauche ich fuer wohngeld"
+    assert normalize_question("welche unterlagen brauche ich fuer wohngeld") == "welche unterlagen brauche ich fuer wohngeld"
+    assert normalize_question("Straße – Café…") == "strasse cafe"
+    assert normalize_question("مَا هِيَ الشُّرُوطُ؟") == normalize_question("ما هي الشروط")
+
+
+def test_index_covers_aliases_qa_and_question_headed_passages():
+    qi = QuestionIndex(DOCS)
+    assert qi.lookup("Welche Unterlagen brauche ich")[1] == (1,)  # content only: no meta/alias/keyword blocks
+    assert qi.lookup("was muss ich einreichen")[1] == (1,)
+    assert qi.lookup("WIE LANGE DAUERT ES")[1] == (4,)
+    assert qi.lookup("ما هي الشروط؟")[1] == (5,)
+    assert qi.lookup("Unterlagen?") is None and len(qi) == 4
+
+
+def test_answer_fast_path_skips_retrieval_and_reports_hit_rate():
+    q = "welche unterlagen brauche ich fuer wohngeld"
+    _a, _s, tr = app.answer(q, k=3, mode="TF-IDF", trace=True)
+    t = json.loads(tr)
+    assert t["faq"]["hit"] and t["faq"]["question"] == q and 0.0 < t["faq"]["hit_rate"] <= 1.0
+    assert "tfidf" not in t["timings_ms"] and "faq" in t["timings_ms"]
+    assert not t["abstained"] and t["top_docs"][0]["file"] == "wohngeld_de.txt"
+    assert t["final_mode"] == "FAQ"
+
+    _a, _s, tr = app.answer("Bearbeitungszeit Wohngeld?", k=3, mode="TF-IDF", trace=True)
+    t = json.loads(tr)
+    assert not t["faq"]["hit"] and "tfidf" in t["timings_ms"] and t["faq"]["lookups"] >= 2
+
+
+def test_filters_forced_language_and_switch_fall_back_to_retrieval(monkeypatch):
+    q = "What documents do I need for Wohngeld?"
+    assert json.loads(app.answer(q, k=3, mode="TF-IDF", trace=True)[2])["faq"]["hit"]
+    assert not json.loads(app.answer(q, k=3, mode="TF-IDF", lang="de", trace=True)[2])["faq"]["hit"]
+    assert not json.loads(app.answer(q, k=3, mode="TF-IDF", exclude="wohngeld_en", trace=True)[2])["faq"]["hit"]
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)
+    t = json.loads(app.answer(q, k=3, mode="TF-IDF", trace=True)[2])
+    assert not t["faq"]["enabled"] and not t["faq"]["hit"] and len(t["top_docs"]) == 3
+
+
+def test_strict_mode_skips_fast_path(monkeypatch):
+    q = "Welche Unterlagen brauche ich für Wohngeld?"
+    monkeypatch.setattr(app, "_semantic_ready", False)
+    monkeypatch.setattr(app, "SEMANTIC_DISABLED", True)
+    assert json.loads(app.answer(q, k=3, mode="Semantic", trace=True)[2])["final_mode"] == "FAQ"
+    with pytest.raises(app.SemanticUnavailableError):
+        app.answer(q, k=3, mode="Semantic", strict=True)
+    t = json.loads(app.answer(q, k=3, mode="TF-IDF", strict=True, trace=True)[2])
+    assert not t["faq"]["hit"] and t["final_mode"] == "TF-IDF"
@@ -0,0 +1,52 @@
+import json
+
+import numpy as np
+import pytest
+
+import app
+import cli
+from app_pkg.retrieval import file_segments, segment_reduce
+
+
+def test_segment_reduce_max_and_top2():
+    starts = file_segments(["a", "a", "b", "c", "c", "c"])
+    assert starts.tolist() == [0, 2, 3]
+    scores = np.array([0.1, 0.5, -np.inf, 0.2, 0.9, 0.4])
+
+    file_scores, best = segment_reduce(scores, starts, how="max")
+    assert file_scores[0] == 0.5 and np.isneginf(file_scores[1]) and file_scores[2] == 0.9
+    assert best[[0, 2]].tolist() == [1, 4]
+
+    file_scores, _ = segment_reduce(scores, starts, how="top2")
+    assert file_scores[[0, 2]] == pytest.approx([0.3, 0.65])
+
+
+def test_segment_reduce_rejects_unknown_aggregation():
+    with pytest.raises(ValueError):
+        segment_reduce(np.zeros(2), np.array([0]), how="median")
+
+
+def test_file_level_answer_uses_distinct_files(monkeypatch):
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)  # Q is a known FAQ question; exercise retrieval
+    _ans, _src, tr = app.answer(
+        "Welche Unterlagen brauche ich für den Wohngeldantrag?",
+        k=5,
+        mode="TF-IDF",
+        include="wohngeld",
+        trace=True,
+        level="file",
+    )
+    payload = json.loads(tr)
+    files = [d["path"] for d in payload["top_docs"]]
+    assert payload["level"] == "file"
+    assert len(files) == 5
+    assert len(set(files)) == len(files)
+
+
+def test_file_level_eval_prediction_is_one_passage_per_file():
+    q = "Wie lange dauert die Bearbeitung vom Wohngeld?"
+    passage = cli.predict_ids(q, "tfidf", 5, ["wohngeld"], q_lang_override="de")
+    by_file = cli.predict_ids(q, "tfidf", 5, ["wohngeld"], q_lang_override="de", level="file")
+    assert len({app.docs[i]["path"] for i in by_file}) == len(by_file) == 5
+    # The best passage overall is still ranked first.
+    assert by_file[0] == passage[0]
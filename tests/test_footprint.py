@@ -0,0 +1,60 @@
+import json
+import sys
+import tracemalloc
+
+import numpy as np
+import scipy.sparse as sp
+
+import app
+import cli
+from app_pkg.footprint import StartupTrace, array_footprint, csr_footprint, passage_footprint, render_text
+
+
+def test_matrix_and_passage_footprints_match_the_objects(tmp_path):
+    X = sp.random(20, 50, density=0.1, format="csr", dtype=np.float32, random_state=0)
+    f = csr_footprint(X)
+    assert f["nnz"] == X.nnz and f["shape"] == [20, 50] and not f["mapped"]
+    assert f["bytes"] == X.data.nbytes + X.indices.nbytes + X.indptr.nbytes
+
+    path = tmp_path / "emb.npy"
+    np.save(path, np.ones((4, 8), dtype=np.float32))
+    mapped = array_footprint(np.load(path, mmap_mode="r")[:2])
+    assert mapped == {"shape": [2, 8], "dtype": "float32", "bytes": 64, "mapped": True}
+
+    docs = [{"text": "ä", "lang": "de", "path": "a.txt"}, {"text": "b", "lang": "de", "path": "b.txt"},
+            {"text": "c", "lang": "en", "path": "a.txt"}]
+    p = passage_footprint(docs)
+    assert p["by_lang"] == {"de": 2, "en": 1} and p["by_file"] == {"a.txt": 2, "b.txt": 1}
+    assert p["files"] == 2 and p["text_bytes"] == 4 and p["bytes"] > p["text_bytes"]
+
+
+def test_corpus_footprint_adds_up_and_renders():
+    ix = app.get_corpus()
+    fp = ix.footprint()
+    assert fp["passages"]["passages"] == len(ix.docs) == sum(fp["passages"]["by_lang"].values())
+    parts = fp["tfidf"].values()
+    assert sum(p["X_char"]["shape"][0] for p in parts) == len(ix.docs)
+    assert all(p["X_word"]["vocab"] == p["X_word"]["shape"][1] for p in parts)
+    rep = app.footprint_report()
+    assert rep["totals"]["index_bytes"] == sum(c["bytes"] for c in rep["corpora"].values())
+    text = render_text(rep)
+    assert f"{len(ix.docs)} passages" in text and "X_char" in text and "rss" in text
+
+
+def test_startup_trace_and_cli_json_export(tmp_path, monkeypatch, capsys):
+    was_tracing = tracemalloc.is_tracing()
+    trace = StartupTrace(top=3)
+    trace.start()
+    blob = [bytearray(1 << 16) for _ in range(8)]  # noqa: F841 (kept alive for the snapshot)
+    rep = trace.stop()
+    assert not tracemalloc.is_tracing() and 1 <= len(rep["top"]) <= 3 and rep["traced_bytes"] >= 8 << 16
+    assert "test_footprint.py:" in rep["top"][0]["where"]
+    if was_tracing:
+        tracemalloc.start()
+
+    out = tmp_path / "stats.json"
+    monkeypatch.setattr(sys, "argv", ["cli.py", "stats", "index", "--json", "--trace-top", "0", "--out", str(out)])
+    cli.main()
+    printed = json.loads(capsys.readouterr().out)
+    assert json.loads(out.read_text(encoding="utf-8")) == printed
+    assert app.DEFAULT_CORPUS in printed["corpora"] and printed["startup_trace"] == app.startup_trace.report
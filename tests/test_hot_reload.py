@@ -0,0 +1,94 @@
+import json
+import os
+
+import numpy as np
+
+import app
+from app_pkg.index import CorpusIndex, CorpusRegistry, DocsWatcher, emb_cache_key
+
+
+def _write(root, name, text):
+    p = root / name
+    p.write_text(text, encoding="utf-8")
+    # Make sure the fingerprint sees a change even on coarse mtime filesystems.
+    st = os.stat(p)
+    os.utime(p, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+class _CountingEmbedder:
+    name, dim = "counting", 3
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode_batch(self, texts):
+        self.encoded.extend(texts)
+        return np.asarray([[len(t), 1.0, t.count("a")] for t in texts], dtype=np.float32)
+
+
+def test_reload_publishes_new_version_and_keeps_old_snapshot(tmp_path):
+    _write(tmp_path, "faq_de.txt", "Erster Absatz über Wohngeld.\n\nZweiter Absatz.")
+    reg = CorpusRegistry({"t": str(tmp_path)}, budget_bytes=1 << 30)
+    old = reg.get("t")
+    assert old.version == 1
+
+    _write(tmp_path, "faq_de.txt", "Erster Absatz über Wohngeld.\n\nGeänderter zweiter Absatz.\n\nNeu.")
+    new = reg.reload("t")
+    assert new.version == 2 and reg.get("t") is new
+    # A request that grabbed the old snapshot still sees a consistent old view.
+    assert len(old.docs) == 2 and old.tfidf.passages is old.docs
+    assert len(new.docs) == 3
+
+
+def test_reload_reembeds_only_changed_passages(tmp_path):
+    _write(tmp_path, "faq_de.txt", "Absatz eins.\n\nAbsatz zwei.")
+    reg = CorpusRegistry({"t": str(tmp_path)}, budget_bytes=1 << 30)
+    emb = _CountingEmbedder()
+    build = str(tmp_path / "build")
+    reg.get("t").ensure_embeddings(emb, "fake", build)
+    assert len(emb.encoded) == 2
+
+    _write(tmp_path, "faq_de.txt", "Absatz eins.\n\nAbsatz zwei, aktualisiert.")
+    new = reg.reload("t", prepare=lambda n, o: n.ensure_embeddings(emb, "fake", build, previous=o))
+    assert new.reembedded == 1
+    assert emb.encoded[-1] == "Absatz zwei, aktualisiert."
+    assert new.embeddings.shape == (2, 3)
+
+
+def test_embedding_cache_rows_follow_passage_order(tmp_path):
+    docs = [{"text": t, "path": "a.txt", "lang": "de"} for t in ("Absatz eins.", "Absatz zwei.")]
+    assert emb_cache_key("fake", docs) != emb_cache_key("fake", docs[::-1])
+    emb, build = _CountingEmbedder(), str(tmp_path / "build")
+    CorpusIndex([dict(d) for d in docs]).ensure_embeddings(emb, "fake", build)
+    # Same passages in another order (e.g. a new layout): the cache is not reused row-for-row.
+    swapped = CorpusIndex([dict(d) for d in docs[::-1]])
+    swapped.ensure_embeddings(emb, "fake", build)
+    assert emb.encoded == ["Absatz eins.", "Absatz zwei.", "Absatz zwei.", "Absatz eins."]
+
+
+def test_watcher_detects_changes(tmp_path):
+    _write(tmp_path, "faq_de.txt", "Absatz eins.")
+    reg = CorpusRegistry({"t": str(tmp_path)}, budget_bytes=1 << 30)
+    reg.get("t")
+    seen = []
+    watcher = DocsWatcher(reg, seen.append, interval_s=60)
+    assert watcher.check() == []
+
+    _write(tmp_path, "neu_de.txt", "Noch ein Dokument.")
+    assert watcher.check() == ["t"]
+    assert seen == ["t"]
+
+
+def test_app_reload_and_trace_records_index_version(tmp_path, monkeypatch):
+    _write(tmp_path, "wohngeld_de.txt", "Wohngeld Unterlagen: Mietvertrag und Einkommensnachweise beilegen.")
+    monkeypatch.setitem(app.CORPORA, "tmp", str(tmp_path))
+    monkeypatch.setitem(app.corpora.roots, "tmp", str(tmp_path))
+
+    _a, _s, tr = app.answer("Wohngeld Unterlagen Mietvertrag", mode="TF-IDF", corpus="tmp", trace=True)
+    v1 = json.loads(tr)["index_version"]
+
+    ix = app.reload_corpus("tmp", wait=True)
+    assert ix.version == v1 + 1
+    _a, _s, tr = app.answer("Wohngeld Unterlagen Mietvertrag", mode="TF-IDF", corpus="tmp", trace=True)
+    assert json.loads(tr)["index_version"] == v1 + 1
+    app.corpora.evict("tmp")
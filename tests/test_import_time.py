@@ -0,0 +1,37 @@
+import os
+import re
+import subprocess
+import sys
+
+# Cold `import app` must stay cheap: no corpus load, no TF-IDF fit, no sklearn/scipy/gradio.
+# Generous vs. the ~150 ms measured locally so slow CI runners don't flake.
+IMPORT_BUDGET_MS = float(os.getenv("IMPORT_BUDGET_MS", "800"))
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run(code, *flags):
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def test_import_app_stays_under_budget():
+    out = _run("import app", "-X", "importtime").stderr
+    m = re.search(r"^import time:\s+\d+\s+\|\s+(\d+)\s+\|\s+app$", out, re.M)
+    assert m, out[-2000:]
+    cumulative_ms = int(m.group(1)) / 1000.0
+    assert cumulative_ms < IMPORT_BUDGET_MS, f"import app took {cumulative_ms:.0f} ms"
+
+
+def test_import_app_builds_nothing_until_first_use():
+    code = (
+        "import sys, app\n"
+        "heavy = [m for m in ('sklearn', 'scipy', 'gradio', 'sentence_transformers') if m in sys.modules]\n"
+        "print(heavy, app.corpora.loaded())\n"
+        "n = len(app.docs)\n"
+        "print(n > 0, app.corpora.loaded(), 'sklearn' in sys.modules)\n"
+    )
+    lines = _run(code).stdout.splitlines()
+    assert lines[0] == "[] []"
+    assert lines[1] == "True ['default'] True"
@@ -0,0 +1,75 @@
+import threading
+
+import app
+from app_pkg.jobs import JobRunner
+
+
+def test_same_key_joins_running_job_then_hits_memo():
+    gate, calls = threading.Event(), []
+    runner = JobRunner(workers=2, memo=4)
+
+    def fn(job):
+        calls.append(threading.current_thread().name)
+        job.total = 2
+        job.advance()
+        gate.wait(5)
+        job.advance()
+        return "result"
+
+    a = runner.submit("k", fn)
+    b = runner.submit("k", fn)
+    assert a is b and not a.wait(0.05) and a.status()["state"] == "running"
+    gate.set()
+    assert a.wait(5) and a.result == "result" and a.status()["progress"] == 1.0
+    c = runner.submit("k", fn)
+    assert c.wait(0) and c.result == "result" and c.status()["memo_hit"]
+    assert len(calls) == 1 and calls[0].startswith("job")
+    assert runner.stats() == {"submitted": 1, "memo_hits": 1, "joined": 1, "done": 1, "cancelled": 0, "failed": 0,
+                              "running": 0, "memoized": 1}
+
+
+def test_cancelled_and_failed_jobs_are_not_memoized():
+    started = threading.Event()
+    runner = JobRunner()
+
+    def spin(job):
+        started.set()
+        while True:
+            job.check()
+            job.wait(0.01)
+
+    job = runner.submit("k", spin)
+    assert started.wait(5) and runner.cancel("k")
+    assert job.wait(5) and job.status()["state"] == "cancelled" and not job.cancel()
+    assert runner.submit("k", lambda job: 42).wait(5)
+    bad = runner.submit("x", lambda job: 1 / 0)
+    assert bad.wait(5) and bad.status()["error"].startswith("ZeroDivisionError")
+    retry = runner.submit("x", lambda job: 1)
+    assert retry.wait(5) and retry.result == 1 and not retry.status()["memo_hit"]
+    assert runner.stats()["cancelled"] == 1 and runner.stats()["failed"] == 1
+
+
+def test_eval_runs_off_caller_with_progress_and_memo(monkeypatch):
+    monkeypatch.setattr(app, "eval_jobs", JobRunner(memo=4, name="eval"))
+    key_before = app.eval_key(3, "wohngeld", "auto")
+    steps = list(app.eval_ui_stream(3, "wohngeld", "auto"))
+    assert steps[-1].startswith("### Eval") and "Hybrid: **P@3" in steps[-1]
+    assert app.eval_key(3, "wohngeld", "auto") == key_before  # loading the corpus keeps the key
+    again = app.start_eval(3, "wohngeld", "auto")
+    assert again.status()["memo_hit"] and again.status()["done"] == again.total > 0
+    assert app.eval_ui(3, "wohngeld", "auto").endswith("_(cached)_")
+    assert app.eval_key(3, "wohngeld", "de") != key_before
+
+
+def test_eval_cancel(monkeypatch):
+    monkeypatch.setattr(app, "eval_jobs", JobRunner(name="eval"))
+    monkeypatch.setattr(app, "EVAL_POLL_S", 0.01)
+    entered, release = threading.Event(), threading.Event()
+    monkeypatch.setattr(app, "_init_embeddings", lambda ix=None: (entered.set(), release.wait(5)))
+    stream = app.eval_ui_stream(1, "", "auto")
+    assert next(stream).startswith(("Eval queued", "Evaluating"))
+    assert entered.wait(5)
+    assert app.cancel_eval_ui(1, "", "auto") == "Cancelling eval…"
+    release.set()
+    assert list(stream)[-1] == "Eval cancelled."
+    assert app.cancel_eval_ui(1, "", "auto") == "No eval running for these settings."
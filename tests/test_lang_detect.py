@@ -0,0 +1,41 @@
+import json
+
+from app_pkg import lang
+from app_pkg.lang import TrigramLangModel, detect_lang, detect_langs
+
+
+def _eval_items():
+    items = []
+    for path in ("data/wohngeld_eval.jsonl", "data/eval.jsonl"):
+        with open(path, "r", encoding="utf-8") as f:
+            items += [json.loads(line) for line in f if line.strip()]
+    return items
+
+
+def test_detects_every_eval_query():
+    items = _eval_items()
+    assert [detect_lang(it["q"]) for it in items] == [it["lang"] for it in items]
+
+
+def test_borrowed_german_terms_and_edge_cases():
+    assert detect_lang("When should I apply for a renewal (Weiterleistungsantrag) for Wohngeld?") == "en"
+    assert detect_lang("Bearbeitungszeit Wohngeld?") == "de"
+    assert detect_lang("ما هو Wohngeld؟") == "ar"
+    assert detect_lang("") == detect_lang("   ") == detect_lang("2024 / 12") == "en"
+
+
+def test_batch_api_and_memo_cache():
+    qs = ["Welche Unterlagen brauche ich?", "What documents do I need?", "Welche Unterlagen brauche ich?"]
+    assert detect_langs(qs) == ["de", "en", "de"]
+    hits = lang.detect_cache_info()["hits"]
+    assert detect_lang("  What documents do I need? ") == "en"  # same key after strip
+    assert lang.detect_cache_info()["hits"] == hits + 1
+
+
+def test_model_round_trips_and_is_deterministic(tmp_path):
+    fresh = TrigramLangModel.from_docs("docs")
+    path = fresh.save(str(tmp_path / "m.json"))
+    loaded = TrigramLangModel.load(path)
+    q = "Wie lange dauert die Bearbeitung?"
+    assert loaded.scores(q) == fresh.scores(q)
+    assert [loaded.detect(it["q"]) for it in _eval_items()] == [it["lang"] for it in _eval_items()]
@@ -10,7 +10,8 @@ def _lang_and_files(src: str):
         files.append(m.group("fname"))
     return langs, files
 
-def test_de_lang_override_and_include():
+def test_de_lang_override_and_include(monkeypatch):
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)  # Q is a known FAQ question; exercise retrieval
     q = "Welche Unterlagen brauche ich für den Wohngeldantrag?"
     ans, src = app.answer(q, k=3, mode="TF-IDF", include="wohngeld", exclude="", lang="de")
     assert isinstance(ans, str) and ans.strip()
@@ -0,0 +1,71 @@
+import json
+
+import pytest
+
+import app
+from app_pkg.metrics import MetricsRegistry
+
+Q = "Welche Unterlagen brauche ich für den Wohngeldantrag?"
+
+
+def test_registry_renders_prometheus_text():
+    reg = MetricsRegistry()
+    c = reg.counter("reqs_total", "Requests", ("mode",))
+    c.inc(mode="TF-IDF")
+    c.inc(2, mode="TF-IDF")
+    reg.gauge("up", "Up").set(1)
+    h = reg.histogram("lat_seconds", "Latency", buckets=(0.1, 1.0))
+    for v in (0.05, 0.5, 5.0):
+        h.observe(v)
+    text = reg.render_prometheus()
+    assert "# TYPE reqs_total counter" in text
+    assert 'reqs_total{mode="TF-IDF"} 3' in text
+    assert "up 1" in text
+    assert 'lat_seconds_bucket{le="0.1"} 1' in text
+    assert 'lat_seconds_bucket{le="1"} 2' in text
+    assert 'lat_seconds_bucket{le="+Inf"} 3' in text
+    assert "lat_seconds_count 3" in text
+
+    snap = reg.snapshot()
+    assert snap["lat_seconds"]["samples"][0]["value"]["buckets"]["+Inf"] == 3
+    with pytest.raises(ValueError):
+        reg.histogram("reqs_total")  # same name, different type
+    with pytest.raises(ValueError):
+        c.inc(lang="de")  # wrong labels
+
+
+def test_answer_updates_request_outcome_and_fallback_counters(monkeypatch):
+    reqs = app.METRICS.counter("answer_requests_total", labelnames=("mode",))
+    fallbacks = app.METRICS.counter("semantic_fallback_total", labelnames=("requested",))
+    outcomes = app.METRICS.counter("answer_outcomes_total", labelnames=("mode", "outcome"))
+    latency = app.METRICS.histogram("answer_latency_seconds", labelnames=("mode",))
+    before = (
+        reqs.value(mode="Hybrid"),
+        fallbacks.value(requested="Hybrid"),
+        outcomes.value(mode="TF-IDF", outcome="empty"),
+        latency.count(mode="TF-IDF"),
+    )
+
+    monkeypatch.setattr(app, "_semantic_ready", False)
+    monkeypatch.setattr(app, "_init_embeddings", lambda ix=None: None)
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)  # Q is a known FAQ question; exercise retrieval
+    app.answer(Q, k=3, mode="Hybrid")
+    app.answer("   ", mode="TF-IDF")
+
+    assert reqs.value(mode="Hybrid") == before[0] + 1
+    assert fallbacks.value(requested="Hybrid") == before[1] + 1
+    assert outcomes.value(mode="TF-IDF", outcome="empty") == before[2] + 1
+    assert latency.count(mode="TF-IDF") == before[3] + 2
+
+    text = app.METRICS.render_prometheus()
+    for name in ("index_cache_total", "semantic_ready", "corpora_loaded", "embed_batcher", "answer_stage_seconds_bucket"):
+        assert name in text
+
+
+def test_stats_command_dumps_json_snapshot(capsys, monkeypatch):
+    import cli
+
+    monkeypatch.setattr("sys.argv", ["cli.py", "stats", "--json", "--url", ""])
+    cli.main()
+    snap = json.loads(capsys.readouterr().out)
+    assert snap["answer_requests_total"]["type"] == "counter"
@@ -12,13 +12,15 @@ def _call(mode):
     assert isinstance(ans, str) and len(ans) > 0
     assert isinstance(src, str) and "[1]" in src
 
-def test_semantic():
+def test_semantic(monkeypatch):
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)  # the question is a known FAQ question; exercise retrieval
     _call("Semantic")
 
 def test_tfidf():
     _call("TF-IDF")
 
-def test_semantic_strict_requires_semantic():
+def test_semantic_strict_requires_semantic(monkeypatch):
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)  # the question is a known FAQ question; exercise retrieval
     if os.getenv("DISABLE_SEMANTIC") == "1":
         pytest.skip("Semantic disabled via DISABLE_SEMANTIC")
     if not app.ensure_semantic_ready():
@@ -0,0 +1,71 @@
+import csv
+import gzip
+import json
+import threading
+
+import app
+from app_pkg.logging_utils import AsyncLogWriter
+
+
+def test_csv_batches_rows_with_one_header(tmp_path):
+    path = tmp_path / "q.csv"
+    w = AsyncLogWriter(str(path), fmt="csv", fieldnames=["a", "b"], flush_s=0.05)
+    for i in range(100):
+        assert w.log({"a": i, "b": "x", "ignored": 1})
+    assert w.flush()
+    w.log({"a": 100, "b": "y"})
+    w.close()
+    rows = list(csv.DictReader(path.open(encoding="utf-8")))
+    assert [int(r["a"]) for r in rows] == list(range(101))
+    st = w.stats()
+    assert st["written"] == 101 and st["dropped"] == 0 and st["batches"] < 101
+    assert not w.log({"a": 1, "b": 2}) and w.stats()["dropped"] == 1  # closed
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path, monkeypatch):
+    gate = threading.Event()
+    w = AsyncLogWriter(str(tmp_path / "q.jsonl"), fmt="jsonl", max_queue=3, flush_s=0)
+    orig = w._write
+    monkeypatch.setattr(w, "_write", lambda rows: (gate.wait(5), orig(rows)))
+    accepted = [w.log({"i": i}) for i in range(20)]  # writer is stuck on the first batch
+    assert accepted.count(False) >= 16
+    assert w.stats()["dropped"] == accepted.count(False)
+    gate.set()
+    w.close()
+    lines = (tmp_path / "q.jsonl").read_text(encoding="utf-8").splitlines()
+    assert len(lines) == w.stats()["written"] == accepted.count(True)
+
+
+def test_size_rotation_keeps_backups(tmp_path):
+    path = tmp_path / "q.jsonl"
+    w = AsyncLogWriter(str(path), fmt="jsonl", max_bytes=200, backups=2, flush_s=0)
+    for i in range(40):
+        w.log({"i": i, "pad": "x" * 40})
+        w.flush()
+    w.close()
+    assert path.exists() and (tmp_path / "q.jsonl.1").exists() and (tmp_path / "q.jsonl.2").exists()
+    assert not (tmp_path / "q.jsonl.3").exists()
+    assert w.stats()["rotations"] >= 3
+
+
+def test_gzip_jsonl_is_readable_while_appending(tmp_path):
+    path = tmp_path / "q.jsonl.gz"
+    w = AsyncLogWriter(str(path), fmt="jsonl.gz", flush_s=0)
+    w.log({"q": "Wohngeld Unterlagen"})
+    w.flush()
+    w.log({"q": "بدل السكن"})
+    w.flush()
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        assert [json.loads(line)["q"] for line in f] == ["Wohngeld Unterlagen", "بدل السكن"]
+    w.close()
+
+
+def test_answer_only_enqueues(tmp_path, monkeypatch):
+    w = AsyncLogWriter(str(tmp_path / "queries.csv"), fmt="csv", fieldnames=app.QUERY_LOG_FIELDS)
+    monkeypatch.setattr(app, "LOG_QUERIES", True)
+    monkeypatch.setattr(app, "_query_logger", w)
+    app.answer("Welche Unterlagen brauche ich für den Wohngeldantrag?", k=3, mode="TF-IDF")
+    w.close()
+    rows = list(csv.DictReader((tmp_path / "queries.csv").open(encoding="utf-8")))
+    assert len(rows) == 1 and rows[0]["mode"] == "TF-IDF" and rows[0]["lang_detected"] == "de"
+    assert 'query_log{stat="written"} 1' in app.METRICS.render_prometheus()
@@ -1,4 +1,5 @@
 import app
+from app_pkg.retrieval import rrf_fuse
 
 
 def test_wohngeld_question_returns_text():
@@ -88,3 +89,11 @@ def test_clarify_reply_does_not_trigger_on_decimal():
     ans, src = app.answer("1.5", k=3, mode="TF-IDF", include="wohngeld")
     assert "Your question is a bit broad" not in ans
     assert "Clarify" not in src
+
+
+def test_rrf_fuse_votes_only_with_candidates_and_keeps_lexical_order_on_ties():
+    order, rrf = rrf_fuse([1, 2, 3], [3, 9, 1], tf_cand=2, sem_cand=2, k0=0.0)
+    # 1: 1/1 (lexical), 2: 1/2, 3: 1/1 (semantic only: lexical rank 3 is past tf_cand), 9: 1/2
+    assert rrf == {1: 1.0, 2: 0.5, 3: 1.0, 9: 0.5}
+    assert order == [1, 3, 2, 9]
+    assert rrf_fuse([], [])[0] == []
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+import app
+import bench
+import server
+from app_pkg import runtime
+
+
+@pytest.fixture
+def clean_runtime(monkeypatch):
+    for var in runtime.BLAS_ENV_VARS + ("RUNTIME_CORES", "SERVE_WORKERS", "SERVE_POOL", "TORCH_THREADS", "BLAS_THREADS"):
+        monkeypatch.delenv(var, raising=False)
+    yield
+    runtime.reset()
+
+
+def test_plan_splits_cores_across_request_workers():
+    cfg = runtime.plan(cores=8, pool="thread", workers=4)
+    assert (cfg.workers, cfg.torch_threads, cfg.blas_threads, cfg.torch_interop_threads) == (4, 2, 2, 1)
+    assert runtime.plan(cores=8).workers == runtime.MAX_DEFAULT_WORKERS
+    assert runtime.plan(cores=2, workers=8).blas_threads == 1  # never below one thread
+    assert runtime.plan(cores=16, pool="process", workers=2, torch_threads=3).torch_threads == 3
+    with pytest.raises(ValueError):
+        runtime.plan(pool="greenlet")
+
+
+def test_from_env_reads_one_config(clean_runtime):
+    env = {"RUNTIME_CORES": "12", "SERVE_POOL": "process", "SERVE_WORKERS": "3", "BLAS_THREADS": "2"}
+    cfg = runtime.from_env(environ=env)
+    assert (cfg.cores, cfg.pool, cfg.workers, cfg.torch_threads, cfg.blas_threads) == (12, "process", 3, 4, 2)
+    assert runtime.from_env(workers=6, environ={"RUNTIME_CORES": "12"}).torch_threads == 2
+
+
+def test_apply_exports_limits_and_reports_them(clean_runtime):
+    applied = runtime.apply(runtime.plan(cores=4, workers=4))
+    assert applied["env"] and os.environ["OMP_NUM_THREADS"] == os.environ["OPENBLAS_NUM_THREADS"] == "1"
+    rep = runtime.report()
+    assert rep["configured"]["workers"] == 4 and rep["configured"]["blas_threads"] == 1
+    assert all(p["threads"] == 1 for p in rep.get("threadpools", []))
+
+
+def test_health_reports_runtime(clean_runtime):
+    runtime.apply(runtime.plan(cores=2, workers=2))
+    assert server.run_health()["runtime"]["configured"]["torch_threads"] == 1
+
+
+def test_sweep_tries_every_layout_and_restores_state(clean_runtime, tmp_path):
+    rep = bench.sweep(200, mode="TF-IDF", workers=(1, 2), threads=(1,), n_queries=6, workdir=str(tmp_path), log=lambda *_: None)
+    assert [(r["workers"], r["threads"]) for r in rep["results"]] == [(1, 1), (2, 1)]
+    assert rep["best"]["qps"] == max(r["qps"] for r in rep["results"])
+    assert runtime.current() is None and "OMP_NUM_THREADS" not in os.environ
+    assert app.COALESCE_REQUESTS and "bench_200" not in app.corpora.roots
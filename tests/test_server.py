@@ -0,0 +1,157 @@
+import http.client
+import json
+import threading
+import time
+
+import pytest
+
+import app
+import ask
+import server
+
+Q = "Welche Unterlagen brauche ich für den Wohngeldantrag?"
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    httpd = server.make_server("127.0.0.1", 0, server.AnswerService(workers=2, pool="thread"))
+    t = threading.Thread(target=httpd.serve_forever, daemon=True)
+    t.start()
+    yield httpd.server_address
+    httpd.shutdown()
+    httpd.server_close()
+    httpd.service.close()
+
+
+def _call(conn, method, path, body=None):
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    conn.request(method, path, body=data, headers={"Content-Type": "application/json"})
+    resp = conn.getresponse()
+    return resp.status, json.loads(resp.read().decode("utf-8"))
+
+
+def test_answer_mirrors_in_process_trace_over_one_keepalive_connection(base_url):
+    conn = http.client.HTTPConnection(*base_url, timeout=30)
+    status, health = _call(conn, "GET", "/health")
+    assert status == 200 and health["status"] == "ok" and health["pool"] == "thread"
+
+    status, res = _call(conn, "POST", "/answer", {"query": Q, "k": 3, "include": "wohngeld"})
+    assert status == 200
+    ans, _src, tr = app.answer(Q, k=3, mode="TF-IDF", include="wohngeld", trace=True)
+    assert res["answer"] == ans
+    local = json.loads(tr)
+    assert res["trace"]["top_docs"] == local["top_docs"]
+    assert set(res["trace"]) == set(local)
+
+    status, res = _call(conn, "POST", "/search", {"query": Q, "k": 3, "include": "wohngeld"})
+    assert status == 200
+    assert [r["id"] for r in res["results"]] == [d["id"] for d in local["top_docs"]]
+    assert all(r["text"] and 0.0 <= r["score"] <= 1.0 for r in res["results"])
+    conn.close()
+
+
+def test_bad_requests_get_json_errors(base_url):
+    conn = http.client.HTTPConnection(*base_url, timeout=30)
+    assert _call(conn, "POST", "/answer", {"k": 3})[0] == 400
+    assert _call(conn, "POST", "/answer", {"query": Q, "corpus": "nope"})[0] == 400
+    for k in (None, [3], "three"):
+        status, err = _call(conn, "POST", "/answer", {"query": Q, "k": k})
+        assert status == 400 and '"k" must be an integer' in err["error"]
+    assert _call(conn, "GET", "/answer")[0] == 405
+    assert _call(conn, "GET", "/nope")[0] == 404
+    conn.close()
+
+
+def test_strict_semantic_without_backend_is_503(base_url, monkeypatch):
+    monkeypatch.setattr(app, "_semantic_ready", False)
+    monkeypatch.setattr(app, "SEMANTIC_DISABLED", True)
+    conn = http.client.HTTPConnection(*base_url, timeout=30)
+    status, err = _call(conn, "POST", "/answer", {"query": Q, "mode": "Semantic", "strict": True})
+    assert status == 503 and "unavailable" in err["error"]
+    conn.close()
+
+
+def test_health_reads_one_snapshot_of_the_registry(monkeypatch):
+    app.get_corpus()
+    # A corpus evicted/reloaded between listing and lookup must not break /health.
+    monkeypatch.setattr(app.corpora, "peek", lambda name: None)
+    h = server.run_health()
+    assert h["corpora"][app.DEFAULT_CORPUS] == app.get_corpus().version
+
+
+def test_ask_client_talks_to_running_service(base_url, monkeypatch):
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)  # Q is a known FAQ question; exercise retrieval
+    host, port = base_url
+    res = ask.ask_server(f"http://{host}:{port}", {"query": Q, "k": 2})
+    assert res["answer"] and len(res["trace"]["top_docs"]) == 2
+
+
+def test_identical_concurrent_requests_are_coalesced(base_url, monkeypatch):
+    real = server.run_answer
+
+    def slow(body):
+        time.sleep(0.2)
+        return real(body)
+
+    monkeypatch.setattr(server, "run_answer", slow)
+    out = [None] * 3
+    start = threading.Barrier(3)
+
+    def worker(i):
+        conn = http.client.HTTPConnection(*base_url, timeout=30)
+        start.wait()
+        out[i] = _call(conn, "POST", "/answer", {"query": Q, "k": 3})[1]
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len({r["trace"]["sniper_trace_v1"]["trace_id"] for r in out}) == 3
+    conn = http.client.HTTPConnection(*base_url, timeout=30)
+    assert _call(conn, "GET", "/health")[1]["coalescing"]["coalesced"] >= 2
+
+
+def test_metrics_endpoint_serves_prometheus_text(base_url):
+    conn = http.client.HTTPConnection(*base_url, timeout=30)
+    _call(conn, "POST", "/answer", {"query": Q, "k": 1})
+    conn.request("GET", "/metrics")
+    resp = conn.getresponse()
+    text = resp.read().decode("utf-8")
+    assert resp.status == 200 and resp.getheader("Content-Type").startswith("text/plain")
+    assert "# TYPE answer_requests_total counter" in text
+    assert 'http_requests_total{path="/answer",status="200"}' in text
+    status, snap = _call(conn, "GET", "/metrics?format=json")
+    assert status == 200 and snap["answer_latency_seconds"]["type"] == "histogram"
+
+
+def test_stats_endpoint_reports_index_footprint(base_url):
+    conn = http.client.HTTPConnection(*base_url, timeout=30)
+    status, rep = _call(conn, "GET", "/stats")
+    conn.close()
+    assert status == 200
+    c = rep["corpora"][app.DEFAULT_CORPUS]
+    assert rep["totals"]["passages"] == sum(x["passages"]["passages"] for x in rep["corpora"].values()) > 0
+    assert c["passages"]["passages"] == sum(c["passages"]["by_lang"].values())
+    assert {"X_char", "X_word"} <= set(next(iter(c["tfidf"].values())))
+    assert rep["process"]["rss_bytes"] and "query_embeddings" in rep["caches"]
+
+
+def test_health_and_metrics_do_not_queue_behind_retrieval():
+    service = server.AnswerService(workers=1, pool="thread")
+    httpd = server.make_server("127.0.0.1", 0, service)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    release = threading.Event()
+    busy = service.pool.submit(release.wait, 30)  # the only worker is taken
+    try:
+        conn = http.client.HTTPConnection(*httpd.server_address, timeout=5)
+        assert _call(conn, "GET", "/health")[1]["status"] == "ok"
+        assert _call(conn, "GET", "/metrics?format=json")[0] == 200
+        conn.close()
+    finally:
+        release.set()
+        busy.result()
+        httpd.shutdown()
+        httpd.server_close()
+        service.close()
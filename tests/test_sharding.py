@@ -0,0 +1,96 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import app
+from app_pkg.index import CorpusIndex
+from app_pkg.sharding import ShardedIndex
+
+QUERIES = [
+    "Welche Unterlagen brauche ich für den Wohngeldantrag?",
+    "Wie lange dauert die Bearbeitung?",
+    "housing benefit documents",
+    "ما هي المستندات المطلوبة",
+]
+
+
+@pytest.fixture(scope="module")
+def pair():
+    local = CorpusIndex(list(app.get_corpus().docs), name="default")
+    local.embeddings = np.random.default_rng(0).random((len(local.docs), 16)).astype(np.float32)
+    local.embeddings /= np.linalg.norm(local.embeddings, axis=1, keepdims=True)
+    sharded = ShardedIndex(local, 3)
+    yield local, sharded
+    sharded.close()
+
+
+@pytest.mark.parametrize("lang", [None, "de", "en", "ar"])
+def test_tfidf_merge_matches_unsharded(pair, lang):
+    local, sharded = pair
+    for q in QUERIES:
+        for pool, fill in ((5, None), (200, 3)):
+            ids_l, sc_l = local.tfidf_rank(q, pool, lang, fill=fill)
+            ids_s, sc_s = sharded.tfidf_rank(q, pool, lang, fill=fill)
+            assert np.allclose(sorted(sc_l.values()), sorted(sc_s.values()))
+            # Ranked score sequence is identical; ids only differ within score ties.
+            assert np.allclose([sc_l[i] for i in ids_l], [sc_s[i] for i in ids_s])
+            assert sc_s == pytest.approx({i: sc_l[i] for i in ids_s})
+
+
+def test_tfidf_respects_allow_mask(pair):
+    local, sharded = pair
+    allow = local.file_mask(["wohngeld"], [])
+    ids, _ = sharded.tfidf_rank(QUERIES[0], 10, "de", allow=allow)
+    assert ids and all(allow[i] for i in ids)
+    assert ids == local.tfidf_rank(QUERIES[0], 10, "de", allow=allow)[0]
+
+
+def test_concurrent_queries_interleave_and_match_sequential(pair):
+    local, sharded = pair
+    allow = local.file_mask(["wohngeld"], [])
+    jobs = [(q, lang, mask) for q in QUERIES for lang in (None, "de") for mask in (None, allow)] * 4
+    expected = [sharded.tfidf_rank(q, 20, lang, allow=mask) for q, lang, mask in jobs]
+    with ThreadPoolExecutor(8) as pool:
+        got = list(pool.map(lambda j: sharded.tfidf_rank(j[0], 20, j[1], allow=j[2]), jobs))
+    assert got == expected
+
+
+def test_semantic_merge_matches_unsharded(pair):
+    local, sharded = pair
+    q = np.random.default_rng(1).random(16).astype(np.float32)
+    for lang, fill in ((None, None), ("de", None), ("en", 5), ("ar", 2)):
+        order_l, sc_l = local.semantic_search(q, lang, fill=fill)
+        order_s, sc_s = sharded.semantic_search(q, lang, fill=fill)
+        assert order_s == order_l
+        assert np.allclose(sc_s[order_s], sc_l[order_l], atol=1e-6)
+
+
+def test_answer_uses_sharded_index(pair, monkeypatch):
+    local, sharded = pair
+    q = QUERIES[0]
+    monkeypatch.setattr(app.corpora, "get", lambda name: local)
+    _a, _s, plain = app.answer(q, k=3, mode="TF-IDF", trace=True)
+    monkeypatch.setattr(app.corpora, "get", lambda name: sharded)
+    _a, _s, shard = app.answer(q, k=3, mode="TF-IDF", trace=True)
+    assert json.loads(shard)["top_docs"] == json.loads(plain)["top_docs"]
+
+
+def test_footprint_counts_the_shard_copies(pair):
+    local, sharded = pair
+    extra = sharded.nbytes() - local.nbytes()
+    # every shard holds its CSR rows and embedding rows: at least one more copy of both
+    assert extra >= local.embeddings.nbytes + sum(
+        p.X_char.data.nbytes + p.X_word.data.nbytes for p in local.tfidf.partitions.values()
+    )
+    fp = sharded.footprint()
+    assert fp["shards"]["n_shards"] == 3 and fp["bytes"] == local.footprint()["bytes"] + fp["shards"]["bytes"]
+
+
+def test_top_without_round_one_state_fails_loudly(pair):
+    _local, sharded = pair
+    rid = next(sharded._rids)
+    with pytest.raises(RuntimeError, match="no round-1 scores"):
+        sharded._broadcast("top", [(rid, {}, 5, None)] * sharded.n_shards, rid)
+    assert sharded.tfidf_rank(QUERIES[0], 5, "de")[0]  # the shards keep serving
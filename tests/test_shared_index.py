@@ -0,0 +1,71 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+import app
+from app_pkg.shared_index import attach_index, export_index, read_meta
+
+
+def _export(tmp_path, with_emb=False):
+    ix = app.get_corpus("wohngeld")
+    if with_emb:
+        ix = app.CorpusIndex(list(ix.docs), name="wohngeld", fingerprint=ix.fingerprint)
+        ix.embeddings = np.random.default_rng(0).random((len(ix.docs), 8)).astype(np.float32)
+    d = str(tmp_path / "wohngeld")
+    export_index(ix, d, embedding_model="m1")
+    return ix, d
+
+
+def test_attach_roundtrip_matches_built_index(tmp_path):
+    built, d = _export(tmp_path)
+    shared = attach_index(d)
+
+    assert len(shared.docs) == len(built.docs)
+    assert shared.docs[5] == {k: built.docs[5][k] for k in ("path", "text", "lang", "id")}
+    assert shared.lang_slices == built.lang_slices
+    assert shared.file_starts.tolist() == built.file_starts.tolist()
+    for lang in ("de", "en", "ar"):
+        q = "Welche Unterlagen brauche ich für den Wohngeldantrag?"
+        assert shared.tfidf_rank(q, 20, lang) == built.tfidf_rank(q, 20, lang)
+
+
+def _is_memory_mapped(arr):
+    while arr is not None:
+        if isinstance(arr, np.memmap) or type(arr).__name__ == "mmap":
+            return True
+        arr = getattr(arr, "base", None)
+    return False
+
+
+def test_attached_arrays_are_read_only_memory_maps(tmp_path):
+    _built, d = _export(tmp_path)
+    shared = attach_index(d)
+    X = shared.tfidf.partitions["de"].X_char
+    for arr in (X.data, X.indices, X.indptr):
+        assert not arr.flags.writeable
+        assert _is_memory_mapped(arr)
+
+
+def test_embeddings_attach_only_for_matching_model(tmp_path):
+    built, d = _export(tmp_path, with_emb=True)
+    assert read_meta(d)["embedding_model"] == "m1"
+    assert np.allclose(attach_index(d, embedding_model="m1").embeddings, built.embeddings)
+    assert attach_index(d, embedding_model="other").embeddings is None
+
+
+def test_worker_process_attaches_shared_export(tmp_path):
+    _built, _d = _export(tmp_path)
+    code = (
+        "import json, app\n"
+        "ix = app.get_corpus('wohngeld')\n"
+        "_a, _s, tr = app.answer('Welche Unterlagen brauche ich?', mode='TF-IDF', corpus='wohngeld', trace=True)\n"
+        "print(json.dumps({'store': type(ix.docs).__name__, 'top': json.loads(tr)['top_docs'][0]['path']}))\n"
+    )
+    env = dict(os.environ, SHARED_INDEX_DIR=str(tmp_path), DISABLE_SEMANTIC="1", PYTHONPATH=".")
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, env=env, check=True)
+    res = json.loads(out.stdout.strip().splitlines()[-1])
+    assert res["store"] == "PassageStore"
+    assert res["top"].startswith("docs/wohngeld/")
@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+
+import pytest
+
+import app
+from app_pkg.singleflight import SingleFlight, restamp_trace
+
+Q = "Welche Unterlagen brauche ich für den Wohngeldantrag?"
+
+
+def _run_concurrently(n, fn):
+    out = [None] * n
+    start = threading.Barrier(n)
+
+    def worker(i):
+        start.wait()
+        out[i] = fn()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return out
+
+
+def test_singleflight_runs_once_per_key_and_shares_errors():
+    sf = SingleFlight()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return 42
+
+    res = _run_concurrently(5, lambda: sf.do("k", slow))
+    assert len(calls) == 1
+    assert sorted(shared for _r, shared in res) == [False, True, True, True, True]
+    assert all(r == 42 for r, _ in res)
+    assert sf.stats() == {"calls": 5, "coalesced": 4, "inflight": 0}
+
+    sf.do("k", slow)  # not a cache: a later call computes again
+    assert len(calls) == 2
+
+    def boom():
+        time.sleep(0.1)
+        raise RuntimeError("down")
+
+    errs = _run_concurrently(3, lambda: pytest.raises(RuntimeError, sf.do, "e", boom))
+    assert all("down" in str(e.value) for e in errs)
+
+
+def test_restamp_trace_keeps_payload_but_renews_ids():
+    tr = {"top_docs": [1], "sniper_trace_v1": {"trace_id": "a", "timestamp": "2020-01-01T00:00:00Z"}}
+    out = restamp_trace(tr)
+    assert out["top_docs"] == [1] and out["top_docs"] is not tr["top_docs"]
+    assert out["sniper_trace_v1"]["trace_id"] != "a"
+    assert out["sniper_trace_v1"]["timestamp"].endswith("Z")
+
+
+def test_identical_concurrent_answers_share_one_retrieval(monkeypatch):
+    calls = []
+    real = app._answer
+
+    def slow_answer(*args):
+        calls.append(args)
+        time.sleep(0.2)
+        return real(*args)
+
+    monkeypatch.setattr(app, "_answer", slow_answer)
+    res = _run_concurrently(4, lambda: app.answer(Q, k=3, mode="TF-IDF", trace=True))
+    assert len(calls) == 1
+
+    traces = [json.loads(tr) for _a, _s, tr in res]
+    assert len({t["sniper_trace_v1"]["trace_id"] for t in traces}) == 4
+    assert all(t["top_docs"] == traces[0]["top_docs"] for t in traces)
+    assert all(a == res[0][0] for a, _s, _t in res)
+
+    # Different arguments are never merged.
+    calls.clear()
+    _run_concurrently(2, lambda: app.answer(Q, k=3, mode="TF-IDF"))
+    app.answer(Q, k=2, mode="TF-IDF")
+    assert len(calls) == 2
@@ -0,0 +1,79 @@
+import json
+import sys
+
+import numpy as np
+
+import app
+import cli
+from app_pkg import sweep as sweeps
+
+
+def _eval_set():
+    items = cli.load_eval("data/wohngeld_eval.jsonl")
+    return items, [it["lang"] for it in items], [cli.ground_truth_ids(it) for it in items]
+
+
+def test_tfidf_replay_matches_answer_including_backfill(monkeypatch):
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)  # eval questions include FAQ questions; compare retrieval
+    items, q_langs, gt = _eval_set()
+    scores = sweeps.score_matrices(app.get_corpus(None), [it["q"] for it in items], q_langs)
+    for k in (3, 5):  # the Arabic partition has 4 passages: k=5 backfills from the others
+        sw = sweeps.Sweep(scores, gt, k=k)
+        d = sweeps.DEFAULTS["tfidf"]
+        for q, it in enumerate(items):
+            top, s = sw.rank("tfidf", d, q)
+            trace = json.loads(app.answer(it["q"], k=k, mode="TF-IDF", lang=it["lang"], trace=True)[2])
+            assert [x["id"] for x in trace["top_docs"]] == top.tolist()
+            gated = s[0] < d["min_top"] or (len(s) > 1 and s[0] - s[1] < d["min_gap"])
+            assert gated == (trace["abstain_reason"] in ("weak retrieval match", "ambiguous retrieval (top results too close)"))
+
+
+def test_hybrid_rrf_matches_dict_fusion_and_its_tie_order():
+    rng = np.random.default_rng(0)
+    n = 40
+    scores = {
+        "char": rng.random((3, n)).round(1), "word": rng.random((3, n)).round(1), "sem": rng.random((3, n)).round(2),
+        "langs": np.array(["de"] * n), "q_langs": np.array(["de"] * 3),
+    }
+    sw = sweeps.Sweep(scores, [[0], [1], [2]], k=10)
+    params = {**sweeps.DEFAULTS["hybrid"], "tf_cand": 15, "sem_cand": 12, "k0": 5.0}
+    for q in range(3):
+        fused = 0.6 * scores["char"][q] + 0.4 * scores["word"][q]
+        tf_order = fused.argsort()[::-1][:15]
+        sem_order = np.argsort(scores["sem"][q], kind="stable")[::-1][:12]
+        rrf = {}
+        for r, i in enumerate(tf_order):
+            rrf[i] = rrf.get(i, 0.0) + 1.0 / (5.0 + r + 1)
+        for r, i in enumerate(sem_order):
+            rrf[i] = rrf.get(i, 0.0) + 1.0 / (5.0 + r + 1)
+        expected = [i for i, _ in sorted(rrf.items(), key=lambda x: x[1], reverse=True)][:10]
+        assert sw.rank("hybrid", params, q)[0].tolist() == expected
+
+
+def test_gates_pareto_front_and_budgeted_best():
+    items, q_langs, gt = _eval_set()
+    sw = sweeps.Sweep(sweeps.score_matrices(app.get_corpus(None), [it["q"] for it in items], q_langs), gt, k=3)
+    assert sw.modes == ("tfidf",)  # no semantic matrix
+    rows = sw.run("tfidf", sweeps.grid({"min_top": [0.0, 0.1, 0.3, 10.0], "min_gap": [0.0]}))
+    assert len(rows) == 4 and len({r["p_at_k"] for r in rows}) == 1  # gates don't change the ranking
+    rates = [r["abstain_rate"] for r in rows]
+    assert rates == sorted(rates) and rates[0] == 0.0 and rates[-1] == 1.0
+    front = sweeps.pareto_front(rows, "answered_p_at_k")
+    assert front[0]["abstain_rate"] == 0.0
+    assert all(a["answered_p_at_k"] < b["answered_p_at_k"] for a, b in zip(front, front[1:]))
+    best = sweeps.best_row(rows, "answered_p_at_k", max_abstain=0.0)
+    assert best["params"]["min_top"] == 0.0
+
+
+def test_cli_sweep_caches_scores_and_reports(tmp_path, monkeypatch, capsys):
+    monkeypatch.setattr(app, "BUILD_DIR", str(tmp_path))
+    out = tmp_path / "rows.json"
+    argv = ["cli.py", "sweep", "--mode", "tfidf", "--space", "w_char=0.4,0.6;pool=200;min_top=0,0.05;min_gap=0.01",
+            "--out", str(out)]
+    monkeypatch.setattr(sys, "argv", argv)
+    cli.main()
+    res = json.loads(capsys.readouterr().out.strip().splitlines()[-1])
+    assert res["mode"] == "tfidf" and res["configs"] == 2 * 4 * 2
+    assert res["current"]["params"] == sweeps.DEFAULTS["tfidf"] and res["pareto"]
+    assert len(json.loads(out.read_text(encoding="utf-8"))) == 16
+    assert len(list((tmp_path / "sweep").glob("*.npz"))) == 1
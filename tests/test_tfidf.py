@@ -6,3 +6,43 @@ def test_tfidf_returns_results():
     top, scores = r.search("Wohngeld Unterlagen", k=2)
     assert len(top) == 2
     assert all("text" in t for t in top)
+
+
+def test_partitioned_vocabularies_are_per_language():
+    shared = TfidfRetriever(app.docs)
+    assert set(app.tfidf.partitions) == {d["lang"] for d in app.docs}
+    for lang, part in app.tfidf.partitions.items():
+        assert len(part.vectorizer_char.vocabulary_) < len(shared.vectorizer_char.vocabulary_)
+        assert part.X_char.shape[0] == sum(d["lang"] == lang for d in app.docs)
+
+
+def test_partitioned_search_routes_then_backfills():
+    n_de = len(app.tfidf.ids["de"])
+    ids, scores = app.tfidf.search_ids("Wohngeld Unterlagen", k=3, lang="de")
+    assert len(ids) == 3 and all(app.docs[i]["lang"] == "de" for i in ids)
+    assert list(scores) == sorted(scores, reverse=True)
+
+    # Asking for more than the partition holds backfills from the other languages, after it.
+    ids, _ = app.tfidf.search_ids("Wohngeld Unterlagen", k=n_de + 2, lang="de")
+    langs = [app.docs[i]["lang"] for i in ids]
+    assert langs[:n_de] == ["de"] * n_de
+    assert len(ids) == n_de + 2 and all(lang != "de" for lang in langs[n_de:])
+
+
+def test_partitioned_search_respects_allow_mask():
+    allow = app._file_mask(("unterlagen",), ())
+    ids, _ = app.tfidf.search_ids("Wohngeld Unterlagen", k=50, lang="en", allow=allow, fill=1)
+    # No EN file matches the filter, so the DE partition backfills.
+    assert len(ids) > 0
+    assert all("unterlagen" in app.docs[i]["path"] for i in ids)
+
+
+def test_unrouted_search_normalizes_over_all_partitions():
+    # Routed, every partition's best hit scores 1.0; merged, only the overall best does.
+    assert all(app.tfidf.search_ids("Wohngeld Unterlagen", k=1, lang=g)[1][0] > 0.99 for g in app.tfidf.partitions)
+    ids, scores = app.tfidf.search_ids("Wohngeld Unterlagen", k=len(app.docs))
+    best = {}
+    for i, s in zip(ids, scores):
+        best.setdefault(app.docs[i]["lang"], float(s))
+    assert app.docs[ids[0]]["lang"] == "de" and best["de"] > 0.99
+    assert best["en"] < 0.9 and best["ar"] < 0.9
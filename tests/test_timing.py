@@ -0,0 +1,65 @@
+import json
+import time
+
+import app
+from app_pkg.timing import LatencyStats, StageTimer
+
+Q = "Welche Unterlagen brauche ich für den Wohngeldantrag?"
+
+
+def test_stage_timer_charges_time_to_stages():
+    tm = StageTimer()
+    time.sleep(0.01)
+    tm.mark("a")
+    tm.mark("b")
+    time.sleep(0.005)
+    tm.mark("a")  # repeated stages accumulate
+    d = tm.as_dict()
+    assert list(d) == ["a", "b", "total"]
+    assert d["a"] >= 15.0 and d["b"] < d["a"]
+    assert d["total"] >= d["a"] + d["b"]
+
+
+def test_latency_stats_percentiles_per_mode_and_stage():
+    st = LatencyStats(window=100)
+    for i in range(1, 201):
+        st.record("TF-IDF", {"tfidf": float(i), "total": float(i) * 2})
+    st.record("Hybrid", {"total": 5.0})
+    s = st.summary()
+    # Only the last 100 samples (101..200) are kept.
+    assert s["TF-IDF"]["tfidf"]["n"] == 100
+    assert 149.0 <= s["TF-IDF"]["tfidf"]["p50"] <= 152.0
+    assert s["TF-IDF"]["tfidf"]["p99"] >= s["TF-IDF"]["tfidf"]["p95"] >= s["TF-IDF"]["tfidf"]["p50"]
+    assert s["Hybrid"]["total"] == {"n": 1, "p50": 5.0, "p95": 5.0, "p99": 5.0}
+
+
+def test_answer_trace_carries_stage_timings_and_feeds_histograms(monkeypatch):
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)  # Q is a known FAQ question; exercise retrieval
+    app.stage_latency.reset()
+    _a, _s, tr = app.answer(Q, k=3, mode="TF-IDF", trace=True)
+    t = json.loads(tr)["timings_ms"]
+    for stage in ("index", "lang_detect", "filters", "tfidf", "select", "gating", "render", "trace", "total"):
+        assert stage in t and t[stage] >= 0.0
+    assert t["total"] >= t["tfidf"]
+    assert app.stage_latency.summary()["TF-IDF"]["total"]["n"] == 1
+
+    # Semantic without a model falls back to TF-IDF and is bucketed as such.
+    monkeypatch.setattr(app, "_semantic_ready", False)
+    monkeypatch.setattr(app, "_init_embeddings", lambda ix=None: None)
+    app.answer(Q, k=3, mode="Semantic")
+    assert app.stage_latency.summary()["TF-IDF"]["total"]["n"] == 2
+
+
+def test_slow_requests_are_logged_with_breakdown(tmp_path, monkeypatch):
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)  # Q is a known FAQ question; exercise retrieval
+    path = tmp_path / "slow.jsonl"
+    monkeypatch.setattr(app, "SLOW_LOG_PATH", str(path))
+    monkeypatch.setattr(app, "SLOW_REQUEST_MS", 1e-6)
+    app.answer(Q, k=3, mode="TF-IDF", include="wohngeld")
+    row = json.loads(path.read_text(encoding="utf-8").splitlines()[-1])
+    assert row["query"] == Q and row["mode"] == "TF-IDF" and row["include"] == "wohngeld"
+    assert row["timings_ms"]["total"] > 0 and "tfidf" in row["timings_ms"]
+
+    monkeypatch.setattr(app, "SLOW_REQUEST_MS", 0.0)  # 0 = off
+    app.answer(Q, k=2, mode="TF-IDF")
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
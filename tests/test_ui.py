@@ -0,0 +1,82 @@
+import json
+import threading
+
+import pytest
+
+import app
+import bench
+from app_pkg.ui import AnswerOffload, UiConfig, from_env, split
+
+
+def test_config_and_split():
+    assert from_env({}, default_workers=3) == UiConfig(pool="process", workers=3, concurrency=2, max_batch=8, queue_size=64)
+    cfg = from_env({"UI_POOL": "thread", "UI_WORKERS": "4", "UI_MAX_BATCH": "16", "UI_QUEUE_SIZE": "0"})
+    assert (cfg.pool, cfg.workers, cfg.max_batch, cfg.queue_size) == ("thread", 4, 16, 0)
+    assert not cfg.eager_model and from_env({"UI_EAGER_MODEL": "1"}).eager_model
+    with pytest.raises(ValueError):
+        from_env({"UI_POOL": "gpu"})
+    assert split(list(range(7)), 3) == [[0, 1, 2], [3, 4], [5, 6]]
+    assert split([1], 4) == [[1]] and split([], 2) == []
+
+
+@pytest.mark.parametrize("pool", ["inline", "thread", "process"])
+def test_offload_splits_per_worker_and_keeps_request_order(pool):
+    off = AnswerOffload(sorted, pool, workers=2)  # sorted() per chunk shows where the batch was cut
+    try:
+        pooled = pool != "inline"
+        assert off.run([3, 1, 2, 5, 4]) == [1, 2, 3, 4, 5]
+        assert off.run([9, 8]) == ([9, 8] if pooled else [8, 9])  # one chunk per worker, chunks in order
+        st = off.stats()
+        assert st["batches"] == 2 and st["requests"] == 7 and st["chunks"] == (4 if pooled else 2)
+    finally:
+        off.close()
+
+
+def test_answer_batch_matches_answer_and_isolates_errors(monkeypatch):
+    monkeypatch.setattr(app, "FAQ_FAST_PATH", False)
+    reqs = [
+        {"query": "Bearbeitungszeit Wohngeld?", "k": 3, "mode": "TF-IDF", "trace": True},
+        {"query": "Wohngeld Unterlagen", "k": 2, "mode": "TF-IDF", "include": "wohngeld"},
+        {"query": "Wohngeld", "mode": "TF-IDF", "corpus": "nope"},
+    ]
+    res = app.answer_batch(reqs)
+    _, _, tr = app.answer("Bearbeitungszeit Wohngeld?", k=3, mode="TF-IDF", trace=True)
+    assert json.loads(res[0][2])["top_docs"] == json.loads(tr)["top_docs"]
+    assert res[1][2] == "" and res[1][0] == app.answer("Wohngeld Unterlagen", k=2, mode="TF-IDF", include="wohngeld")[0]
+    assert res[2][0].startswith("Error: ValueError") and res[2][1:] == ("", "")
+
+
+def test_ui_batch_handler_returns_one_list_per_output(monkeypatch):
+    monkeypatch.setattr(app, "_ui_offload", AnswerOffload(app.answer_batch, "inline"))
+    qs = ["Bearbeitungszeit Wohngeld?", "Wie lange dauert Wohngeld?"]
+    ans, src, tr = app.answer_ui_batch(qs, [3, 3], ["TF-IDF"] * 2, ["wohngeld"] * 2, ["auto"] * 2, ["", ""], ["github"] * 2,
+                                       [False, True], [None, "wohngeld"])
+    assert len(ans) == len(src) == len(tr) == 2 and tr[0] == "" and json.loads(tr[1])["corpus"] == "wohngeld"
+    assert app._ui_offload.stats()["requests"] == 2
+
+
+def test_event_queue_batches_waiting_requests():
+    gate, sizes = threading.Event(), []
+
+    def handler(reqs):
+        gate.wait(5)
+        sizes.append(len(reqs))
+        return [r * 10 for r in reqs]
+
+    q = bench.EventQueue(handler, concurrency=1, max_batch=4)
+    futs = [q.submit(i) for i in range(6)]
+    gate.set()
+    assert [f.result(5) for f in futs] == [i * 10 for i in range(6)]
+    q.close()
+    assert sum(sizes) == 6 and max(sizes) <= 4 and len(sizes) < 6
+
+
+@pytest.mark.parametrize("eager", [False, True])
+def test_offload_workers_load_the_model_only_when_eager(monkeypatch, eager):
+    calls = []
+    monkeypatch.setattr(app, "UI", app.UI.__class__(**{**app.UI.as_dict(), "eager_model": eager}))
+    monkeypatch.setattr(app, "startup", lambda names=None, semantic=False, trace_top=None: calls.append(semantic))
+    monkeypatch.setattr(app, "WARMUP_ON_START", False)
+    monkeypatch.setenv("DOCS_WATCH_S", "0")
+    app._offload_init()
+    assert calls == [eager]
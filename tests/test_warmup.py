@@ -0,0 +1,54 @@
+import gzip
+import json
+
+import app
+from app_pkg.logging_utils import AsyncLogWriter
+from app_pkg.warmup import CacheWarmer, query_set, top_logged_queries
+
+
+def test_top_logged_queries_reads_csv_and_gzip_jsonl(tmp_path):
+    rows = [{"query": q} for q in ["a", "b", "a", "c", "a", "b", " "]]
+    w = AsyncLogWriter(str(tmp_path / "q.csv"), fmt="csv", fieldnames=["query"])
+    for r in rows:
+        w.log(r)
+    w.close()
+    assert top_logged_queries(str(tmp_path / "q.csv"), 2) == ["a", "b"]
+    with gzip.open(tmp_path / "q.jsonl.gz", "wt", encoding="utf-8") as f:
+        f.writelines(json.dumps(r) + "\n" for r in rows)
+    assert top_logged_queries(str(tmp_path / "q.jsonl.gz"), 5) == ["a", "b", "c"]
+    assert top_logged_queries(str(tmp_path / "missing.csv"), 5) == []
+    assert query_set(("samples", ["x", "y "]), ("logs", ["y", "z"])) == [("x", "samples"), ("y", "samples"), ("z", "logs")]
+
+
+def test_warmer_defers_to_live_traffic_then_gives_up():
+    calls, busy = [], iter([True, True, False, False, False] + [True] * 10)
+    w = CacheWarmer(lambda q, **kw: calls.append((q, kw["mode"])), [("q1", "samples"), ("q2", "logs")],
+                    [{"mode": "TF-IDF"}, {"mode": "Hybrid"}], busy=lambda: next(busy), poll_s=1.0, max_defer_s=3.0,
+                    sleep=lambda s: None)
+    r = w.run()
+    assert calls == [("q1", "TF-IDF"), ("q1", "Hybrid"), ("q2", "TF-IDF")]
+    assert r["planned"] == 4 and r["executed"] == 3 and r["skipped"] == 1 and r["coverage"] == 0.75
+    assert r["queries_warmed"] == 1 and r["by_source"] == {"samples": 1} and r["deferrals"] == 3 and r["deferred_s"] == 3.0
+
+
+def test_app_warmup_covers_sources_without_logging_or_counting_as_traffic(tmp_path, monkeypatch):
+    log = tmp_path / "queries.csv"
+    w = AsyncLogWriter(str(log), fmt="csv", fieldnames=app.QUERY_LOG_FIELDS)
+    for q in ["Bearbeitungszeit Wohngeld?"] * 3 + [app.SAMPLE_QUESTIONS[0]]:
+        w.log({"query": q})
+    w.close()
+    monkeypatch.setattr(app, "QUERY_LOG_PATH", str(log))
+    monkeypatch.setattr(app, "LOG_QUERIES", True)
+    writer = AsyncLogWriter(str(tmp_path / "new.csv"), fmt="csv", fieldnames=app.QUERY_LOG_FIELDS)
+    monkeypatch.setattr(app, "_query_logger", writer)
+    monkeypatch.setattr(app, "_last_request", [0.0])
+
+    report = app.warm_caches(modes=["TF-IDF"], includes=[""])
+    assert report["by_source"] == {"samples": 5, "clarify": 4, "logs": 1}  # sample question counted once
+    assert report["coverage"] == 1.0 and report["errors"] == 0 and report["planned"] == 10
+    assert app.warmup_report()["executed"] == 10
+    writer.flush()
+    assert writer.stats()["written"] == 0 and not app.live_traffic()
+
+    app.answer("Bearbeitungszeit Wohngeld?", mode="TF-IDF")
+    assert app.live_traffic()
@@ -1,5 +1,9 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
+
+# sklearn is imported by TfidfRetriever() itself: it is most of the import cost of
+# this module, and attaching a prebuilt index (from_fitted) never needs it.
 
 
 class TfidfRetriever:
@@ -18,6 +22,8 @@ class TfidfRetriever:
         self.w_char = float(w_char)
         self.w_word = float(w_word)
 
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
         texts = [p["text"] for p in passages]
 
         # Character n-grams within word boundaries (great for German + typos)
@@ -31,7 +37,6 @@ class TfidfRetriever:
             sublinear_tf=True,
             norm="l2",
         )
-        self.X_char = self.vectorizer_char.fit_transform(texts)
 
         # Word n-grams (helps normal keyword matching and longer queries)
         self.vectorizer_word = TfidfVectorizer(
@@ -45,30 +50,162 @@ class TfidfRetriever:
             norm="l2",
             token_pattern=r"(?u)\b\w+\b",
         )
-        self.X_word = self.vectorizer_word.fit_transform(texts)
+
+        # The two fits are independent: run them side by side.
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            f_char = pool.submit(self.vectorizer_char.fit_transform, texts)
+            f_word = pool.submit(self.vectorizer_word.fit_transform, texts)
+            self.X_char, self.X_word = f_char.result(), f_word.result()
 
         # Backwards-compat attributes (some code may reference these)
         self.vectorizer = self.vectorizer_char
         self.X = self.X_char
 
+    @classmethod
+    def from_fitted(cls, passages, vectorizer_char, X_char, vectorizer_word, X_word,
+                    w_char: float = 0.6, w_word: float = 0.4):
+        """Rebuild a retriever from already fitted vectorizers/matrices (no refit)."""
+        self = cls.__new__(cls)
+        self.passages = passages
+        self.w_char = float(w_char)
+        self.w_word = float(w_word)
+        self.vectorizer_char, self.X_char = vectorizer_char, X_char
+        self.vectorizer_word, self.X_word = vectorizer_word, X_word
+        self.vectorizer = self.vectorizer_char
+        self.X = self.X_char
+        return self
+
     @staticmethod
-    def _safe_unit_max(scores: np.ndarray) -> np.ndarray:
-        m = float(scores.max()) if scores.size else 0.0
+    def _safe_unit_max(scores: np.ndarray, m: float = None) -> np.ndarray:
+        if m is None:
+            m = float(scores.max()) if scores.size else 0.0
         if m <= 0.0:
             return scores
         return scores / (m + 1e-12)
 
-    def search(self, query, k=3):
+    def raw_component_scores(self, query):
+        """(char, word) cosine scores for every passage, not normalized."""
         # cosine on L2-normalized TF-IDF == dot product
         q_char = self.vectorizer_char.transform([query])
         scores_char = (self.X_char @ q_char.T).toarray().ravel()
 
         q_word = self.vectorizer_word.transform([query])
         scores_word = (self.X_word @ q_word.T).toarray().ravel()
+        return scores_char, scores_word
+
+    def component_scores(self, query):
+        """(char, word) scores for every passage, each max-normalized to [0, 1] (before weighting)."""
+        scores_char, scores_word = self.raw_component_scores(query)
+        return self._safe_unit_max(scores_char), self._safe_unit_max(scores_word)
 
-        s_char = self._safe_unit_max(scores_char)
-        s_word = self._safe_unit_max(scores_word)
+    def fuse(self, scores_char, scores_word, m_char: float = None, m_word: float = None) -> np.ndarray:
+        """Weighted sum of raw char/word scores, each divided by its max (or the given `m_*`)."""
+        return (self.w_char * self._safe_unit_max(scores_char, m_char)) + (
+            self.w_word * self._safe_unit_max(scores_word, m_word)
+        )
 
-        scores = (self.w_char * s_char) + (self.w_word * s_word)
+    def score(self, query) -> np.ndarray:
+        """Fused char/word score for every passage (same order as `passages`)."""
+        return self.fuse(*self.raw_component_scores(query))
+
+    def search(self, query, k=3):
+        scores = self.score(query)
         order = scores.argsort()[::-1][:k]
         return [self.passages[i] for i in order], scores[order]
+
+
+class PartitionedTfidfRetriever:
+    """
+    One TfidfRetriever per partition (default: the passage "lang" field).
+
+    Every partition fits its own char/word vocabularies and IDF, so a German
+    query never scores against Arabic n-grams (and vice versa), and each
+    vocabulary only covers its share of the corpus.
+
+    Queries are routed: with `lang` set, only that partition is scored first;
+    the other partitions are scored only to backfill when the routed one
+    cannot supply enough passages. Results are global passage ids (positions
+    in the `passages` list given to the constructor).
+    """
+
+    def __init__(self, passages, key: str = "lang", w_char: float = 0.6, w_word: float = 0.4):
+        self.passages = passages
+        self.key = key
+
+        groups = {}
+        for i, p in enumerate(passages):
+            groups.setdefault(p.get(key), []).append(i)
+
+        self.ids = {g: np.asarray(ix, dtype=np.int64) for g, ix in groups.items()}
+        self.partitions = {
+            g: TfidfRetriever([passages[i] for i in ix], w_char=w_char, w_word=w_word)
+            for g, ix in groups.items()
+        }
+
+    @classmethod
+    def from_partitions(cls, passages, ids, partitions, key: str = "lang"):
+        """Assemble from prebuilt per-partition retrievers (`ids`: partition -> global ids)."""
+        self = cls.__new__(cls)
+        self.passages = passages
+        self.key = key
+        self.ids = dict(ids)
+        self.partitions = dict(partitions)
+        return self
+
+    def _rank_partition(self, g, scores, k, allow=None):
+        ids = self.ids[g]
+        if allow is not None:
+            keep = allow[ids]
+            ids, scores = ids[keep], scores[keep]
+        order = scores.argsort()[::-1][:k]
+        return ids[order], scores[order]
+
+    def _merge(self, parts, k):
+        if not parts:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=float)
+        ids = np.concatenate([p[0] for p in parts])
+        scores = np.concatenate([p[1] for p in parts])
+        order = scores.argsort(kind="stable")[::-1][:k]
+        return ids[order], scores[order]
+
+    def _rank(self, groups, query, k, allow=None):
+        """Top-k global ids over the passages of `groups`, ranked together.
+
+        Char/word scores are max-normalized once over the union of the groups (not
+        per partition), so a partition's best hit only scores 1.0 if it is the best
+        match overall.
+        """
+        raw = {g: self.partitions[g].raw_component_scores(query) for g in groups}
+        m_char = max((float(c.max()) for c, _ in raw.values() if c.size), default=0.0)
+        m_word = max((float(w.max()) for _, w in raw.values() if w.size), default=0.0)
+        parts = [
+            self._rank_partition(g, self.partitions[g].fuse(c, w, m_char, m_word), k, allow)
+            for g, (c, w) in raw.items()
+        ]
+        return self._merge(parts, k)
+
+    def search_ids(self, query, k=3, lang=None, allow=None, fill=None):
+        """Rank global passage ids for `query`; returns (ids, scores).
+
+        allow: optional boolean mask over global ids (e.g. filename filters).
+        fill:  with `lang` set, the other partitions are consulted only when the
+               routed partition yields fewer than `fill` (default `k`) passages;
+               their hits are appended after the routed ones.
+        Without `lang` (or for an unknown one) all partitions are ranked together,
+        normalized over their union.
+        """
+        if lang not in self.partitions:
+            return self._rank(list(self.partitions), query, k, allow)
+
+        ids, scores = self._rank([lang], query, k, allow)
+        need = k if fill is None else min(int(fill), k)
+        if len(ids) >= need:
+            return ids, scores
+
+        rest = k - len(ids)
+        b_ids, b_scores = self._rank([g for g in self.partitions if g != lang], query, rest, allow)
+        return np.concatenate([ids, b_ids]), np.concatenate([scores, b_scores])
+
+    def search(self, query, k=3, lang=None):
+        ids, scores = self.search_ids(query, k=k, lang=lang)
+        return [self.passages[i] for i in ids], scores